@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Reports the memory ipyflow spends per tracked symbol.
+
+Run from the ``core`` directory with::
+
+    python -m benchmarks.symbol_memory [--num-symbols N]
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from typing import Any, Dict, List
+
+from ipyflow.data_model.symbol import Symbol, SymbolType
+from ipyflow.flow import NotebookFlow
+from ipyflow.shell import IPyflowInteractiveShell
+from ipyflow.singletons import flow
+
+
+def _measure(num_symbols: int, with_edges: bool) -> Dict[str, float]:
+    objs: List[Any] = [object() for _ in range(num_symbols)]
+    scope = flow().global_scope
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        syms = [
+            Symbol(f"sym{idx}", SymbolType.DEFAULT, obj, scope)
+            for idx, obj in enumerate(objs)
+        ]
+        if with_edges:
+            for parent, child in zip(syms, syms[1:]):
+                parent.children.setdefault(child, [])
+                child.parents.setdefault(parent, [])
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # keep the container alive until measurement is over
+    assert len(syms) == num_symbols
+    return {
+        "bytes_per_symbol": (after - before) / num_symbols,
+        "shallow_bytes_per_symbol": float(sys.getsizeof(syms[0])),
+    }
+
+
+def run(num_symbols: int) -> Dict[str, Dict[str, float]]:
+    IPyflowInteractiveShell.instance()
+    results = {}
+    for label, with_edges in (("fresh", False), ("with_edges", True)):
+        NotebookFlow.clear_instance()
+        NotebookFlow.instance(test_context=True)
+        results[label] = _measure(num_symbols, with_edges)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--num-symbols", type=int, default=100_000)
+    args = parser.parse_args()
+    print_ = print
+    for label, stats in run(args.num_symbols).items():
+        print_(
+            f"{label:>12}: {stats['bytes_per_symbol']:8.1f} bytes/symbol "
+            f"({stats['shallow_bytes_per_symbol']:.0f} bytes shallow)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how much ipyflow's tracing slows down user code.
+
+Each workload is executed through ``IPyflowInteractiveShell.run_cell`` once with
+dataflow tracing disabled (the baseline) and once with it enabled. The report
+gives the slowdown ratio per workload along with the exclusive time spent
+handling each pyccolo event (and the tracer handlers registered for it).
+
+Run from the ``core`` directory with::
+
+    python -m benchmarks.tracing_overhead [--scale S] [--max-slowdown R] [--json F]
+
+A nonzero exit status is returned when ``--max-slowdown`` is given and any
+workload exceeds it, so that the script can gate CI. Since workloads differ a
+lot in how much tracing slows them down, ``--baseline F`` instead checks each
+workload against its own slowdown in the json object at ``F`` (such as
+``tracing_overhead_baseline.json``, measured at ``--scale 0.5``), failing when
+it is exceeded by more than the relative ``--tolerance``.
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Generator, List, NamedTuple, Optional, Tuple
+
+import pyccolo as pyc
+
+from ipyflow.data_model.cell import cells
+from ipyflow.flow import NotebookFlow
+from ipyflow.shell import IPyflowInteractiveShell
+from ipyflow.singletons import flow, shell
+from ipyflow.tracing.ipyflow_tracer import DataflowTracer
+
+
+class Workload(NamedTuple):
+    name: str
+    setup: str
+    cell: str
+    # number of iterations at scale 1.0
+    size: int
+
+
+WORKLOADS: List[Workload] = [
+    Workload(
+        "tight_loop",
+        "",
+        "total = 0\nfor i in range({n}):\n    total += i * i",
+        100000,
+    ),
+    Workload(
+        "oop_attrs",
+        "class Point:\n"
+        "    def __init__(self, x, y):\n"
+        "        self.x = x\n"
+        "        self.y = y\n"
+        "    def shift(self, dx):\n"
+        "        self.x += dx\n"
+        "        self.y -= dx\n"
+        "        return self",
+        "pts = [Point(i, -i) for i in range({n})]\n"
+        "for p in pts:\n"
+        "    p.shift(1).shift(2)\n"
+        "xs = sum(p.x for p in pts)",
+        10000,
+    ),
+    Workload(
+        "literals",
+        "",
+        "rows = []\n"
+        "for i in range({n}):\n"
+        "    rows.append({{'a': i, 'b': [i, i + 1], 'c': (i, {{'d': i}})}})",
+        10000,
+    ),
+    Workload(
+        "pandas_chain",
+        "import numpy as np\nimport pandas as pd",
+        "df = pd.DataFrame({{'a': np.arange({n}), 'b': np.arange({n}) % 7}})\n"
+        "out = (\n"
+        "    df.assign(c=df.a * 2)\n"
+        "    .query('c > 10')\n"
+        "    .groupby('b')\n"
+        "    .agg({{'c': 'sum', 'a': 'mean'}})\n"
+        "    .reset_index()\n"
+        "    .sort_values('c')\n"
+        ")",
+        100000,
+    ),
+    Workload(
+        "deep_recursion",
+        "def depth(k):\n    return 0 if k == 0 else 1 + depth(k - 1)",
+        "total = 0\nfor _ in range(100):\n    total += depth({n})",
+        400,
+    ),
+]
+
+
+class EventStats(NamedTuple):
+    event: str
+    handlers: Tuple[str, ...]
+    calls: int
+    seconds: float
+
+
+class WorkloadResult(NamedTuple):
+    name: str
+    baseline_seconds: float
+    traced_seconds: float
+    events: List[EventStats]
+
+    @property
+    def slowdown(self) -> float:
+        return self.traced_seconds / max(self.baseline_seconds, 1e-9)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "baseline_seconds": self.baseline_seconds,
+            "traced_seconds": self.traced_seconds,
+            "slowdown": self.slowdown,
+            "events": [evt._asdict() for evt in self.events],
+        }
+
+
+class _EventTimer:
+    """
+    Wraps ``_emit_event`` on each tracer instance to accumulate the number of
+    times each event was emitted and the exclusive time spent handling it; time
+    spent in nested (reentrant) events is attributed to the nested event only.
+    """
+
+    def __init__(self) -> None:
+        self.calls: Dict[Tuple[Any, Any], int] = defaultdict(int)
+        self.seconds: Dict[Tuple[Any, Any], float] = defaultdict(float)
+        self.handler_names: Dict[Tuple[Any, Any], Tuple[str, ...]] = {}
+        self._child_seconds: List[float] = []
+
+    def _wrap(self, tracer: Any) -> Any:
+        orig_emit_event = tracer._emit_event
+        tracer_name = type(tracer).__name__
+
+        def timed_emit_event(evt, *args, **kwargs):
+            event = evt if isinstance(evt, pyc.TraceEvent) else pyc.TraceEvent(evt)
+            key = (tracer_name, event.value)
+            if key not in self.handler_names:
+                self.handler_names[key] = tuple(
+                    spec.handler.__name__
+                    for spec in tracer._event_handlers.get(event, [])
+                )
+            self._child_seconds.append(0.0)
+            start = time.perf_counter()
+            try:
+                return orig_emit_event(evt, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                child_seconds = self._child_seconds.pop()
+                self.calls[key] += 1
+                self.seconds[key] += elapsed - child_seconds
+                if self._child_seconds:
+                    self._child_seconds[-1] += elapsed
+
+        return timed_emit_event
+
+    @contextmanager
+    def install(self) -> Generator[None, None, None]:
+        tracers = [tracer.instance() for tracer in shell().registered_tracers]
+        for tracer in tracers:
+            tracer._emit_event = self._wrap(tracer)
+        try:
+            yield
+        finally:
+            for tracer in tracers:
+                del tracer._emit_event
+
+    def stats(self) -> List[EventStats]:
+        ret = [
+            EventStats(
+                (
+                    event
+                    if tracer_name == DataflowTracer.__name__
+                    else f"{tracer_name}.{event}"
+                ),
+                self.handler_names[key],
+                self.calls[key],
+                self.seconds[key],
+            )
+            for key in self.calls
+            for tracer_name, event in [key]
+        ]
+        return sorted(ret, key=lambda stats: -stats.seconds)
+
+
+def _reset_session() -> None:
+    NotebookFlow.clear_instance()
+    NotebookFlow.instance(test_context=True)
+    DataflowTracer.clear_instance()
+    DataflowTracer.reset_bookkeeping()
+    DataflowTracer.instance()
+
+
+def _run_cell(code: str) -> float:
+    cell_id = cells().next_exec_counter()
+    shell().execution_count = cell_id
+    flow().set_active_cell(cell_id)
+    cells()._position_by_cell_id[cell_id] = cell_id
+    start = time.perf_counter()
+    result = shell().run_cell(code, cell_id=cell_id)
+    elapsed = time.perf_counter() - start
+    if result.error_in_exec is not None or result.error_before_exec is not None:
+        raise RuntimeError(f"benchmark cell failed:\n{code}") from (
+            result.error_in_exec or result.error_before_exec
+        )
+    return elapsed
+
+
+def _time_workload(
+    workload: Workload, scale: float, repeat: int, traced: bool
+) -> Tuple[float, Optional[_EventTimer]]:
+    code = workload.cell.format(n=max(1, int(workload.size * scale)))
+    best = float("inf")
+    best_timer = None
+    for _ in range(repeat):
+        _reset_session()
+        flow().mut_settings.dataflow_enabled = traced
+        if workload.setup:
+            _run_cell(workload.setup)
+        if not traced:
+            best = min(best, _run_cell(code))
+            continue
+        timer = _EventTimer()
+        with timer.install():
+            elapsed = _run_cell(code)
+        if elapsed < best:
+            best, best_timer = elapsed, timer
+    shell().reset()
+    return best, best_timer
+
+
+def run(
+    scale: float = 1.0, repeat: int = 3, names: Optional[List[str]] = None
+) -> List[WorkloadResult]:
+    IPyflowInteractiveShell.instance()
+    results = []
+    for workload in WORKLOADS:
+        if names and workload.name not in names:
+            continue
+        baseline, _ = _time_workload(workload, scale, repeat, traced=False)
+        traced, timer = _time_workload(workload, scale, repeat, traced=True)
+        results.append(
+            WorkloadResult(
+                workload.name,
+                baseline,
+                traced,
+                [] if timer is None else timer.stats(),
+            )
+        )
+    return results
+
+
+def _format_event_line(
+    label: str,
+    calls: Optional[int],
+    seconds: float,
+    res: WorkloadResult,
+    handlers: str,
+) -> str:
+    share = 100 * seconds / max(res.traced_seconds, 1e-9)
+    calls_str = "" if calls is None else f"{calls} calls"
+    return f"  {label:<28}{calls_str:>15}{seconds:>10.4f}s{share:>6.1f}%  {handlers}"
+
+
+def format_report(results: List[WorkloadResult], top: int = 8) -> str:
+    lines = [f"{'workload':<16}{'baseline (s)':>14}{'ipyflow (s)':>14}{'slowdown':>10}"]
+    for res in results:
+        lines.append(
+            f"{res.name:<16}{res.baseline_seconds:>14.4f}"
+            f"{res.traced_seconds:>14.4f}{res.slowdown:>9.1f}x"
+        )
+    for res in results:
+        lines.append("")
+        lines.append(f"{res.name}: time per event (exclusive)")
+        for evt in res.events[:top]:
+            lines.append(
+                _format_event_line(
+                    evt.event, evt.calls, evt.seconds, res, ", ".join(evt.handlers)
+                )
+            )
+        outside_handlers = res.traced_seconds - sum(evt.seconds for evt in res.events)
+        lines.append(
+            _format_event_line("<outside handlers>", None, outside_handlers, res, "")
+        )
+    return "\n".join(lines)
+
+
+def find_regressions(
+    results: List[WorkloadResult],
+    max_slowdown: Optional[float] = None,
+    baseline: Optional[Dict[str, float]] = None,
+    tolerance: float = 1.0,
+) -> List[str]:
+    """
+    Describes each workload whose slowdown exceeds its bound: its baseline
+    slowdown times ``1 + tolerance`` when it has one, else ``max_slowdown``.
+    """
+    regressions = []
+    for res in results:
+        if baseline is not None and res.name in baseline:
+            bound = baseline[res.name] * (1 + tolerance)
+            reason = f"{baseline[res.name]:.1f}x baseline by over {tolerance:.0%}"
+        elif max_slowdown is not None:
+            bound = max_slowdown
+            reason = f"{max_slowdown:.1f}x"
+        else:
+            continue
+        if res.slowdown > bound:
+            regressions.append(
+                f"{res.name}: slowdown {res.slowdown:.1f}x exceeds {reason}"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiplier for workload sizes"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs per workload (best is kept)"
+    )
+    parser.add_argument(
+        "--workload",
+        action="append",
+        dest="workloads",
+        choices=[workload.name for workload in WORKLOADS],
+        help="only run the given workload (may be repeated)",
+    )
+    parser.add_argument(
+        "--top", type=int, default=8, help="events to show per workload"
+    )
+    parser.add_argument("--json", help="also write results as json to this path")
+    parser.add_argument(
+        "--max-slowdown",
+        type=float,
+        default=None,
+        help="exit with failure if any workload is slowed down by more than this",
+    )
+    parser.add_argument(
+        "--baseline",
+        help="json object of per-workload slowdowns to check against instead",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1.0,
+        help="relative increase over the baseline slowdown that is still allowed",
+    )
+    args = parser.parse_args()
+    results = run(scale=args.scale, repeat=args.repeat, names=args.workloads)
+    print_ = print
+    print_(format_report(results, top=args.top))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([res.to_json() for res in results], f, indent=2)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = find_regressions(
+        results,
+        max_slowdown=args.max_slowdown,
+        baseline=baseline,
+        tolerance=args.tolerance,
+    )
+    for regression in regressions:
+        print_(regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
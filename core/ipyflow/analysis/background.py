@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import ast
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, NamedTuple, Optional, Tuple
+
+from ipyflow.analysis.live_refs import (
+    AnalysisSettings,
+    ComputeLiveSymbolRefs,
+    LiveDeadModifiedRefs,
+    LiveRefsCache,
+    get_analysis_settings,
+    mark_placeholder_nodes,
+)
+from ipyflow.singletons import shell
+from ipyflow.types import IdType
+
+if TYPE_CHECKING:
+    import pyccolo as pyc
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+ShellThreadScheduler = Callable[[Callable[[], None]], None]
+
+
+def get_shell_thread_scheduler() -> Optional[ShellThreadScheduler]:
+    """
+    Returns a thread-safe function that schedules a callback on the kernel's
+    main event loop (which is where comm messages are handled), or None if we
+    are not running inside of a kernel that has one.
+    """
+    try:
+        kernel = getattr(shell(), "kernel", None)
+    except AssertionError:
+        return None
+    io_loop = getattr(kernel, "io_loop", None)
+    return getattr(io_loop, "add_callback", None)
+
+
+def _parse_and_compute_scope_independent_refs(
+    source: str, include_killed_live: bool, rewriter: Optional["pyc.AstRewriter"]
+) -> Tuple[ast.Module, Optional[LiveDeadModifiedRefs]]:
+    tree = ast.parse(source)
+    mark_placeholder_nodes(tree, rewriter)
+    analysis = ComputeLiveSymbolRefs(include_killed_live=include_killed_live)
+    refs = analysis(tree)
+    if analysis.is_scope_dependent:
+        # needs the symbols in scope, so leave it to the shell thread
+        return tree, None
+    return tree, refs
+
+
+class _AnalysisJob(NamedTuple):
+    source: str
+    include_killed_live: bool
+    settings: AnalysisSettings
+    future: "Future[Tuple[ast.Module, Optional[LiveDeadModifiedRefs]]]"
+
+
+class StaticAnalysisWorker:
+    """
+    Parses cell sources and computes their raw live, dead, and modified symbol
+    references on a background thread. None of this needs access to the user
+    namespace, so that by the time the shell thread checks the cells, only the
+    resolution of the references against the global scope remains to be done
+    there. Results are handed over through the live refs cache, which is only
+    ever touched from the shell thread, and the parsed trees are handed over
+    per cell (see `pop_parsed_tree`); instrumenting them with the tracer's AST
+    rewriter is still left to the shell thread. Jobs are tracked per cell:
+    submitting newer content for a cell cancels the job for its older content,
+    or, if that job already started, discards its result.
+    """
+
+    def __init__(self, live_refs_cache: LiveRefsCache) -> None:
+        self.live_refs_cache = live_refs_cache
+        # schedules callbacks on the shell thread; if None, results are only
+        # ever collected by callers that wait for them
+        self.schedule_on_shell_thread: Optional[ShellThreadScheduler] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[IdType, _AnalysisJob] = {}
+        self._parsed_trees: Dict[IdType, Tuple[str, ast.Module]] = {}
+        self.num_cancelled = 0
+
+    @property
+    def is_available(self) -> bool:
+        return self.schedule_on_shell_thread is not None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            # a single worker, so that jobs (and idle callbacks) run in order
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="ipyflow-static-analysis"
+            )
+        return self._executor
+
+    def submit(
+        self,
+        cell_id: IdType,
+        source: str,
+        include_killed_live: bool,
+        rewriter: Optional["pyc.AstRewriter"] = None,
+    ) -> bool:
+        """
+        Start analyzing the given (sanitized) source for a cell, unless its refs
+        are already cached. Returns whether there is a job in flight for it.
+        """
+        prev = self._jobs.get(cell_id)
+        settings = get_analysis_settings()
+        if prev is not None:
+            if (prev.source, prev.include_killed_live, prev.settings) == (
+                source,
+                include_killed_live,
+                settings,
+            ):
+                return True
+            del self._jobs[cell_id]
+            if prev.future.cancel():
+                self.num_cancelled += 1
+        if self.live_refs_cache.contains(source, include_killed_live):
+            return False
+        future = self._get_executor().submit(
+            _parse_and_compute_scope_independent_refs,
+            source,
+            include_killed_live,
+            rewriter,
+        )
+        self._jobs[cell_id] = _AnalysisJob(
+            source, include_killed_live, settings, future
+        )
+        return True
+
+    def call_when_idle(self, callback: Callable[[], None]) -> None:
+        """Schedule `callback` on the shell thread once all jobs so far are done."""
+        scheduler = self.schedule_on_shell_thread
+        assert scheduler is not None
+        self._get_executor().submit(scheduler, callback)
+
+    def publish(self) -> None:
+        """
+        Wait for the jobs in flight and add their results to the live refs cache.
+        Must be called from the shell thread.
+        """
+        jobs, self._jobs = self._jobs, {}
+        self._parsed_trees.clear()
+        settings = get_analysis_settings()
+        for cell_id, job in jobs.items():
+            if job.settings != settings:
+                # the settings changed while the job was in flight, so its
+                # result may reflect either the old or the new ones
+                job.future.cancel()
+                continue
+            try:
+                tree, refs = job.future.result()
+            except SyntaxError:
+                continue
+            except Exception:
+                logger.exception("exception during background static analysis")
+                continue
+            self._parsed_trees[cell_id] = (job.source, tree)
+            if refs is not None:
+                self.live_refs_cache.put(job.source, job.include_killed_live, refs)
+
+    def pop_parsed_tree(self, cell_id: IdType) -> Optional[Tuple[str, ast.Module]]:
+        """
+        The source last published for a cell along with the tree parsed from it,
+        for `Cell.to_ast` to use instead of parsing the source again.
+        """
+        return self._parsed_trees.pop(cell_id, None)
+
+    def shutdown(self) -> None:
+        for job in self._jobs.values():
+            job.future.cancel()
+        self._jobs.clear()
+        self._parsed_trees.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
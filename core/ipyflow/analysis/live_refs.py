@@ -4,6 +4,7 @@ import builtins
 import itertools
 import logging
 import sys
+from collections import OrderedDict
 from contextlib import contextmanager
 from typing import (
     TYPE_CHECKING,
@@ -25,7 +26,7 @@ from ipyflow.analysis.mixins import (
     VisitListsMixin,
 )
 from ipyflow.analysis.resolved_symbols import ResolvedSymbol
-from ipyflow.analysis.symbol_ref import Atom, LiveSymbolRef, SymbolRef, visit_stack
+from ipyflow.analysis.symbol_ref import Atom, LiveSymbolRef, SymbolRef, analysis_state
 from ipyflow.config import FlowDirection
 from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.singletons import flow
@@ -179,6 +180,10 @@ class ComputeLiveSymbolRefs(
             str, Union[ast.FunctionDef, ast.AsyncFunctionDef]
         ] = {}
         self._visiting_func_calls: Set[str] = set()
+        # whether the result depended on the symbols in scope (and not just the
+        # code), or would have, had a scope been given
+        self.is_scope_dependent = False
+        self._visit_stack = analysis_state.visit_stack
 
     def __call__(
         self, node: ast.AST
@@ -190,7 +195,11 @@ class ComputeLiveSymbolRefs(
         # TODO: this will break if we ref a variable in a loop before killing it in the
         #   same loop, since we will add everything on the LHS of an assignment to the killed
         #   set before checking the loop body for live variables
+        symbol_ref_visitor = analysis_state.symbol_ref_visitor
+        prev_num_scope_lookups = symbol_ref_visitor.num_scope_lookups
         self.visit(node)
+        if symbol_ref_visitor.num_scope_lookups != prev_num_scope_lookups:
+            self.is_scope_dependent = True
         self.modified |= self.dead
         return self.live, self.dead, self.modified
 
@@ -269,6 +278,8 @@ class ComputeLiveSymbolRefs(
                 len(targets) == 1
                 and isinstance(targets[0], ast.Name)
                 and isinstance(value, (ast.List, ast.Tuple))
+                # elements of large literals get their symbols lazily
+                and len(value.elts) < flow().mut_settings.min_lazy_literal_size
             ):
                 for idx in range(len(value.elts)):
                     this_assign_dead.add(
@@ -279,16 +290,18 @@ class ComputeLiveSymbolRefs(
         this_assign_dead -= self.dead
         # TODO: ideally under the current abstraction we should
         #  not be resolving static references to symbols here
-        if (
+        is_simple_alias_assignment = (
             flow().mut_settings.flow_order == FlowDirection.ANY_ORDER
-            and self._scope is not None
             and len(this_assign_live) == 1
             and len(this_assign_dead) == 1
             and not (this_assign_dead <= self.dead)
             and aug_assign_target is None
             and value is not None
             and isinstance(value, (ast.Attribute, ast.Subscript, ast.Name))
-        ):
+        )
+        if is_simple_alias_assignment:
+            self.is_scope_dependent = True
+        if is_simple_alias_assignment and self._scope is not None:
             lhs, rhs = [
                 get_symbols_for_references(x, self._scope)[0]
                 for x in (this_assign_dead, (live.ref for live in this_assign_live))
@@ -573,11 +586,11 @@ class ComputeLiveSymbolRefs(
             self._module_stmt_counter += 1
 
     def visit(self, node):
-        visit_stack.append(node)
+        self._visit_stack.append(node)
         try:
             return super().visit(node)
         finally:
-            visit_stack.pop()
+            self._visit_stack.pop()
 
 
 def get_symbols_for_references(
@@ -785,6 +798,85 @@ def compute_live_dead_symbol_refs(
     )(code)
 
 
+LiveDeadModifiedRefs = Tuple[Set[LiveSymbolRef], Set[SymbolRef], Set[SymbolRef]]
+# the settings that the scope-independent analysis of a source depends on
+AnalysisSettings = Tuple[FlowDirection, int]
+_CacheKey = Tuple[str, bool, AnalysisSettings]
+
+
+def get_analysis_settings() -> AnalysisSettings:
+    mut_settings = flow().mut_settings
+    return mut_settings.flow_order, mut_settings.min_lazy_literal_size
+
+
+class LiveRefsCache:
+    """
+    Bounded LRU cache of the scope-independent part of the liveness analysis of
+    cell sources (the raw live, dead, and modified symbol references), keyed by
+    the sanitized source and the settings that the analysis depends on (see
+    `get_analysis_settings`). Rechecking an unchanged cell (or a new execution of a
+    cell with the same content) then only needs to resolve the references
+    against the current scope. Results that depended on the values of symbols
+    in scope while being computed are never cached.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[_CacheKey, LiveDeadModifiedRefs]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def contains(self, source: str, include_killed_live: bool) -> bool:
+        return (source, include_killed_live, get_analysis_settings()) in self._entries
+
+    def put(
+        self, source: str, include_killed_live: bool, refs: LiveDeadModifiedRefs
+    ) -> None:
+        """
+        Add refs computed elsewhere under the current analysis settings, which
+        must not be scope dependent.
+        """
+        key = (source, include_killed_live, get_analysis_settings())
+        self._entries[key] = refs
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def compute_live_dead_symbol_refs(
+        self,
+        tree: ast.Module,
+        source: Optional[str],
+        scope: Optional["Scope"] = None,
+        include_killed_live: bool = False,
+    ) -> LiveDeadModifiedRefs:
+        if source is None:
+            return compute_live_dead_symbol_refs(
+                tree, scope=scope, include_killed_live=include_killed_live
+            )
+        key = (source, include_killed_live, get_analysis_settings())
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            analysis = ComputeLiveSymbolRefs(
+                scope=scope, include_killed_live=include_killed_live
+            )
+            entry = analysis(tree)
+            if not analysis.is_scope_dependent:
+                self.put(source, include_killed_live, entry)
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        live, dead, modified = entry
+        # copies, so that callers cannot mutate the cached entry
+        return set(live), set(dead), set(modified)
+
+
 def static_resolve_rvals(
     code: Union[ast.AST, str],
     cell_ctr: int = -1,
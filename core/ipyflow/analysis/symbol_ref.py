@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import ast
 import logging
+import threading
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -115,6 +116,10 @@ class SymbolRefVisitor(ast.NodeVisitor):
     def __init__(self) -> None:
         self.symbol_chain: List[Atom] = []
         self.scope: Optional["Scope"] = None
+        # bumped whenever a chain depends on the runtime values of symbols in
+        # scope (or would, given a scope), so that callers can tell when a static
+        # analysis is not cacheable
+        self.num_scope_lookups = 0
 
     def __call__(
         self,
@@ -195,6 +200,7 @@ class SymbolRefVisitor(ast.NodeVisitor):
         resolved = resolve_slice_to_constant(node)
         if resolved is not None:
             if isinstance(resolved, ast.Name):
+                self.num_scope_lookups += 1
                 if self.scope is None:
                     # FIXME: hack to make the static checker stop here
                     # In the future, it should *always* try to attempt to resolve
@@ -262,12 +268,18 @@ class SymbolRefVisitor(ast.NodeVisitor):
         return
 
 
-visit_stack: List[ast.AST] = []
+class _AnalysisState(threading.local):
+    def __init__(self) -> None:
+        # nodes being visited by ComputeLiveSymbolRefs, innermost last
+        self.visit_stack: List[ast.AST] = []
+        self.symbol_ref_visitor = SymbolRefVisitor()
 
 
-class SymbolRef:
-    _cached_symbol_ref_visitor = SymbolRefVisitor()
+# per thread, so that cells can be analyzed off of the shell thread
+analysis_state = _AnalysisState()
 
+
+class SymbolRef:
     def __init__(
         self,
         symbols: Union[ast.AST, Atom, Sequence[Atom]],
@@ -291,9 +303,11 @@ class SymbolRef:
             ),
         ):
             ast_range = ast_range or AstRange.from_ast_node(
-                symbols if hasattr(symbols, "lineno") else visit_stack[-1]
+                symbols
+                if hasattr(symbols, "lineno")
+                else analysis_state.visit_stack[-1]
             )
-            symbols = self._cached_symbol_ref_visitor(symbols, scope=scope).chain
+            symbols = analysis_state.symbol_ref_visitor(symbols, scope=scope).chain
         elif isinstance(symbols, ast.AST):  # pragma: no cover
             raise TypeError("unexpected type for %s" % symbols)
         elif isinstance(symbols, Atom):
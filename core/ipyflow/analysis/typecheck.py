@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Typechecking of the slices that ipyflow builds for cells when
+``mark_typecheck_failures_unsafe`` is enabled. When mypy is importable, slices
+are checked in-process with ``mypy.api``, against an incremental cache directory
+that lives as long as the service, so that only the first check pays for loading
+the standard library stubs. Slices for several cells are checked in a single
+mypy run (one module per slice), and results are cached by slice hash. Slices
+that mypy did not get to check (for example, because it failed) are reported as
+typechecking but are not cached. Without an importable mypy, each slice is
+checked with the ``mypy`` executable instead.
+"""
+
+import hashlib
+import logging
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import weakref
+from typing import Any, Dict, Hashable, List, Mapping, NamedTuple, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+_MYPY_ARGS = [
+    "--follow-imports=silent",
+    "--hide-error-context",
+    "--no-color-output",
+    "--no-error-summary",
+    "--show-absolute-path",
+]
+
+
+def _import_mypy_api() -> Optional[Any]:
+    try:
+        from mypy import api
+    except ImportError:
+        return None
+    return api
+
+
+class TypecheckResult(NamedTuple):
+    typechecks: bool
+    # mypy's output lines for the slice, with line numbers relative to the slice
+    diagnostics: List[str]
+
+
+_TYPECHECKS = TypecheckResult(True, [])
+
+_KeyType = TypeVar("_KeyType", bound=Hashable)
+
+
+def _hash_slice(typecheck_slice: str) -> str:
+    return hashlib.sha1(typecheck_slice.encode("utf-8")).hexdigest()
+
+
+class TypecheckService:
+    def __init__(self, max_cached_results: int = 1024) -> None:
+        self.max_cached_results = max_cached_results
+        self._results: Dict[str, TypecheckResult] = {}
+        self._mypy_api = _import_mypy_api()
+        self._workdir: Optional[str] = None
+        self.num_mypy_runs = 0
+
+    def _get_workdir(self) -> str:
+        if self._workdir is None:
+            self._workdir = tempfile.mkdtemp(prefix="ipyflow-typecheck-")
+            weakref.finalize(self, shutil.rmtree, self._workdir, True)
+        return self._workdir
+
+    def _put(self, slice_hash: str, result: TypecheckResult) -> None:
+        if len(self._results) >= self.max_cached_results:
+            # evict the oldest result
+            self._results.pop(next(iter(self._results)))
+        self._results[slice_hash] = result
+
+    def typecheck(self, typecheck_slice: str) -> TypecheckResult:
+        return self.typecheck_many({0: typecheck_slice})[0]
+
+    def typecheck_many(
+        self, slices: Mapping[_KeyType, str]
+    ) -> Dict[_KeyType, TypecheckResult]:
+        """Typecheck each of the given slices, checking all uncached ones at once."""
+        hashes = {
+            key: _hash_slice(typecheck_slice) for key, typecheck_slice in slices.items()
+        }
+        uncached = {
+            slice_hash: slices[key]
+            for key, slice_hash in hashes.items()
+            if slice_hash not in self._results
+        }
+        if len(uncached) > 0:
+            if self._mypy_api is None:
+                results = self._run_mypy_executable(uncached)
+            else:
+                results = self._run_mypy_api(uncached)
+            for slice_hash, result in results.items():
+                self._put(slice_hash, result)
+        return {
+            key: self._results.get(slice_hash, _TYPECHECKS)
+            for key, slice_hash in hashes.items()
+        }
+
+    def _run_mypy_api(self, slices: Dict[str, str]) -> Dict[str, TypecheckResult]:
+        mypy_api = self._mypy_api
+        assert mypy_api is not None
+        workdir = self._get_workdir()
+        path_by_hash: Dict[str, str] = {}
+        for slice_hash, typecheck_slice in slices.items():
+            path = os.path.join(workdir, "ipyflow_slice_%s.py" % slice_hash)
+            with open(path, "w") as f:
+                f.write(typecheck_slice)
+            path_by_hash[slice_hash] = path
+        args = [*_MYPY_ARGS, "--cache-dir", os.path.join(workdir, ".mypy_cache")]
+        self.num_mypy_runs += 1
+        # mypy raises the recursion limit for itself and never lowers it again,
+        # which would let runaway recursion in user code overflow the C stack
+        recursion_limit = sys.getrecursionlimit()
+        try:
+            stdout, stderr, status = mypy_api.run(args + list(path_by_hash.values()))
+        except Exception:
+            logger.exception("Exception occurred during type checking")
+            return {}
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+            for path in path_by_hash.values():
+                os.unlink(path)
+        diagnostics_by_path: Dict[str, List[str]] = {}
+        for line in stdout.splitlines():
+            path, sep, diagnostic = line.partition(".py:")
+            if sep:
+                diagnostics_by_path.setdefault(path + ".py", []).append(
+                    "line %s" % diagnostic
+                )
+        results = {}
+        if status == 2:
+            # mypy stops at blocking errors (such as syntax errors) before
+            # checking the other slices, so those are checked again without the
+            # offending slices; if there are none, mypy itself failed
+            blocking = {
+                slice_hash: path
+                for slice_hash, path in path_by_hash.items()
+                if path in diagnostics_by_path
+            }
+            if len(blocking) == 0:
+                logger.warning("mypy failed: %s", stderr)
+                return {}
+            for slice_hash, path in blocking.items():
+                results[slice_hash] = TypecheckResult(False, diagnostics_by_path[path])
+            remaining = {
+                slice_hash: typecheck_slice
+                for slice_hash, typecheck_slice in slices.items()
+                if slice_hash not in blocking
+            }
+            if len(remaining) > 0:
+                results.update(self._run_mypy_api(remaining))
+            return results
+        for slice_hash, path in path_by_hash.items():
+            diagnostics = diagnostics_by_path.get(path, [])
+            typechecks = not any(": error: " in diag for diag in diagnostics)
+            results[slice_hash] = TypecheckResult(typechecks, diagnostics)
+        return results
+
+    def _run_mypy_executable(
+        self, slices: Dict[str, str]
+    ) -> Dict[str, TypecheckResult]:
+        results = {}
+        for slice_hash, typecheck_slice in slices.items():
+            self.num_mypy_runs += 1
+            try:
+                proc = subprocess.run(
+                    f"mypy -c {shlex.quote(typecheck_slice)}",
+                    shell=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    universal_newlines=True,
+                )
+            except Exception:
+                logger.exception("Exception occurred during type checking")
+                continue
+            results[slice_hash] = TypecheckResult(
+                proc.returncode == 0, proc.stdout.splitlines()
+            )
+        return results
@@ -7,7 +7,9 @@ from ipyflow.api.lift import (
     lift,
     mutate,
     rdeps,
+    rdeps_many,
     rusers,
+    rusers_many,
     set_tag,
     timestamp,
     unset_tag,
@@ -22,8 +24,10 @@ __all__ = [
     "lift",
     "mutate",
     "rdeps",
+    "rdeps_many",
     "reproduce_cell",
     "rusers",
+    "rusers_many",
     "set_tag",
     "stderr",
     "stdout",
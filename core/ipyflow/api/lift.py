@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
-from typing import TYPE_CHECKING, Any, List, Set, Union, cast
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Union, cast
 
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.singletons import flow
 from ipyflow.tracing.watchpoint import Watchpoints
 
 if TYPE_CHECKING:
@@ -79,41 +80,62 @@ def mutate(sym: Any) -> None:
     _validate(sym).mutate()
 
 
-def _traverse(sym: Symbol, seen: Set[Symbol], attr: str) -> None:
-    if sym in seen:
-        return
-    seen.add(sym)
-    for related in getattr(sym, attr).keys():
-        _traverse(related, seen, attr)
+def _non_anonymous(syms: Iterable[Symbol]) -> List[Symbol]:
+    return [sym for sym in syms if not sym.is_anonymous]
 
 
-def rdeps(sym: Any) -> List[Symbol]:
+def rdeps(sym: Any, max_depth: Optional[int] = None) -> List[Symbol]:
     """
     Given the programmatic usage of some symbol, look up the
-    corresponding recursive dependencies for that symbol.
+    corresponding recursive dependencies for that symbol,
+    up to `max_depth` edges away (if given).
     """
     # See the `argument` handler in ipyflow_tracer for the
     # actual implementation; this is just a stub that ensures
     # that handler was able to find something.
     sym = _validate(sym)
-    seen: Set[Symbol] = set()
-    _traverse(sym, seen, "parents")
-    return [v for v in (seen - {sym}) if not v.is_anonymous]
+    return _non_anonymous(flow().closure_index.rdeps(sym, max_depth=max_depth))
 
 
-def rusers(sym: Any) -> List[Symbol]:
+def rusers(sym: Any, max_depth: Optional[int] = None) -> List[Symbol]:
     """
-    Given the programmatic usage of some symbol,
-    look up the corresponding users of that symbol.
+    Given the programmatic usage of some symbol, look up the
+    corresponding recursive users of that symbol,
+    up to `max_depth` edges away (if given).
     """
     # See the `argument` handler in ipyflow_tracer for the
     # actual implementation; this is just a stub that ensures
     # that handler was able to find something.
     sym = _validate(sym)
-    seen: Set[Symbol] = set()
-    _traverse(sym, seen, "children")
-    ret = [v for v in (seen - {sym}) if not v.is_anonymous]
-    return ret
+    return _non_anonymous(flow().closure_index.rusers(sym, max_depth=max_depth))
+
+
+def rdeps_many(
+    syms: Iterable[Any], max_depth: Optional[int] = None
+) -> Dict[Symbol, List[Symbol]]:
+    """
+    Given several symbols (e.g. as returned by `lift`), look up the
+    recursive dependencies of each, sharing work between them.
+    """
+    closure_index = flow().closure_index
+    return {
+        sym: _non_anonymous(closure_index.rdeps(sym, max_depth=max_depth))
+        for sym in map(_validate, syms)
+    }
+
+
+def rusers_many(
+    syms: Iterable[Any], max_depth: Optional[int] = None
+) -> Dict[Symbol, List[Symbol]]:
+    """
+    Given several symbols (e.g. as returned by `lift`), look up the
+    recursive users of each, sharing work between them.
+    """
+    closure_index = flow().closure_index
+    return {
+        sym: _non_anonymous(closure_index.rusers(sym, max_depth=max_depth))
+        for sym in map(_validate, syms)
+    }
 
 
 def watchpoints(sym: Any) -> Watchpoints:
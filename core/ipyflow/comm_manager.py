@@ -6,12 +6,15 @@ from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Set
 
 import pyccolo as pyc
 
+from ipyflow.analysis.background import get_shell_thread_scheduler
 from ipyflow.analysis.resolved_symbols import ResolvedSymbol
 from ipyflow.analysis.symbol_ref import SymbolRef
 from ipyflow.config import ExecutionSchedule
 from ipyflow.data_model.cell import cells
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.profiling import profiled_section
+from ipyflow.reactive_scheduler import ReactiveScheduler
 from ipyflow.singletons import shell
 from ipyflow.types import IdType
 
@@ -37,7 +40,13 @@ class CommManager:
             str, Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
         ] = {}
         self._comm: "Optional[BaseComm]" = None
-        self.debounced_exec_schedule_pending = False
+        self.reactive_scheduler = ReactiveScheduler(self)
+        # bumped for each content change, so that a change whose processing was
+        # deferred until its static analysis finished can tell if it is stale
+        self._content_change_generation = 0
+        # accumulated across deferred content changes until one is processed
+        self._pending_cell_order_change = False
+        self._pending_cell_structure_change = False
 
         # Register default handlers
         self._register_default_handlers()
@@ -62,6 +71,7 @@ class CommManager:
         self.register_comm_handler(
             "register_dynamic_comm_handler", self.handle_register_dynamic_comm_handler
         )
+        self.register_comm_handler("get_profile_stats", self.handle_get_profile_stats)
 
     def register_comm_target(self, kernel: "Optional[IPythonKernel]" = None) -> None:
         """Register the comm target with the kernel (or the active comm manager).
@@ -97,8 +107,17 @@ class CommManager:
             logger.error(dbg_msg)
             self.flow._saved_debug_message = dbg_msg
             return
+        self._respond(request_type, lambda: handler(request), comm=comm)
+
+    def _respond(
+        self,
+        request_type: str,
+        compute_response: Callable[[], Optional[Dict[str, Any]]],
+        comm=None,
+    ) -> None:
         try:
-            response = handler(request)
+            with profiled_section("comm.%s" % request_type):
+                response = compute_response()
         except Exception as e:
             response = {
                 "success": False,
@@ -129,14 +148,15 @@ class CommManager:
         @comm.on_msg
         def _responder(msg):
             request = msg["content"]["data"]
-            if (
-                request.get("type") == "compute_exec_schedule"
-                and self.debounced_exec_schedule_pending
-            ):
-                return
+            if request.get("type") == "compute_exec_schedule":
+                # answer kernel-side requests made before this one first
+                self.reactive_scheduler.flush()
             self.handle(request, comm=comm)
 
         self._comm = comm
+        scheduler = get_shell_thread_scheduler()
+        self.flow.static_analysis_worker.schedule_on_shell_thread = scheduler
+        self.reactive_scheduler.schedule_on_shell_thread = scheduler
         self.flow.initialize(**open_msg.get("content", {}).get("data", {}))
         comm.send({"type": "establish", "success": True})
 
@@ -155,6 +175,8 @@ class CommManager:
     ) -> Optional[Dict[str, Any]]:
         if not self.flow.mut_settings.dataflow_enabled:
             return {"success": False, "error": "dataflow not enabled"}
+        if not self._merge_cell_metadata_delta(request):
+            return self._make_resync_response()
         is_reactively_executing = request.get("is_reactively_executing", False)
         if self.flow.active_cell_id is None:
             active_cell_id = request.get("active_cell_id")
@@ -168,6 +190,9 @@ class CommManager:
             self._handle_notify_content_changed_impl(
                 request, is_reactively_executing=is_reactively_executing
             )
+        else:
+            # supersedes any content change deferred on its static analysis
+            self._content_change_generation += 1
         try:
             self.flow._add_parents_for_override_live_refs()
         except KeyError:
@@ -218,6 +243,7 @@ class CommManager:
             | self.flow.settings.to_json().items()
         )
         response["executed_cells"] = list(cells().all_executed_cell_ids())
+        response["content_seq"] = self.flow._prev_cell_metadata_seq
         return response
 
     def handle_compute_exec_schedule(
@@ -252,6 +278,8 @@ class CommManager:
                 should_recompute_exec_schedule = True
         if not should_recompute_exec_schedule:
             return False
+        worker = self.flow.static_analysis_worker
+        worker.publish()
         should_recompute_exec_schedule = False
         for cell_id, content in content_by_cell_id.items():
             cell = cells().from_id_nullable(cell_id)
@@ -260,7 +288,7 @@ class CommManager:
             prev_content = cell.current_content
             try:
                 cell.current_content = content
-                cell.to_ast()
+                cell.to_ast(parsed=worker.pop_parsed_tree(cell_id))
                 result = cell.check_and_resolve_symbols(
                     update_liveness_time_versions=True,
                 )
@@ -286,9 +314,85 @@ class CommManager:
                 cell.current_content = prev_content
         return should_recompute_exec_schedule
 
+    def _merge_cell_metadata_delta(self, request: Dict[str, Any]) -> bool:
+        """
+        Instead of the full ``cell_metadata_by_id`` map, the frontend may send a
+        ``cell_metadata_delta`` with the metadata of the cells that were added,
+        moved, or edited (only the keys that changed for existing cells) and the
+        ids of the cells that were removed, relative to the payload it sent with
+        sequence number ``base_seq``. If that is also the payload reflected in our
+        copy of the metadata, merge the delta into a new full map on the request.
+        Otherwise the two sides have diverged (e.g., a message was dropped or the
+        comm was reopened), and we return False so that the frontend resends the
+        full map.
+        """
+        delta = request.pop("cell_metadata_delta", None)
+        if delta is None:
+            return True
+        prev_cell_metadata_by_id = self.flow._prev_cell_metadata_by_id
+        if (
+            prev_cell_metadata_by_id is None
+            or delta["base_seq"] != self.flow._prev_cell_metadata_seq
+        ):
+            return False
+        removed = set(delta.get("removed", []))
+        cell_metadata_by_id = {
+            cell_id: metadata
+            for cell_id, metadata in prev_cell_metadata_by_id.items()
+            if cell_id not in removed
+        }
+        for cell_id, changed in delta.get("changed", {}).items():
+            metadata = dict(cell_metadata_by_id.get(cell_id, {}))
+            metadata.update(changed)
+            cell_metadata_by_id[cell_id] = metadata
+        request["cell_metadata_by_id"] = cell_metadata_by_id
+        request["content_seq"] = delta["seq"]
+        return True
+
+    def _make_resync_response(self) -> Dict[str, Any]:
+        return {
+            "type": "notify_content_changed",
+            "resync_required": True,
+            "content_seq": self.flow._prev_cell_metadata_seq,
+        }
+
+    def _prefetch_static_analysis(self, content_by_cell_id: Dict[IdType, str]) -> bool:
+        """
+        Submit the cells whose content changed to the static analysis worker.
+        Returns whether any of them are being analyzed in the background.
+        """
+        worker = self.flow.static_analysis_worker
+        if not self.flow.mut_settings.background_static_analysis:
+            return False
+        elif not worker.is_available:
+            return False
+        is_any_submitted = False
+        for cell_id, content in content_by_cell_id.items():
+            cell = cells().from_id_nullable(cell_id)
+            if cell is None or cell.current_content == content:
+                continue
+            rewriter, sanitized_content = cell._rewriter_and_sanitized_content(
+                raw_cell=cell.get_memoized_content(content) or content
+            )
+            is_any_submitted = (
+                worker.submit(
+                    cell_id,
+                    sanitized_content,
+                    include_killed_live=cell.cell_ctr > 0,
+                    rewriter=rewriter,
+                )
+                or is_any_submitted
+            )
+        return is_any_submitted
+
     def _handle_notify_content_changed_impl(
-        self, request: Dict[str, Any], is_reactively_executing: bool = False
+        self,
+        request: Dict[str, Any],
+        is_reactively_executing: bool = False,
+        allow_deferral: bool = False,
     ) -> Optional[Dict[str, Any]]:
+        if not self._merge_cell_metadata_delta(request):
+            return self._make_resync_response()
         cell_metadata_by_id = request.get(
             "cell_metadata_by_id", self.flow._prev_cell_metadata_by_id
         )
@@ -298,6 +402,8 @@ class CommManager:
         is_cell_structure_change = self.flow._prev_cell_metadata_by_id is None or len(
             self.flow._prev_cell_metadata_by_id
         ) != len(cell_metadata_by_id)
+        if "cell_metadata_by_id" in request:
+            self.flow._prev_cell_metadata_seq = request.get("content_seq", 0)
         self.flow._prev_cell_metadata_by_id = cell_metadata_by_id
         cell_metadata_by_id = {
             cell_id: metadata
@@ -334,10 +440,52 @@ class CommManager:
         cells().set_override_refs(
             override_live_refs_by_cell_id, override_dead_refs_by_cell_id
         )
+        self._content_change_generation += 1
+        self._pending_cell_order_change |= order_index_by_id != prev_order_idx_by_id
+        self._pending_cell_structure_change |= is_cell_structure_change
+        if (
+            allow_deferral
+            and not is_reactively_executing
+            and self._prefetch_static_analysis(content_by_cell_id)
+        ):
+            # finish up on the shell thread once the analysis is done, unless
+            # newer content arrives in the meantime (in which case it takes over)
+            generation = self._content_change_generation
+
+            def finish_if_current() -> None:
+                if generation != self._content_change_generation:
+                    return
+                self._respond(
+                    "notify_content_changed",
+                    lambda: self._finish_content_changed(
+                        request, content_by_cell_id, order_index_by_id
+                    ),
+                )
+
+            self.flow.static_analysis_worker.call_when_idle(finish_if_current)
+            return self.NO_RESPONSE  # type: ignore[return-value]
+        return self._finish_content_changed(
+            request,
+            content_by_cell_id,
+            order_index_by_id,
+            is_reactively_executing=is_reactively_executing,
+        )
+
+    def _finish_content_changed(
+        self,
+        request: Dict[str, Any],
+        content_by_cell_id: Dict[IdType, str],
+        order_index_by_id: Dict[IdType, int],
+        is_reactively_executing: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        is_cell_order_change = self._pending_cell_order_change
+        is_cell_structure_change = self._pending_cell_structure_change
+        self._pending_cell_order_change = False
+        self._pending_cell_structure_change = False
         should_recompute_exec_schedule = (
             not is_reactively_executing
             and self._recompute_ast_for_cells(
-                content_by_cell_id, force=order_index_by_id != prev_order_idx_by_id
+                content_by_cell_id, force=is_cell_order_change
             )
         ) or is_cell_structure_change
         placeholder_cells = cells().with_placeholder_ids()
@@ -359,14 +507,16 @@ class CommManager:
                 request, notify_content_changed=False, allow_new_ready=False
             )
         else:
-            return None
+            return {"content_seq": self.flow._prev_cell_metadata_seq}
 
     def handle_notify_content_changed(
         self, request: Dict[str, Any], is_reactively_executing: bool = False
     ) -> Optional[Dict[str, Any]]:
         """Handle notify content changed request."""
         return self._handle_notify_content_changed_impl(
-            request, is_reactively_executing=is_reactively_executing
+            request,
+            is_reactively_executing=is_reactively_executing,
+            allow_deferral=True,
         )
 
     def handle_reactivity_cleanup(self, _request=None) -> None:
@@ -379,6 +529,7 @@ class CommManager:
             sym = SymbolRef.resolve(symbol_str)
             if sym is not None:
                 sym.refresh(take_timestamp_snapshots=False)
+        cells().invalidate_check_caches()
         return None
 
     def handle_upsert_symbol(self, request) -> Optional[Dict[str, Any]]:
@@ -400,6 +551,7 @@ class CommManager:
             self.flow.global_scope.upsert_symbol_for_name(
                 symbol_name, obj, dep_symbols, ast.parse("pass").body[0]
             )
+        cells().invalidate_check_caches()
         return None
 
     def handle_get_code(self, request) -> Dict[str, Any]:
@@ -452,3 +604,27 @@ class CommManager:
             overwrite=request.get("overwrite", False),
         )
         return None
+
+    def handle_get_profile_stats(self, request) -> Dict[str, Any]:
+        """Handle get profile stats request."""
+        return {
+            "enabled": self.flow.profiler.enabled,
+            "stats": self.flow.stats.to_json(),
+            "reactive_schedule": self.reactive_scheduler.stats.to_json(),
+        }
+
+    def send_profile_stats(self, cell_ctr: int) -> None:
+        """Push the profile stats for the given cell execution to the frontend."""
+        if self._comm is None:
+            return
+        self._comm.send(
+            {
+                "type": "profile_stats",
+                "cell_ctr": cell_ctr,
+                "stats": {
+                    subsystem: stats.to_json()
+                    for subsystem, stats in self.flow.stats.for_cell(cell_ctr).items()
+                },
+                "success": True,
+            }
+        )
@@ -139,6 +139,14 @@ class MutableDataflowSettings(JsonSerializableMixin):
     syntax_transforms_enabled: bool
     syntax_transforms_only: bool
     max_external_call_depth_for_tracing: int
+    max_update_propagation_fanout: int
+    max_update_propagation_depth: int
+    background_static_analysis: bool
+    vectorized_staleness: bool
+    min_lazy_literal_size: int
+    max_value_fingerprint_bytes: int
+    max_symbol_versions: int
+    max_captured_stream_chars: int
     is_dev_mode: bool
 
     def slicing_contexts(self) -> List[SlicingContext]:
@@ -1,7 +1,31 @@
 # -*- coding: utf-8 -*-
-from typing import Tuple
+import sys
+from typing import Any, Tuple
 
+# classes whose columns can be accessed both as attributes and as subscripts
 DUPED_ATTRSUB_CLASSES: Tuple[Tuple[str, str], ...] = (
     ("pandas", "DataFrame"),
     ("modin.pandas", "DataFrame"),
 )
+
+
+def is_duped_attrsub_obj(obj: Any) -> bool:
+    for modname, classname in DUPED_ATTRSUB_CLASSES:
+        module = sys.modules.get(modname)
+        if module is None:
+            continue
+        clazz = getattr(module, classname, None)
+        if clazz is not None and isinstance(obj, clazz):
+            return True
+    return False
+
+
+def is_column_of(obj: Any, name: Any) -> bool:
+    """Whether `name` labels a column of the (pandas or modin) frame `obj`."""
+    if not is_duped_attrsub_obj(obj):
+        return False
+    try:
+        return name in obj.columns
+    except Exception:
+        # e.g. unhashable labels
+        return False
@@ -2,8 +2,6 @@
 import ast
 import inspect
 import logging
-import shlex
-import subprocess
 from collections import defaultdict
 from contextlib import contextmanager
 from typing import (
@@ -29,12 +27,13 @@ from IPython import get_ipython
 from ipyflow.analysis.live_refs import (
     LiveSymbolRef,
     SymbolRef,
-    compute_live_dead_symbol_refs,
+    get_analysis_settings,
     get_live_symbols_and_cells_for_references,
     get_symbols_for_references,
     mark_placeholder_nodes,
 )
 from ipyflow.analysis.resolved_symbols import ResolvedSymbol
+from ipyflow.analysis.typecheck import TypecheckResult
 from ipyflow.config import ExecutionSchedule, FlowDirection, Interface
 from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.memoization import (
@@ -44,9 +43,20 @@ from ipyflow.memoization import (
     MemoizedOutputLevel,
     parse_verbosity,
 )
+from ipyflow.memoization.store import (
+    PersistedCellExecution,
+    PersistedOutput,
+    digest_memoize_comparable,
+)
 from ipyflow.models import _CodeCellContainer, cells, statements, symbols
+from ipyflow.profiling import profiled
 from ipyflow.singletons import flow, shell
-from ipyflow.slicing.mixin import FormatType, Slice, SliceableMixin
+from ipyflow.slicing.mixin import (
+    FormatType,
+    Slice,
+    SliceableMixin,
+    bump_slice_graph_version,
+)
 from ipyflow.tracing.output_recorder import IPyflowCapturedIO
 from ipyflow.types import IdType, TimestampOrCounter
 from ipyflow.utils.ipython_utils import _IPY
@@ -95,6 +105,7 @@ class Cell(SliceableMixin):
     _reactive_cells_by_tag: Dict[str, Set[IdType]] = defaultdict(set)
     _override_current_cell: Optional["Cell"] = None
     _memoized_executions: Dict[str, Dict[int, MemoizedCellExecution]] = {}
+    _check_cache_epoch: int = 0
 
     def __init__(
         self,
@@ -111,6 +122,7 @@ class Cell(SliceableMixin):
         self.last_check_content: Optional[str] = None
         self.last_check_cell_ctr: Optional[int] = None
         self.last_check_result: Optional[CheckerResult] = None
+        self._cached_check: Optional[Tuple[Tuple[Any, ...], CheckerResult]] = None
         self.error_in_exec: Optional[BaseException] = None
         self.history: List[int] = [cell_ctr] if cell_ctr > -1 else []
         self.executed_content: Optional[str] = None
@@ -136,14 +148,20 @@ class Cell(SliceableMixin):
             set
         )
         self._cached_ast: Optional[ast.Module] = None
+        # the sanitized source that _cached_ast was parsed from, if any; ASTs
+        # passed as overrides are copies of the AST parsed from the same content
+        self._cached_ast_source: Optional[str] = None
         self._cached_typecheck_result: Optional[bool] = (
             None if flow().settings.mark_typecheck_failures_unsafe else True
         )
+        # mypy's output for the last typecheck of this cell
+        self.typecheck_diagnostics: List[str] = []
         self._ready: bool = False
         self._extra_stmt: Optional[ast.stmt] = None
         self._placeholder_id = placeholder_id
         self.memoized_output_level = memoized_output_level
         self.skipped_due_to_memoization_ctr = -1
+        self.persisted_memoized_execution: Optional[PersistedCellExecution] = None
 
     @property
     def id(self) -> IdType:
@@ -245,12 +263,15 @@ class Cell(SliceableMixin):
 
     @classmethod
     def clear(cls):
+        bump_slice_graph_version()
         cls._current_cell_by_cell_id = {}
         cls._cell_by_cell_ctr = {}
         cls._cell_counter = 0
         cls._position_by_cell_id = {}
         cls._cells_by_tag.clear()
         cls._reactive_cells_by_tag.clear()
+        # timestamps from before the counter reset won't be created again
+        Timestamp.clear_interned()
 
     @classmethod
     def with_placeholder_ids(cls):
@@ -370,6 +391,47 @@ class Cell(SliceableMixin):
             self.captured_output,
             self.cell_ctr,
         )
+        self._maybe_persist_memoized_execution(
+            inputs.values(), outputs.values(), self.captured_output
+        )
+
+    def _maybe_persist_memoized_execution(
+        self,
+        inputs: Iterable[MemoizedInput],
+        outputs: Iterable[MemoizedOutput],
+        captured_output: IPyflowCapturedIO,
+    ) -> None:
+        store = flow().memoization_store
+        if store is None:
+            return
+        input_digests: Dict[str, str] = {}
+        for inp in inputs:
+            if inp.comparable is symbols().NULL or not isinstance(inp.symbol.name, str):
+                # without a comparable, there is nothing to match against later
+                return
+            digest = digest_memoize_comparable(inp.comparable)
+            if digest is None:
+                return
+            input_digests[inp.symbol.name] = digest
+        persisted_outputs = []
+        for out in outputs:
+            if not isinstance(out.symbol.name, str):
+                return
+            persisted_outputs.append(
+                PersistedOutput(
+                    out.symbol.name, out.ts_at_execution.stmt_num, out.value
+                )
+            )
+        assert self.executed_content is not None
+        store.put(
+            self.executed_content,
+            PersistedCellExecution(
+                input_digests,
+                persisted_outputs,
+                captured_output,
+                shell().user_ns.get("Out", {}).get(self.cell_ctr),
+            ),
+        )
 
     @classmethod
     def create_and_track(
@@ -382,6 +444,7 @@ class Cell(SliceableMixin):
         placeholder_id: bool = False,
         memoized_output_level: Optional[MemoizedOutputLevel] = None,
     ) -> "Cell":
+        bump_slice_graph_version()
         if bump_cell_counter:
             cls._cell_counter += 1
             cell_ctr = cls._cell_counter
@@ -578,10 +641,42 @@ class Cell(SliceableMixin):
         return self.raw_and_sanitized_content()[1]
 
     def get_memoized_counter(self) -> Optional[int]:
+        if not self.is_memoized:
+            return None
         prev_cell = self.prev_cell
-        if not self.is_memoized or prev_cell is None:
+        if prev_cell is not None:
+            ctr = self._get_memoized_counter_from_prev_executions(prev_cell)
+            if ctr is not None:
+                return ctr
+        return self._get_memoized_counter_from_store()
+
+    def _get_memoized_counter_from_store(self) -> Optional[int]:
+        if self.persisted_memoized_execution is not None:
+            return self.cell_ctr
+        store = flow().memoization_store
+        if store is None:
+            return None
+
+        def digest_for_input(name: str) -> Optional[str]:
+            sym = flow().global_scope.lookup_symbol_by_name_this_indentation(name)
+            if sym is None:
+                return None
+            comparable = sym.make_memoize_comparable()[0]
+            if comparable is symbols().NULL:
+                return None
+            return digest_memoize_comparable(comparable)
+
+        self.persisted_memoized_execution = store.lookup(
+            self.executed_content or "", digest_for_input
+        )
+        if self.persisted_memoized_execution is None:
             return None
+        else:
+            return self.cell_ctr
 
+    def _get_memoized_counter_from_prev_executions(
+        self, prev_cell: "Cell"
+    ) -> Optional[int]:
         symbols_ = symbols()
         for (
             inputs,
@@ -670,7 +765,16 @@ class Cell(SliceableMixin):
         finally:
             self.__class__._override_current_cell = orig_override
 
-    def to_ast(self, override: Optional[ast.Module] = None) -> ast.Module:
+    def to_ast(
+        self,
+        override: Optional[ast.Module] = None,
+        parsed: Optional[Tuple[str, ast.Module]] = None,
+    ) -> ast.Module:
+        """
+        The cell's instrumented AST. If given, `parsed` is a sanitized source
+        along with its (uninstrumented) tree, which is used instead of parsing
+        the current content when the sanitized sources match.
+        """
         if override is not None:
             self._cached_ast = override
             return self._cached_ast
@@ -682,7 +786,11 @@ class Cell(SliceableMixin):
         ):
             path = self.make_ipython_name()
             rewriter, content = self._rewriter_and_sanitized_content(path=path)
-            self._cached_ast = ast.parse(content)
+            if parsed is not None and parsed[0] == content:
+                self._cached_ast = parsed[1]
+            else:
+                self._cached_ast = ast.parse(content)
+            self._cached_ast_source = content
             self.last_ast_content = self.current_content
             if rewriter is not None:
                 with self.override_current_cell():
@@ -791,8 +899,9 @@ class Cell(SliceableMixin):
                 live_symbol_refs,
                 dead_symbol_refs,
                 modified_symbol_refs,
-            ) = compute_live_dead_symbol_refs(
+            ) = flow().live_refs_cache.compute_live_dead_symbol_refs(
                 self.to_ast(),
+                self._cached_ast_source,
                 scope=flow().global_scope,
                 include_killed_live=self.cell_ctr > 0,
             )
@@ -813,9 +922,45 @@ class Cell(SliceableMixin):
             update_liveness_time_versions,
         )
 
+    def _make_check_cache_key(self) -> Tuple[Any, ...]:
+        # symbol timestamps only move when something executes, so the execution
+        # counter stands in for them; everything else the check reads is local
+        return (
+            self.current_content,
+            self.last_check_content in (None, self.current_content),
+            self.cell_ctr,
+            flow().cell_counter(),
+            tuple(self.override_live_refs or ()),
+            tuple(self.override_dead_refs or ()),
+            self._cached_typecheck_result,
+            self._check_cache_epoch,
+            get_analysis_settings(),
+        )
+
+    @classmethod
+    def invalidate_check_caches(cls) -> None:
+        """Call when symbols change outside of a cell execution."""
+        cls._check_cache_epoch += 1
+
+    @profiled("cell.check_and_resolve_symbols")
     def check_and_resolve_symbols(
         self,
         update_liveness_time_versions: bool = False,
+    ) -> CheckerResult:
+        if update_liveness_time_versions:
+            # has side effects on symbol bookkeeping, so it always runs
+            self._cached_check = None
+            return self._check_and_resolve_symbols(update_liveness_time_versions)
+        cache_key = self._make_check_cache_key()
+        if self._cached_check is not None and self._cached_check[0] == cache_key:
+            return self._cached_check[1]
+        result = self._check_and_resolve_symbols(update_liveness_time_versions)
+        self._cached_check = (self._make_check_cache_key(), result)
+        return result
+
+    def _check_and_resolve_symbols(
+        self,
+        update_liveness_time_versions: bool,
     ) -> CheckerResult:
         (
             live_symbol_refs,
@@ -912,14 +1057,36 @@ class Cell(SliceableMixin):
             # assume it typechecks in this case
             return True
         typecheck_slice = self._build_typecheck_slice(live_cell_ctrs, live_symbols)
-        try:
-            # TODO: parse the output in order to pass up to the user
-            ret = subprocess.call(f"mypy -c {shlex.quote(typecheck_slice)}", shell=True)
-            self._cached_typecheck_result = ret == 0
-        except Exception:
-            logger.exception("Exception occurred during type checking")
-            self._cached_typecheck_result = True
-        return self._cached_typecheck_result
+        result = flow().typecheck_service.typecheck(typecheck_slice)
+        self.set_typecheck_result(result)
+        return result.typechecks
+
+    def compute_typecheck_slice(self) -> Optional[str]:
+        """
+        The slice that checking this cell will typecheck, or None if checking it
+        will not typecheck anything.
+        """
+        if not self.needs_typecheck or self.override_live_refs is not None:
+            return None
+        live_symbol_refs, *_ = self._get_live_dead_modified_symbol_refs(
+            update_liveness_time_versions=False
+        )
+        with flow().override_child_cell(self):
+            (
+                live_resolved_symbols,
+                live_cells,
+                _,
+            ) = get_live_symbols_and_cells_for_references(
+                live_symbol_refs,
+                flow().global_scope,
+                self.cell_ctr,
+                update_liveness_time_versions=False,
+            )
+        return self._build_typecheck_slice(live_cells, live_resolved_symbols)
+
+    def set_typecheck_result(self, result: TypecheckResult) -> None:
+        self._cached_typecheck_result = result.typechecks
+        self.typecheck_diagnostics = result.diagnostics
 
     @property
     def needs_typecheck(self):
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import ast
 import itertools
 import logging
 from types import ModuleType
@@ -16,9 +17,9 @@ from typing import (
 )
 
 from ipyflow.data_model.scope import Scope
-from ipyflow.data_model.symbol import Symbol
+from ipyflow.data_model.symbol import Symbol, SymbolType
 from ipyflow.data_model.timestamp import Timestamp
-from ipyflow.models import _NamespaceContainer, namespaces
+from ipyflow.models import _NamespaceContainer, cells, namespaces
 from ipyflow.singletons import flow
 from ipyflow.types import SupportedIndexType
 
@@ -81,8 +82,14 @@ class Namespace(Scope):
             flow_.namespaces[id(obj)] = self
         self._tombstone = False
         # this timestamp needs to be bumped in Symbol refresh()
-        self.max_descendent_timestamp: Timestamp = Timestamp.uninitialized()
+        self._max_descendent_timestamp: Timestamp = Timestamp.uninitialized()
         self._subscript_symbol_by_name: Dict[SupportedIndexType, Symbol] = {}
+        # objects for subscript symbols of literal elements that have not been
+        # created yet; see `defer_subscript_symbol_for_name()`
+        self._lazy_subscript_obj_by_name: Dict[SupportedIndexType, Any] = {}
+        self._lazy_subscript_stmt_node: Optional[ast.stmt] = None
+        self._lazy_subscript_defined_timestamp: Timestamp = Timestamp.uninitialized()
+        self._lazy_subscript_timestamp: Timestamp = Timestamp.uninitialized()
         self.namespace_waiting_symbols: Set[Symbol] = set()
         self._force_allow_iteration = force_allow_iteration
 
@@ -90,6 +97,20 @@ class Namespace(Scope):
     def is_namespace_scope(self):
         return True
 
+    @property
+    def max_descendent_timestamp(self) -> Timestamp:
+        return self._max_descendent_timestamp
+
+    @max_descendent_timestamp.setter
+    def max_descendent_timestamp(self, timestamp: Timestamp) -> None:
+        self._max_descendent_timestamp = timestamp
+        if not timestamp.is_initialized:
+            return
+        # symbols for this namespace's object inherit the timestamp
+        flow_ = flow()
+        for alias in flow_.aliases.get(self.obj_id, ()):
+            flow_.record_symbol_touched(alias, timestamp.cell_num)
+
     def __bool__(self) -> bool:
         # in order to override if __len__ returns 0
         return True
@@ -103,7 +124,11 @@ class Namespace(Scope):
 
     @property
     def size(self) -> int:
-        return len(self._subscript_symbol_by_name) + len(self._symbol_by_name)
+        return (
+            len(self._subscript_symbol_by_name)
+            + len(self._lazy_subscript_obj_by_name)
+            + len(self._symbol_by_name)
+        )
 
     def _iter_inner(self) -> Generator[Optional[Symbol], None, None]:
         if isinstance(self.obj, (list, tuple)):
@@ -163,6 +188,7 @@ class Namespace(Scope):
         if self.is_garbage:
             return
         self._tombstone = True
+        flow().pending_garbage_namespaces.add(self)
         for sym in self.all_symbols_this_indentation(exclude_class=True):
             sym.mark_garbage()
 
@@ -226,8 +252,99 @@ class Namespace(Scope):
         else:
             return name
 
+    def defer_subscript_symbol_for_name(
+        self, name: SupportedIndexType, obj: Any, stmt_node: ast.stmt
+    ) -> None:
+        """
+        Record a dependency-free literal element without creating its symbol.
+        The symbol is created the first time it is looked up, or before any
+        operation that renames or removes subscript symbols, and gets the
+        timestamp it would have had if it had been created eagerly.
+        """
+        if name in self._subscript_symbol_by_name:
+            self.upsert_symbol_for_name(
+                name,
+                obj,
+                set(),
+                stmt_node,
+                is_subscript=True,
+                implicit=False,
+                propagate=False,
+            )
+            return
+        self._lazy_subscript_obj_by_name[name] = obj
+        self._lazy_subscript_stmt_node = stmt_node
+        self._lazy_subscript_defined_timestamp = Timestamp.current()
+        self._lazy_subscript_timestamp = self._lazy_subscript_defined_timestamp
+
+    @property
+    def has_lazy_subscript_symbols(self) -> bool:
+        return len(self._lazy_subscript_obj_by_name) > 0
+
+    def refresh_lazy_subscript_symbols(self, timestamp: Timestamp) -> None:
+        if self.has_lazy_subscript_symbols:
+            self._lazy_subscript_timestamp = timestamp
+
+    def lazy_subscript_timestamps(
+        self, version_ubound: Optional[Timestamp] = None
+    ) -> Set[Timestamp]:
+        if not self.has_lazy_subscript_symbols:
+            return set()
+        elif version_ubound is None:
+            return {self._lazy_subscript_timestamp}
+        elif self._lazy_subscript_defined_timestamp <= version_ubound:
+            return {self._lazy_subscript_defined_timestamp}
+        else:
+            return set()
+
+    def _materialize_lazy_subscript_symbol(
+        self, name: SupportedIndexType
+    ) -> Optional[Symbol]:
+        try:
+            obj = self._lazy_subscript_obj_by_name.pop(name)
+        except (KeyError, TypeError):
+            return None
+        defined_ts = self._lazy_subscript_defined_timestamp
+        sym = Symbol(
+            name,
+            SymbolType.SUBSCRIPT,
+            obj,
+            self,
+            stmt_node=self._lazy_subscript_stmt_node,
+            timestamp=defined_ts,
+        )
+        self.put(name, sym)
+        sym.refresh(take_timestamp_snapshots=False, timestamp=defined_ts)
+        if self._lazy_subscript_timestamp != defined_ts:
+            sym.refresh(
+                take_timestamp_snapshots=False,
+                timestamp=self._lazy_subscript_timestamp,
+            )
+        sym._refresh_cached_obj()
+        self._record_lazy_subscript_write(sym)
+        return sym
+
+    def _record_lazy_subscript_write(self, sym: Symbol) -> None:
+        # same cell writes as if the symbol had been upserted with the literal
+        try:
+            cell = cells().at_timestamp(self._lazy_subscript_defined_timestamp)
+        except KeyError:
+            return
+        if any(
+            alias in cell.static_writes for alias in flow().aliases.get(self.obj_id, ())
+        ):
+            cell.static_writes.add(sym)
+        else:
+            cell.dynamic_writes.add(sym)
+
+    def materialize_lazy_subscript_symbols(self) -> None:
+        for name in list(self._lazy_subscript_obj_by_name.keys()):
+            self._materialize_lazy_subscript_symbol(name)
+
     def _lookup_subscript(self, name: SupportedIndexType) -> Optional[Symbol]:
         ret = self._subscript_symbol_by_name.get(name)
+        if ret is None and self.has_lazy_subscript_symbols:
+            ret = self._materialize_lazy_subscript_symbol(name)
         if (
             isinstance(self.obj, Sequence)
             and isinstance(name, int)
@@ -236,6 +353,8 @@ class Namespace(Scope):
             if name < 0 and ret is None:
                 name = len(self.obj) + name
                 ret = self._subscript_symbol_by_name.get(name)
+                if ret is None and self.has_lazy_subscript_symbols:
+                    ret = self._materialize_lazy_subscript_symbol(name)
         return ret
 
     def lookup_symbol_by_name_this_indentation(
@@ -290,6 +409,7 @@ class Namespace(Scope):
         subsym._is_dangling_on_edges = True
 
     def shuffle_symbols_upward_from(self, pos: int) -> None:
+        self.materialize_lazy_subscript_symbols()
         for idx in range(len(self.obj) - 1, pos, -1):
             prev_obj = self.obj[idx + 1] if idx < len(self.obj) - 1 else None
             self._remap_sym(idx - 1, idx, prev_obj)
@@ -303,6 +423,10 @@ class Namespace(Scope):
         self, name: SupportedIndexType, is_subscript: bool = False
     ) -> None:
         if is_subscript:
+            if isinstance(self.obj, list):
+                self.materialize_lazy_subscript_symbols()
+            else:
+                self._lookup_subscript(name)
             sym = self._subscript_symbol_by_name.pop(name, None)
             if sym is None and name == -1 and isinstance(self.obj, list):
                 name = len(
@@ -319,6 +443,7 @@ class Namespace(Scope):
     def all_symbols_this_indentation(
         self, exclude_class=False, is_subscript=None
     ) -> Iterable[Symbol]:
+        # note: excludes subscript symbols that have not been materialized yet
         if is_subscript is None:
             sym_collections_to_chain: List[Iterable] = [
                 self._symbol_by_name.values(),
@@ -378,6 +503,7 @@ class Namespace(Scope):
             containing_ns = containing_ns.parent_scope  # type: ignore
 
     def transfer_symbols_to(self, new_ns: "Namespace") -> None:
+        self.materialize_lazy_subscript_symbols()
         for sym in list(
             self.all_symbols_this_indentation(exclude_class=True, is_subscript=False)
         ):
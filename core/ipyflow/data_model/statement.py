@@ -10,7 +10,7 @@ import pyccolo as pyc
 
 from ipyflow.analysis.symbol_edges import get_symbol_edges
 from ipyflow.analysis.utils import stmt_contains_lval
-from ipyflow.data_model import DUPED_ATTRSUB_CLASSES
+from ipyflow.data_model import is_column_of
 from ipyflow.data_model.namespace import Namespace
 from ipyflow.data_model.scope import Scope
 from ipyflow.data_model.symbol import Symbol
@@ -18,7 +18,12 @@ from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.models import _StatementContainer, cells, statements
 from ipyflow.singletons import flow, shell, tracer
 from ipyflow.slicing.context import SlicingContext, static_slicing_context
-from ipyflow.slicing.mixin import FormatType, Slice, SliceableMixin
+from ipyflow.slicing.mixin import (
+    FormatType,
+    Slice,
+    SliceableMixin,
+    bump_slice_graph_version,
+)
 from ipyflow.tracing.symbol_resolver import resolve_rval_symbols
 from ipyflow.tracing.utils import match_container_obj_or_namespace_with_literal_nodes
 from ipyflow.types import IdType, TimestampOrCounter
@@ -119,6 +124,7 @@ class Statement(SliceableMixin):
         timestamp: Optional[Timestamp] = None,
         override: bool = False,
     ) -> "Statement":
+        bump_slice_graph_version()
         stmt_id = id(stmt_node)
         prev_stmt = cls.from_id(stmt_id) if cls.has_id(stmt_id) else None
         stmt = cls(
@@ -162,6 +168,7 @@ class Statement(SliceableMixin):
 
     @classmethod
     def clear(cls):
+        bump_slice_graph_version()
         cls._stmts_by_ts = {}
 
     @classmethod
@@ -338,18 +345,8 @@ class Statement(SliceableMixin):
         ):
             obj.__name__ = target.id
         subscript_vals_to_use = [is_subscript]
-        if scope.is_namespace_scope:
-            namespace = cast(Namespace, scope)
-            for modname, classname in DUPED_ATTRSUB_CLASSES:
-                module = sys.modules.get(modname)
-                if module is None:
-                    continue
-                clazz = getattr(module, classname, None)
-                if clazz is None:
-                    continue
-                if isinstance(namespace.obj, clazz) and name in namespace.obj.columns:
-                    subscript_vals_to_use.append(not is_subscript)
-                    break
+        if scope.is_namespace_scope and is_column_of(cast(Namespace, scope).obj, name):
+            subscript_vals_to_use.append(not is_subscript)
         for subscript_val in subscript_vals_to_use:
             upserted = scope.upsert_symbol_for_name(
                 name,
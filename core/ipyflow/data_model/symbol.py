@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import ast
+import itertools
 import logging
 import sys
 from enum import Enum
@@ -20,7 +21,7 @@ from typing import (
     cast,
 )
 
-from ipyflow.config import ExecutionSchedule, FlowDirection
+from ipyflow.config import FlowDirection
 from ipyflow.data_model.cell import Cell, cells
 from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.data_model.utils.annotation_utils import (
@@ -28,13 +29,20 @@ from ipyflow.data_model.utils.annotation_utils import (
     make_annotation_string,
 )
 from ipyflow.data_model.utils.update_protocol import UpdateProtocol
+from ipyflow.data_model.utils.version_log import VersionLog
+from ipyflow.memoization.fingerprint import (
+    Fingerprint,
+    fingerprint_ndarray,
+    fingerprint_pandas,
+    fingerprint_value,
+)
 from ipyflow.models import _SymbolContainer, namespaces, statements, symbols
-from ipyflow.singletons import flow, shell, tracer
+from ipyflow.singletons import flow, shell, tracer, tracer_initialized
 from ipyflow.slicing.context import dynamic_slicing_context, slicing_context
 from ipyflow.slicing.mixin import FormatType, Slice
 from ipyflow.tracing.watchpoint import Watchpoints
 from ipyflow.types import IMMUTABLE_PRIMITIVE_TYPES, IdType, SupportedIndexType
-from ipyflow.utils.misc_utils import cleanup_discard, debounce
+from ipyflow.utils.misc_utils import cleanup_discard
 
 try:
     from importlib.util import _LazyModule  # type: ignore
@@ -61,28 +69,6 @@ logger.setLevel(logging.ERROR)
 _override_unused_warning_symbols = symbols
 
 
-@debounce(0.1)
-def _debounced_exec_schedule(executed_cell_id: IdType, reactive: bool) -> None:
-    flow_ = flow()
-    settings = flow_.mut_settings
-    exec_schedule = settings.exec_schedule
-    try:
-        if exec_schedule == ExecutionSchedule.DAG_BASED:
-            settings.exec_schedule = ExecutionSchedule.HYBRID_DAG_LIVENESS_BASED
-        flow_.get_and_set_exception_raised_during_execution(None)
-        flow_.comm_manager.handle(
-            {
-                "type": "compute_exec_schedule",
-                "executed_cell_id": executed_cell_id,
-                "is_reactively_executing": reactive,
-                "allow_new_ready": reactive,
-            }
-        )
-    finally:
-        settings.exec_schedule = exec_schedule
-        flow_.comm_manager.debounced_exec_schedule_pending = False
-
-
 class SymbolType(Enum):
     DEFAULT = "default"
     SUBSCRIPT = "subscript"
@@ -115,6 +101,59 @@ class Symbol:
     IPYFLOW_MUTATION_VIRTUAL_SYMBOL_NAME = "__ipyflow_mutation"
     IPYFLOW_ITER_VIRTUAL_SYMBOL_NAME = "__ipyflow_iter"
 
+    # Containers that most symbols never populate; these are left unset and only
+    # allocated (by ``__getattr__``) the first time they are accessed, after which
+    # reads go straight to the slot.
+    _LAZY_CONTAINER_FACTORIES: Dict[str, Callable[[], Any]] = {
+        "_tags": set,
+        "extra_metadata": dict,
+        "parents": dict,
+        "children": dict,
+        "_snapshot_timestamps": list,
+        "_snapshot_timestamp_ubounds": list,
+        "watchpoints": Watchpoints,
+        "timestamp_by_used_time": dict,
+        "used_node_by_used_time": dict,
+        "timestamp_by_liveness_time": dict,
+        "_updated_timestamps": VersionLog,
+        "last_updated_timestamp_by_obj_id": dict,
+        "fresher_ancestors": set,
+        "fresher_ancestor_timestamps": set,
+        "cells_where_deep_live": set,
+        "cells_where_shallow_live": set,
+        "_is_ready_or_waiting_at_position_cache": dict,
+    }
+
+    __slots__ = (
+        "name",
+        "symbol_type",
+        "obj",
+        "_tombstone",
+        "_cached_out_of_sync",
+        "cached_obj_id",
+        "cached_obj_type",
+        "cached_obj_len",
+        "containing_scope",
+        "call_scope",
+        "func_def_stmt",
+        "stmt_node",
+        "symbol_node",
+        "_funcall_live_symbols",
+        "_timestamp",
+        "_defined_cell_num",
+        "_is_dangling_on_edges",
+        "_override_ready_liveness_cell_num",
+        "_override_timestamp",
+        "required_timestamp",
+        "_last_computed_ready_or_waiting_cache_ts",
+        "_implicit",
+        "disable_warnings",
+        "_temp_disable_warnings",
+        "_num_ipywidget_observers",
+        "_num_mercury_widget_observers",
+        "_obj_fingerprint",
+    ) + tuple(_LAZY_CONTAINER_FACTORIES.keys())
+
     def __init__(
         self,
         name: SupportedIndexType,
@@ -125,6 +164,7 @@ class Symbol:
         symbol_node: Optional[ast.AST] = None,
         refresh_cached_obj: bool = False,
         implicit: bool = False,
+        timestamp: Optional[Timestamp] = None,
     ) -> None:
         if refresh_cached_obj:
             # TODO: clean up redundancies
@@ -134,9 +174,9 @@ class Symbol:
         self.symbol_type = symbol_type
         self.obj = obj
 
-        # additional user-specific metadata
-        self._tags: Set[str] = set()
-        self.extra_metadata: Dict[str, Any] = {}
+        # note: lazily allocated containers (see _LAZY_CONTAINER_FACTORIES) are
+        # deliberately not initialized here, including user-specific metadata
+        # in _tags / extra_metadata
 
         self._tombstone = False
         self._cached_out_of_sync = True
@@ -151,45 +191,44 @@ class Symbol:
         self.stmt_node = self.update_stmt_node(stmt_node)
         self.symbol_node = symbol_node
         self._funcall_live_symbols = None
-        self.parents: Dict["Symbol", List[Timestamp]] = {}
-        self.children: Dict["Symbol", List[Timestamp]] = {}
+        # parents / children: Dict["Symbol", List[Timestamp]] (lazy)
 
         # initialize at -1 for implicit since the corresponding piece of data could already be around,
         # and we don't want liveness checker to think this was newly created unless we
         # explicitly trace an update somewhere
-        self._timestamp: Timestamp = (
-            Timestamp.uninitialized() if implicit else Timestamp.current()
+        # an explicit timestamp is given for symbols created after the fact
+        # (e.g. for elements of literals; see Namespace.defer_subscript_symbol_for_name)
+        if timestamp is not None:
+            self._timestamp: Timestamp = timestamp
+        elif implicit:
+            self._timestamp = Timestamp.uninitialized()
+        else:
+            self._timestamp = Timestamp.current()
+        self._defined_cell_num = (
+            cells().exec_counter() if timestamp is None else timestamp.cell_num
         )
-        self._snapshot_timestamps: List[Timestamp] = []
-        self._snapshot_timestamp_ubounds: List[Timestamp] = []
-        self._defined_cell_num = cells().exec_counter()
         self._is_dangling_on_edges = False
         self._override_ready_liveness_cell_num = -1
         self._override_timestamp: Optional[Timestamp] = None
-        self.watchpoints = Watchpoints()
 
         # The necessary last-updated timestamp / cell counter for this symbol to not be waiting
         self.required_timestamp: Timestamp = self.timestamp
 
-        # for each usage of this sym, the version that was used, if different from the timestamp of usage
-        self.timestamp_by_used_time: Dict[Timestamp, Timestamp] = {}
-        self.used_node_by_used_time: Dict[Timestamp, ast.AST] = {}
-        # History of definitions at time of liveness
-        self.timestamp_by_liveness_time: Dict[Timestamp, Timestamp] = {}
-        # All timestamps associated with updates to this symbol
-        self._updated_timestamps: Set[Timestamp] = set()
-        # The most recent timestamp associated with a particular object id
-        self.last_updated_timestamp_by_obj_id: Dict[int, Timestamp] = {}
-
-        self.fresher_ancestors: Set["Symbol"] = set()
-        self.fresher_ancestor_timestamps: Set[Timestamp] = set()
-
-        # cells where this symbol was live
-        self.cells_where_deep_live: Set[Cell] = set()
-        self.cells_where_shallow_live: Set[Cell] = set()
+        # lazily allocated:
+        # - timestamp_by_used_time: for each usage of this sym, the version that
+        #   was used, if different from the timestamp of usage
+        # - used_node_by_used_time
+        # - timestamp_by_liveness_time: history of definitions at time of liveness
+        # - _updated_timestamps: all timestamps associated with updates to this
+        #   symbol, in sorted order (subject to compaction)
+        # - last_updated_timestamp_by_obj_id: the most recent timestamp associated
+        #   with a particular object id
+        # - fresher_ancestors / fresher_ancestor_timestamps
+        # - cells_where_deep_live / cells_where_shallow_live: cells where this
+        #   symbol was live
+        # - _is_ready_or_waiting_at_position_cache
 
         self._last_computed_ready_or_waiting_cache_ts: int = -1
-        self._is_ready_or_waiting_at_position_cache: Dict[Tuple[int, bool], bool] = {}
 
         # if implicitly created when tracing non-store-context ast nodes
         self._implicit = implicit
@@ -201,7 +240,16 @@ class Symbol:
         self._num_ipywidget_observers = 0
         self._num_mercury_widget_observers = 0
 
-        flow().aliases.setdefault(id(obj), set()).add(self)
+        # (obj id, timestamp, fingerprint) for the value of obj as of timestamp
+        self._obj_fingerprint: Optional[Tuple[int, Timestamp, Fingerprint]] = None
+
+        flow_ = flow()
+        flow_.aliases.setdefault(id(obj), set()).add(self)
+        flow_.symbols_defined_by_cell.setdefault(self._defined_cell_num, set()).add(
+            self
+        )
+        if self._timestamp.is_initialized:
+            flow_.record_symbol_touched(self, self._timestamp.cell_num)
         if (
             isinstance(self.name, str)
             and not self.is_anonymous
@@ -215,6 +263,17 @@ class Symbol:
                 ns.scope_name = self.name
         self._maybe_fix_implicitness()
 
+    def __getattr__(self, item: str) -> Any:
+        # only reached when normal lookup fails, e.g. for unset lazy containers
+        factory = self._LAZY_CONTAINER_FACTORIES.get(item)
+        if factory is None:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {item!r}"
+            )
+        container = factory()
+        setattr(self, item, container)
+        return container
+
     def _maybe_fix_implicitness(self) -> None:
         if (
             self.is_implicit
@@ -228,16 +287,38 @@ class Symbol:
                 ),
                 default=self._timestamp,
             )
+            if self._timestamp.is_initialized:
+                flow().record_symbol_touched(self, self._timestamp.cell_num)
         if self._timestamp.is_initialized and self._implicit:
             self._implicit = False
 
     @property
     def updated_timestamps(self) -> Set[Timestamp]:
+        updated_timestamps = set(self._updated_timestamps)
         init_ts = self._initialized_timestamp
         if init_ts.is_initialized:
-            return self._updated_timestamps | {init_ts}
-        else:
-            return self._updated_timestamps
+            updated_timestamps.add(init_ts)
+        return updated_timestamps
+
+    def _iter_updated_timestamps_descending(self) -> Generator[Timestamp, None, None]:
+        """Same as sorted(self.updated_timestamps, reverse=True), but lazily."""
+        init_ts = self._initialized_timestamp
+        yield_init_ts = (
+            init_ts.is_initialized and init_ts not in self._updated_timestamps
+        )
+        for ts in reversed(self._updated_timestamps):
+            if yield_init_ts and init_ts > ts:
+                yield init_ts
+                yield_init_ts = False
+            yield ts
+        if yield_init_ts:
+            yield init_ts
+
+    def _latest_initialized_updated_timestamp(self) -> Optional[Timestamp]:
+        for ts in self._iter_updated_timestamps_descending():
+            if ts.is_initialized:
+                return ts
+        return None
 
     @property
     def aliases(self) -> List["Symbol"]:
@@ -316,7 +397,7 @@ class Symbol:
 
     @property
     def visible_timestamp(self) -> Optional[Timestamp]:
-        for ts in sorted(self.updated_timestamps, reverse=True):
+        for ts in self._iter_updated_timestamps_descending():
             if cells().at_timestamp(ts).is_visible:
                 return ts
         return None
@@ -355,6 +436,7 @@ class Symbol:
         ns = self.namespace
         if ns is None:
             return timestamps
+        timestamps |= ns.lazy_subscript_timestamps(version_ubound=version_ubound)
         if seen is None:
             seen = set()
         if self in seen:
@@ -661,13 +743,19 @@ class Symbol:
         if self.is_garbage:
             return
         self._tombstone = True
+        flow().pending_garbage_symbols.add(self)
         ns = self.namespace
         if ns is not None and all(alias.is_garbage for alias in self.aliases):
             ns.mark_garbage()
 
     def collect_self_garbage(self) -> None:
         assert self.is_garbage
+        flow_ = flow()
+        cleanup_discard(flow_.symbols_defined_by_cell, self.defined_cell_num, self)
+        for touched in flow_.symbols_touched_by_cell.values():
+            touched.discard(self)
         self._remove_self_from_aliases()
+        flow_.closure_index.invalidate_symbol(self)
         for parent in self.parents:
             parent.children.pop(self, None)
         for child in self.children:
@@ -781,6 +869,55 @@ class Symbol:
             return self.obj is None and prev_obj is Symbol.NULL
         return False
 
+    def _get_value_fingerprint(self, obj: Any) -> Optional[Fingerprint]:
+        cached = self._obj_fingerprint
+        if cached is not None:
+            obj_id, timestamp, fingerprint = cached
+            if obj_id == id(obj) and timestamp == self.timestamp:
+                return fingerprint
+        return fingerprint_value(obj, flow().mut_settings.max_value_fingerprint_bytes)
+
+    def _has_unchanged_value(self, prev_obj: Optional[Any]) -> bool:
+        """
+        Whether the symbol was reassigned to a different object with the same
+        value as the previous one (e.g. an identical array loaded from disk),
+        according to the content digests in `ipyflow.memoization.fingerprint`.
+        """
+        if (
+            prev_obj is None
+            or prev_obj is Symbol.NULL
+            or prev_obj is self.obj
+            or type(prev_obj) is not type(self.obj)
+            or flow().mut_settings.max_value_fingerprint_bytes <= 0
+        ):
+            return False
+        prev_fingerprint = self._get_value_fingerprint(prev_obj)
+        if prev_fingerprint is None:
+            return False
+        fingerprint = fingerprint_value(
+            self.obj, flow().mut_settings.max_value_fingerprint_bytes
+        )
+        # stamped with the timestamp once it is known; see `update_deps()`
+        self._obj_fingerprint = (
+            None
+            if fingerprint is None
+            else (self.obj_id, Timestamp.uninitialized(), fingerprint)
+        )
+        return fingerprint == prev_fingerprint
+
+    def _stamp_value_fingerprint(self) -> None:
+        cached = self._obj_fingerprint
+        if cached is None:
+            return
+        obj_id, timestamp, fingerprint = cached
+        if timestamp.is_initialized:
+            # not computed during this update
+            return
+        elif obj_id == self.obj_id:
+            self._obj_fingerprint = (obj_id, self.timestamp, fingerprint)
+        else:
+            self._obj_fingerprint = None
+
     def _handle_aliases(self):
         cleanup_discard(flow().aliases, self.cached_obj_id, self)
         flow().aliases.setdefault(self.obj_id, set()).add(self)
@@ -1038,14 +1175,17 @@ class Symbol:
         )
         logger.warning("symbol %s new deps %s", self, new_deps)
         new_deps.discard(self)
+        closure_index = flow().closure_index
         if overwrite:
             for parent in self.parents.keys() - new_deps:
                 parent.children.pop(self, None)
                 self.parents.pop(parent, None)
+                closure_index.invalidate_edge(parent, self)
 
         for new_parent in new_deps - self.parents.keys():
             if new_parent is None:
                 continue
+            closure_index.invalidate_edge(new_parent, self)
             new_parent.children.setdefault(self, []).append(Timestamp.current())
             self.parents.setdefault(new_parent, []).append(Timestamp.current())
         self.required_timestamp = Timestamp.uninitialized()
@@ -1068,10 +1208,20 @@ class Symbol:
             self.namespace.upsert_symbol_for_name(
                 self.IPYFLOW_MUTATION_VIRTUAL_SYMBOL_NAME, object(), propagate=False
             )
+        # if the symbol was reassigned to an equal value, there is nothing to
+        # propagate, and keeping the timestamp keeps dependents from looking ready
+        has_unchanged_value = (
+            overwrite
+            and not mutated
+            and not deleted
+            and self._has_unchanged_value(prev_obj)
+        )
         propagate = propagate and (
-            mutated or deleted or not self._should_cancel_propagation(prev_obj)
+            mutated
+            or deleted
+            or not (has_unchanged_value or self._should_cancel_propagation(prev_obj))
         )
-        if refresh:
+        if refresh and not has_unchanged_value:
             self.refresh(
                 # rationale: if this is a mutation for which we have more precise information,
                 # then we don't need to update the ns descendents as this will already have happened.
@@ -1085,6 +1235,7 @@ class Symbol:
                 new_deps, mutated, propagate_to_namespace_descendents, refresh
             )
         self._refresh_cached_obj()
+        self._stamp_value_fingerprint()
         if self.is_class:
             # pop pending class defs and update obj ref
             try:
@@ -1177,6 +1328,7 @@ class Symbol:
         sym._override_timestamp = Timestamp(
             self._timestamp.cell_num, current_ts_cell.num_original_stmts
         )
+        flow().record_symbol_touched(sym, sym._override_timestamp.cell_num)
         sym.update_obj_ref(newval)
         statements().create_and_track(
             current_ts_cell._extra_stmt,
@@ -1194,13 +1346,12 @@ class Symbol:
                 sym._timestamp,
                 sym,
             )
-        self.debounced_exec_schedule(reactive=True)
+        self.request_exec_schedule(reactive=True)
 
-    def debounced_exec_schedule(self, reactive: bool) -> None:
-        if _debounced_exec_schedule(
+    def request_exec_schedule(self, reactive: bool) -> None:
+        flow().comm_manager.reactive_scheduler.request(
             cells().at_timestamp(self.timestamp).cell_id, reactive=reactive
-        ):
-            flow().comm_manager.debounced_exec_schedule_pending = True
+        )
 
     def namespaced(self) -> "Namespace":
         ns = self.namespace
@@ -1239,6 +1390,10 @@ class Symbol:
         exclude_ns: bool = False,
         is_static: bool = False,
     ) -> "Symbol":
+        if not is_static and tracer_initialized():
+            tracer().record_usage_for_function_summaries(
+                self, used_time, used_node, exclude_ns
+            )
         if used_time is None:
             used_time = Timestamp.current()
         if flow().is_dev_mode:
@@ -1255,7 +1410,7 @@ class Symbol:
         )
         is_usage = False
         ts_to_use = self._initialized_timestamp
-        for updated_ts in sorted(self.updated_timestamps, reverse=True):
+        for updated_ts in self._iter_updated_timestamps_descending():
             if not updated_ts.is_initialized:
                 continue
             is_usage = self.update_usage_info_one_timestamp(
@@ -1271,6 +1426,9 @@ class Symbol:
                 self.used_node_by_used_time[used_time] = used_node
         if exclude_ns:
             return self
+        if not is_static:
+            self._update_namespace_usage_info(used_time)
+            return self
         for sym in self.get_namespace_symbols(recurse=True):
             sym.update_usage_info(
                 used_time=used_time,
@@ -1280,6 +1438,29 @@ class Symbol:
             )
         return self
 
+    def _update_namespace_usage_info(self, used_time: Timestamp) -> None:
+        """
+        Same as calling `update_usage_info(exclude_ns=True)` on each symbol in this
+        symbol's namespace, but adds the data dependencies on symbols that were last
+        updated at the same time all at once. Wide namespaces (e.g. dataframes with
+        thousands of columns) typically have many such symbols.
+        """
+        tracer_ = tracer() if tracer_initialized() else None
+        syms_by_updated_ts: Dict[Timestamp, Set["Symbol"]] = {}
+        for sym in self.get_namespace_symbols(recurse=True):
+            if tracer_ is not None:
+                tracer_.record_usage_for_function_summaries(sym, used_time, None, True)
+            updated_ts = sym._latest_initialized_updated_timestamp()
+            if updated_ts is None or not updated_ts < used_time:
+                continue
+            syms_by_updated_ts.setdefault(updated_ts, set()).add(sym)
+            if used_time.is_initialized:
+                sym.timestamp_by_used_time[used_time] = sym._initialized_timestamp
+        flow_ = flow()
+        with slicing_context(is_static=False):
+            for updated_ts, syms in syms_by_updated_ts.items():
+                flow_.add_data_deps(used_time, updated_ts, syms)
+
     def get_namespace_symbols(
         self, recurse: bool = False, seen: Optional[Set["Symbol"]] = None
     ) -> Generator["Symbol", None, None]:
@@ -1312,6 +1493,33 @@ class Symbol:
         for alias in flow().aliases.get(containing_ns.obj_id, []):
             alias._take_timestamp_snapshots(ts_ubound, seen=seen)
 
+    def _compact_version_log(self, max_versions: int) -> None:
+        # Besides the newest versions, keep:
+        # - the latest update made by each cell, since readiness checks only
+        #   compare the positions and counters of the cells that made updates,
+        #   and an older update from the same cell never changes the outcome;
+        # - the version that was current at each recorded usage;
+        # - the latest version for each object this symbol has pointed to.
+        # Slices do not need the others, since the dependencies on them were
+        # recorded when they were used.
+        version_log = self._updated_timestamps
+        latest_by_cell_id: Dict[IdType, Timestamp] = {}
+        for updated_ts in version_log:
+            if updated_ts.is_initialized:
+                cell_id = cells().at_timestamp(updated_ts).cell_id
+                latest_by_cell_id[cell_id] = updated_ts
+        pinned = {self._timestamp}
+        pinned.update(latest_by_cell_id.values())
+        for used_time in itertools.chain(
+            self.timestamp_by_used_time.keys(),
+            self.timestamp_by_liveness_time.keys(),
+        ):
+            used_ts = version_log.latest_before(used_time)
+            if used_ts is not None:
+                pinned.add(used_ts)
+        pinned.update(self.last_updated_timestamp_by_obj_id.values())
+        version_log.compact(max_versions, pinned)
+
     def refresh(
         self,
         take_timestamp_snapshots: bool = True,
@@ -1323,8 +1531,12 @@ class Symbol:
             return
         orig_timestamp = self._timestamp
         self._updated_timestamps.add(orig_timestamp)
+        max_versions = flow().mut_settings.max_symbol_versions
+        if max_versions > 0 and self._updated_timestamps.needs_compaction(max_versions):
+            self._compact_version_log(max_versions)
         self._timestamp = Timestamp.current() if timestamp is None else timestamp
         self._override_timestamp = None
+        flow().record_symbol_touched(self, self._timestamp.cell_num)
         if take_timestamp_snapshots and (
             orig_timestamp < self._timestamp or len(self._snapshot_timestamps) == 0
         ):
@@ -1351,6 +1563,7 @@ class Symbol:
         ns = self.namespace
         if ns is None:
             return
+        ns.refresh_lazy_subscript_symbols(self._timestamp)
         for sym in ns.all_symbols_this_indentation(exclude_class=True):
             # this is to handle cases like `x = x.mutate(42)`, where
             # we could have changed some member of x but returned the
@@ -1407,13 +1620,18 @@ class Symbol:
             cleanup_discard(flow_.aliases, self.cached_obj_id, self)
             cleanup_discard(flow_.aliases, self.obj_id, self)
             flow_.aliases.setdefault(id(obj), set()).add(self)
+            prev_obj = self.obj
             self.update_obj_ref(obj)
+            if self._has_unchanged_value(prev_obj):
+                self._stamp_value_fingerprint()
+                return
         elif self.obj_len != self.cached_obj_len:
             self._refresh_cached_obj()
         else:
             return
         if refresh:
             self.refresh()
+        self._stamp_value_fingerprint()
 
     _MAX_MEMOIZE_COMPARABLE_SIZE = 10**6
 
@@ -1426,7 +1644,7 @@ class Symbol:
         import numpy as np
 
         try:
-            return np.alltrue(obj1 == obj2)  # type: ignore
+            return np.all(obj1 == obj2)  # type: ignore
         except Exception:
             return False
 
@@ -1499,6 +1717,9 @@ class Symbol:
             if module.startswith("numpy"):
                 name = getattr(type(obj), "__name__", "")
                 if name.endswith("ndarray"):
+                    fingerprint = fingerprint_ndarray(obj)
+                    if fingerprint is not None:
+                        return fingerprint, cls._equal, 1
                     return obj, cls._array_equal, obj.size
                 else:
                     numpy = sys.modules.get("numpy")
@@ -1507,6 +1728,10 @@ class Symbol:
             elif module.startswith(("modin", "pandas")):
                 name = getattr(type(obj), "__name__", "")
                 if name.endswith(("DataFrame", "Series")):
+                    if module.startswith("pandas"):
+                        fingerprint = fingerprint_pandas(obj)
+                        if fingerprint is not None:
+                            return fingerprint, cls._equal, 1
                     return obj, cls._dataframe_equal, obj.size
             elif module.startswith("ipywidgets"):
                 ipywidgets = sys.modules.get("ipywidgets")
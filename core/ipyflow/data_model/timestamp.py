@@ -4,6 +4,8 @@ import logging
 from contextlib import contextmanager
 from typing import (
     TYPE_CHECKING,
+    Any,
+    Dict,
     Generator,
     Iterable,
     NamedTuple,
@@ -32,18 +34,48 @@ _override_unused_warning_timestamps = timestamps
 _cell_offset = 0
 _stmt_offset = 0
 
+# interned timestamps, keyed by their cell and statement numbers packed into one int
+_interned_timestamps: Dict[int, "Timestamp"] = {}
 
-class Timestamp(NamedTuple):
+
+class _TimestampFields(NamedTuple):
+    cell_num: int
+    stmt_num: int
+
+
+class Timestamp(_TimestampFields):
     """A ``(cell_num, stmt_num)`` pair naming one point in execution.
 
     ``cell_num`` is the cell execution counter (1-indexed, strictly increasing
     across the session); ``stmt_num`` is the 0-indexed statement within that cell
     execution. Comparing the timestamp of a symbol against those of its
     dependencies is how ipyflow decides staleness.
+
+    Timestamps are interned, so that checking two equal timestamps for
+    equality usually amounts to an identity check.
     """
 
-    cell_num: int
-    stmt_num: int
+    __slots__ = ()
+
+    def __new__(cls, cell_num: int, stmt_num: int) -> "Timestamp":
+        key = (cell_num << 32) + stmt_num
+        ts = _interned_timestamps.get(key)
+        if ts is None:
+            ts = super().__new__(cls, cell_num, stmt_num)
+            _interned_timestamps[key] = ts
+        return ts
+
+    @classmethod
+    def _make(cls, iterable: Iterable[Any]) -> "Timestamp":  # type: ignore[override]
+        return cls(*iterable)
+
+    @staticmethod
+    def clear_interned() -> None:
+        """Forget the interned timestamps, e.g. once the cell counter is reset."""
+        _interned_timestamps.clear()
+        _interned_timestamps[
+            (_TS_UNINITIALIZED.cell_num << 32) + _TS_UNINITIALIZED.stmt_num
+        ] = _TS_UNINITIALIZED
 
     @classmethod
     def current(cls) -> "Timestamp":
@@ -69,8 +101,10 @@ class Timestamp(NamedTuple):
     @property
     def is_initialized(self) -> bool:
         """Whether this is a real timestamp (not the sentinel uninitialized one)."""
-        uninited = Timestamp.uninitialized()
-        return self.cell_num > uninited.cell_num and self.stmt_num > uninited.stmt_num
+        return (
+            self.cell_num > _TS_UNINITIALIZED.cell_num
+            and self.stmt_num > _TS_UNINITIALIZED.stmt_num
+        )
 
     def plus(self, cell_num_delta: int, stmt_num_delta: int) -> "Timestamp":
         return self.__class__(
@@ -96,6 +130,8 @@ class Timestamp(NamedTuple):
         return (self.cell_num, self.stmt_num)
 
     def __eq__(self, other) -> bool:
+        if self is other:
+            return True
         if other is None:
             return False
         if not isinstance(other, Timestamp):
@@ -103,11 +139,13 @@ class Timestamp(NamedTuple):
                 "cannot compare non-timestamp value %s with timestamp %s"
                 % (other, self)
             )
-        return tuple(self._asdict().values()) == tuple(other._asdict().values())
+        return tuple.__eq__(self, other)
 
     def __ne__(self, other) -> bool:
         return not self == other
 
+    __hash__ = tuple.__hash__
+
     @classmethod
     def update_usage_info(
         cls,
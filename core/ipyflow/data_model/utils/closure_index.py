@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import logging
+from typing import TYPE_CHECKING, Dict, FrozenSet, List, Optional, Set
+
+if TYPE_CHECKING:
+    # avoid circular imports
+    from ipyflow.data_model.symbol import Symbol
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+class TransitiveClosureIndex:
+    """
+    Memoized transitive dependencies (following `parents`) and transitive users
+    (following `children`) of symbols. Traversals are iterative, and reuse the
+    memoized closures of the symbols they reach. When the edge between a parent
+    and a child changes, only the memoized closures that could pass through that
+    edge are dropped: the dependencies of the child and of everything that
+    depends on it, and the users of the parent and of everything it depends on.
+    """
+
+    def __init__(self) -> None:
+        self._rdeps: Dict["Symbol", FrozenSet["Symbol"]] = {}
+        self._rusers: Dict["Symbol", FrozenSet["Symbol"]] = {}
+        self.num_traversals = 0
+
+    def rdeps(
+        self, sym: "Symbol", max_depth: Optional[int] = None
+    ) -> FrozenSet["Symbol"]:
+        return self._closure(sym, "parents", self._rdeps, max_depth)
+
+    def rusers(
+        self, sym: "Symbol", max_depth: Optional[int] = None
+    ) -> FrozenSet["Symbol"]:
+        return self._closure(sym, "children", self._rusers, max_depth)
+
+    def invalidate_edge(self, parent: "Symbol", child: "Symbol") -> None:
+        self._invalidate(self._rdeps, child)
+        self._invalidate(self._rusers, parent)
+
+    def invalidate_symbol(self, sym: "Symbol") -> None:
+        self._invalidate(self._rdeps, sym)
+        self._invalidate(self._rusers, sym)
+
+    @staticmethod
+    def _invalidate(cache: Dict["Symbol", FrozenSet["Symbol"]], sym: "Symbol") -> None:
+        if len(cache) == 0:
+            return
+        stale = [key for key, closure in cache.items() if key is sym or sym in closure]
+        for key in stale:
+            del cache[key]
+
+    def _closure(
+        self,
+        sym: "Symbol",
+        attr: str,
+        cache: Dict["Symbol", FrozenSet["Symbol"]],
+        max_depth: Optional[int],
+    ) -> FrozenSet["Symbol"]:
+        # memoized closures lose track of depth, so they are only used (and
+        # computed) for unbounded traversals
+        memoize = max_depth is None
+        if memoize:
+            closure = cache.get(sym)
+            if closure is not None:
+                return closure
+        self.num_traversals += 1
+        seen: Set["Symbol"] = {sym}
+        frontier: List["Symbol"] = [sym]
+        depth = 0
+        while len(frontier) > 0 and (max_depth is None or depth < max_depth):
+            depth += 1
+            next_frontier: List["Symbol"] = []
+            for node in frontier:
+                for related in getattr(node, attr).keys():
+                    if related in seen:
+                        continue
+                    seen.add(related)
+                    related_closure = cache.get(related) if memoize else None
+                    if related_closure is None:
+                        next_frontier.append(related)
+                    else:
+                        seen |= related_closure
+            frontier = next_frontier
+        seen.discard(sym)
+        closure = frozenset(seen)
+        if memoize:
+            cache[sym] = closure
+        return closure
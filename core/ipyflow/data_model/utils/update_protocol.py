@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 import logging
-import sys
-from typing import TYPE_CHECKING, Generator, Iterable, Set, cast
+from typing import TYPE_CHECKING, Generator, Iterable, List, Set, Tuple, cast
 
-from ipyflow.data_model import DUPED_ATTRSUB_CLASSES
+from ipyflow.data_model import is_duped_attrsub_obj
 from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.models import cells
+from ipyflow.profiling import profiled
 from ipyflow.singletons import flow, tracer
 
 if TYPE_CHECKING:
@@ -15,11 +16,59 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
 
+_PROPAGATE_TO_DEPS = 0
+_PROPAGATE_TO_NAMESPACE_PARENTS = 1
+_PROPAGATE_TO_NAMESPACE_CHILDREN = 2
+
+# (kind, symbol, skip_seen_check, depth)
+_PropagationTask = Tuple[int, "Symbol", bool, int]
+
+
+class UpdatePropagationStats:
+    """Number of symbols whose waiting status was visited by updates in a cell."""
+
+    __slots__ = ("updates", "symbols_touched", "max_symbols_touched", "truncated")
+
+    def __init__(self) -> None:
+        self.updates = 0
+        self.symbols_touched = 0
+        self.max_symbols_touched = 0
+        # number of updates that exceeded the fan-out or depth budget
+        self.truncated = 0
+
+    def record(self, symbols_touched: int, truncated: bool) -> None:
+        self.updates += 1
+        self.symbols_touched += symbols_touched
+        self.max_symbols_touched = max(self.max_symbols_touched, symbols_touched)
+        self.truncated += truncated
+
+    def __repr__(self) -> str:
+        return "<updates=%d, symbols_touched=%d, max=%d, truncated=%d>" % (
+            self.updates,
+            self.symbols_touched,
+            self.max_symbols_touched,
+            self.truncated,
+        )
+
+
 class UpdateProtocol:
+    """
+    Marks the (transitive) dependents of an updated symbol as waiting. The
+    propagation uses an explicit worklist, and is bounded by the
+    max_update_propagation_fanout and max_update_propagation_depth settings;
+    symbols beyond the budget fall back to coarse, cell-level waiting marks.
+    """
+
     def __init__(self, updated_sym: "Symbol") -> None:
         self.updated_sym = updated_sym
         self.seen: Set["Symbol"] = set()
+        # number of symbols visited while propagating waiting status
+        self.num_symbols_touched = 0
+        # symbols that were not visited because they were beyond the budget
+        self.truncated_frontier: Set["Symbol"] = set()
+        self._worklist: List[_PropagationTask] = []
 
+    @profiled("update_protocol")
     def __call__(
         self,
         new_deps: Set["Symbol"],
@@ -62,32 +111,22 @@ class UpdateProtocol:
                 if not updated_sym.is_waiting and updated_sym is not self.updated_sym:
                     updated_sym.refresh()
         self.seen |= new_deps  # don't propagate to stuff on RHS
-        for sym in updated_symbols_with_ancestors:
-            self._propagate_waiting_to_deps(sym, skip_seen_check=True)
+        self._propagate_waiting(updated_symbols_with_ancestors)
+        self._record_stats()
 
     def _maybe_get_duped_attrsub_updated_syms(self) -> Set["Symbol"]:
-        for modname, classname in DUPED_ATTRSUB_CLASSES:
-            module = sys.modules.get(modname, None)
-            if modname is None:
-                continue
-            clazz = getattr(module, classname, None)
-            if clazz is None:
-                continue
-
-            ns = self.updated_sym.containing_namespace
-            if ns is None or ns.obj is None or not isinstance(ns.obj, clazz):
-                continue
-
-            name = self.updated_sym.name
-            return cast(
-                Set["Symbol"],
-                {
-                    ns.lookup_symbol_by_name_this_indentation(name, is_subscript=is_sub)
-                    for is_sub in (True, False)
-                }
-                - {None},
-            )
-        return set()
+        ns = self.updated_sym.containing_namespace
+        if ns is None or not is_duped_attrsub_obj(ns.obj):
+            return set()
+        name = self.updated_sym.name
+        return cast(
+            Set["Symbol"],
+            {
+                ns.lookup_symbol_by_name_this_indentation(name, is_subscript=is_sub)
+                for is_sub in (True, False)
+            }
+            - {None},
+        )
 
     def _collect_updated_symbols_and_refresh_namespaces(
         self,
@@ -130,28 +169,104 @@ class UpdateProtocol:
                         refresh_descendent_namespaces,
                     )
 
+    def _propagate_waiting(self, updated_symbols: Iterable["Symbol"]) -> None:
+        settings = flow().mut_settings
+        max_fanout = settings.max_update_propagation_fanout
+        max_depth = settings.max_update_propagation_depth
+        worklist = self._worklist
+        # tasks are pushed in reverse so that they are popped (and thus symbols
+        # are marked as seen) in the same order as a depth-first recursive traversal
+        worklist.extend(
+            (_PROPAGATE_TO_DEPS, sym, True, 0)
+            for sym in reversed(list(updated_symbols))
+        )
+        while worklist:
+            kind, sym, skip_seen_check, depth = worklist.pop()
+            if not skip_seen_check:
+                if sym in self.seen:
+                    continue
+                if depth > max_depth or self.num_symbols_touched >= max_fanout:
+                    self.truncated_frontier.add(sym)
+                    continue
+            if kind == _PROPAGATE_TO_DEPS:
+                self._propagate_waiting_to_deps(sym, depth)
+            elif kind == _PROPAGATE_TO_NAMESPACE_PARENTS:
+                self._propagate_waiting_to_namespace_parents(sym, depth)
+            else:
+                self._propagate_waiting_to_namespace_children(sym, depth)
+        if self.truncated_frontier:
+            self._mark_truncated_frontier_waiting()
+
+    def _push(self, tasks: List[_PropagationTask]) -> None:
+        self._worklist.extend(reversed(tasks))
+
+    def _mark_waiting(self, sym: "Symbol") -> None:
+        sym.fresher_ancestors.add(self.updated_sym)
+        sym.fresher_ancestor_timestamps.add(self.updated_sym.timestamp)
+        sym.required_timestamp = Timestamp.current()
+
+    def _should_mark_waiting(self, sym: "Symbol") -> bool:
+        return (
+            sym not in flow().updated_symbols
+            and sym not in tracer().this_stmt_updated_symbols
+            and sym.should_mark_waiting(self.updated_sym)
+        )
+
+    def _mark_truncated_frontier_waiting(self) -> None:
+        """
+        Symbols on the frontier of a truncated propagation are marked waiting,
+        but their descendents are not visited; instead, the cells that defined
+        them are recorded so that the frontend checker can mark every cell
+        downstream of them as waiting (see FrontendCheckerResult).
+        """
+        self.truncated_frontier -= self.seen
+        flow_ = flow()
+        cell_ctr = flow_.cell_counter()
+        source_ctrs: Set[int] = set()
+        for sym in self.truncated_frontier:
+            if not self._should_mark_waiting(sym):
+                continue
+            self._mark_waiting(sym)
+            source_ctr = sym.timestamp.cell_num
+            if 0 < source_ctr < cell_ctr:
+                source_ctrs.add(source_ctr)
+        for source_ctr in source_ctrs:
+            try:
+                source_id = cells().at_counter(source_ctr).id
+            except KeyError:
+                continue
+            flow_.coarse_waiting_cell_marks[source_id] = cell_ctr
+
+    def _record_stats(self) -> None:
+        stats_by_cell = flow().update_propagation_stats
+        cell_ctr = flow().cell_counter()
+        stats = stats_by_cell.get(cell_ctr)
+        if stats is None:
+            stats = stats_by_cell[cell_ctr] = UpdatePropagationStats()
+        stats.record(self.num_symbols_touched, len(self.truncated_frontier) > 0)
+
     def _propagate_waiting_to_namespace_parents(
-        self, sym: "Symbol", skip_seen_check: bool = False
+        self, sym: "Symbol", depth: int
     ) -> None:
-        if not skip_seen_check and sym in self.seen:
-            return
         self.seen.add(sym)
         containing_ns = sym.containing_namespace
         if containing_ns is None or containing_ns.is_module:
             return
         logger.warning("add %s to namespace waiting symbols of %s", sym, containing_ns)
         containing_ns.namespace_waiting_symbols.add(sym)
-        for containing_alias in flow().aliases.get(containing_ns.obj_id, []):
-            self._propagate_waiting_to_namespace_parents(containing_alias)
-
-        for containing_alias in flow().aliases.get(containing_ns.obj_id, []):
-            # do this in 2 separate loops to make sure all containing_alias are added to 'seen'
-            # works around the issue when one alias depends on another
-            for child in self._non_class_to_instance_children(containing_alias):
-                logger.warning(
-                    "propagate from namespace parent of %s to child %s", sym, child
-                )
-                self._propagate_waiting_to_deps(child)
+        containing_aliases = list(flow().aliases.get(containing_ns.obj_id, []))
+        tasks: List[_PropagationTask] = [
+            (_PROPAGATE_TO_NAMESPACE_PARENTS, containing_alias, False, depth + 1)
+            for containing_alias in containing_aliases
+        ]
+        # the children are visited after all containing_alias have been added to
+        # 'seen'; works around the issue when one alias depends on another
+        tasks.extend(
+            (_PROPAGATE_TO_DEPS, child, False, depth + 1)
+            for containing_alias in containing_aliases
+            for child in self._non_class_to_instance_children(containing_alias)
+        )
+        self._push(tasks)
 
     def _non_class_to_instance_children(
         self, sym: "Symbol"
@@ -169,34 +284,29 @@ class UpdateProtocol:
             yield child
 
     def _propagate_waiting_to_namespace_children(
-        self, sym: "Symbol", skip_seen_check: bool = False
+        self, sym: "Symbol", depth: int
     ) -> None:
-        if not skip_seen_check and sym in self.seen:
-            return
         self.seen.add(sym)
         self_ns = flow().namespaces.get(sym.obj_id)
         if self_ns is None:
             return
-        for ns_child in self_ns.all_symbols_this_indentation(exclude_class=True):
-            logger.warning("propagate from %s to namespace child %s", sym, ns_child)
-            self._propagate_waiting_to_deps(ns_child)
+        self._push(
+            [
+                (_PROPAGATE_TO_DEPS, ns_child, False, depth + 1)
+                for ns_child in self_ns.all_symbols_this_indentation(exclude_class=True)
+            ]
+        )
 
-    def _propagate_waiting_to_deps(
-        self, sym: "Symbol", skip_seen_check: bool = False
-    ) -> None:
-        if not skip_seen_check and sym in self.seen:
-            return
+    def _propagate_waiting_to_deps(self, sym: "Symbol", depth: int) -> None:
         self.seen.add(sym)
-        if (
-            sym not in flow().updated_symbols
-            and sym not in tracer().this_stmt_updated_symbols
-        ):
-            if sym.should_mark_waiting(self.updated_sym):
-                sym.fresher_ancestors.add(self.updated_sym)
-                sym.fresher_ancestor_timestamps.add(self.updated_sym.timestamp)
-                sym.required_timestamp = Timestamp.current()
-                self._propagate_waiting_to_namespace_parents(sym, skip_seen_check=True)
-                self._propagate_waiting_to_namespace_children(sym, skip_seen_check=True)
-        for child in self._non_class_to_instance_children(sym):
-            logger.warning("propagate %s %s to %s", sym, sym.obj_id, child)
-            self._propagate_waiting_to_deps(child)
+        self.num_symbols_touched += 1
+        tasks: List[_PropagationTask] = []
+        if self._should_mark_waiting(sym):
+            self._mark_waiting(sym)
+            tasks.append((_PROPAGATE_TO_NAMESPACE_PARENTS, sym, True, depth))
+            tasks.append((_PROPAGATE_TO_NAMESPACE_CHILDREN, sym, True, depth))
+        tasks.extend(
+            (_PROPAGATE_TO_DEPS, child, False, depth + 1)
+            for child in self._non_class_to_instance_children(sym)
+        )
+        self._push(tasks)
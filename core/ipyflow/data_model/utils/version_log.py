@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import logging
+from bisect import bisect_left
+from typing import Container, Iterator, List, Optional
+
+from ipyflow.data_model.timestamp import Timestamp
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+class VersionLog:
+    """
+    The timestamps at which a symbol was updated, kept sorted (and without
+    duplicates) as they are added, so that they can be walked from most to least
+    recent without sorting every update each time, and so that membership is a
+    bisection. Updates almost always arrive in order, in which case adding one is
+    an append.
+    """
+
+    __slots__ = ("_timestamps", "_compacted_size")
+
+    def __init__(self) -> None:
+        self._timestamps: List[Timestamp] = []
+        self._compacted_size = 0
+
+    def __len__(self) -> int:
+        return len(self._timestamps)
+
+    def __iter__(self) -> Iterator[Timestamp]:
+        return iter(self._timestamps)
+
+    def __reversed__(self) -> Iterator[Timestamp]:
+        return reversed(self._timestamps)
+
+    def __contains__(self, ts: object) -> bool:
+        if not isinstance(ts, Timestamp):
+            return False
+        tss = self._timestamps
+        idx = bisect_left(tss, ts)
+        return idx < len(tss) and tss[idx] == ts
+
+    def __repr__(self) -> str:
+        return "<VersionLog %s>" % self._timestamps
+
+    def add(self, ts: Timestamp) -> None:
+        tss = self._timestamps
+        if len(tss) == 0 or tss[-1] < ts:
+            tss.append(ts)
+            return
+        idx = bisect_left(tss, ts)
+        if tss[idx] != ts:
+            tss.insert(idx, ts)
+
+    def clear(self) -> None:
+        self._timestamps.clear()
+        self._compacted_size = 0
+
+    def latest_before(self, ts: Timestamp) -> Optional[Timestamp]:
+        """
+        The most recent update strictly older than `ts`, if any.
+        """
+        idx = bisect_left(self._timestamps, ts)
+        return self._timestamps[idx - 1] if idx > 0 else None
+
+    def needs_compaction(self, max_versions: int) -> bool:
+        """
+        Whether the log has grown to twice the size it had after the last
+        compaction (or twice `max_versions`, if larger), so that pinned updates
+        exceeding `max_versions` do not cause a compaction on every update.
+        """
+        return len(self._timestamps) >= 2 * max(max_versions, self._compacted_size)
+
+    def compact(self, max_versions: int, pinned: Container[Timestamp]) -> int:
+        """
+        Drop the updates older than the `max_versions` most recent ones, except
+        for those in `pinned`. Returns the number of updates dropped.
+        """
+        tss = self._timestamps
+        num_old = len(tss) - max_versions
+        if num_old <= 0:
+            return 0
+        kept = [ts for ts in tss[:num_old] if ts in pinned]
+        kept.extend(tss[num_old:])
+        self._timestamps = kept
+        self._compacted_size = len(kept)
+        return num_old - (len(kept) - max_versions)
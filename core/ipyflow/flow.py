@@ -28,7 +28,10 @@ except ImportError:  # JupyterLite / Pyodide ships no ipykernel-based kernel
     IPythonKernel = None  # type: ignore
 
 from ipyflow import singletons
+from ipyflow.analysis.background import StaticAnalysisWorker
+from ipyflow.analysis.live_refs import LiveRefsCache
 from ipyflow.analysis.symbol_ref import SymbolRef
+from ipyflow.analysis.typecheck import TypecheckService
 from ipyflow.annotations.compiler import compile_handlers_for_already_imported_modules
 from ipyflow.comm_manager import CommManager
 from ipyflow.config import (
@@ -48,15 +51,21 @@ from ipyflow.data_model.scope import Scope
 from ipyflow.data_model.statement import statements
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.data_model.utils.closure_index import TransitiveClosureIndex
+from ipyflow.data_model.utils.update_protocol import UpdatePropagationStats
 from ipyflow.frontend import FrontendCheckerResult
 from ipyflow.line_magics import make_line_magic
+from ipyflow.memoization.store import DiskMemoizationStore, MemoizationStore
+from ipyflow.profiling import Profiler, ProfileStats, profiled
 from ipyflow.singletons import shell
 from ipyflow.slicing.context import (
     SlicingContext,
     slicing_ctx_var,
     static_slicing_context,
 )
+from ipyflow.tracing.function_summary import FunctionSummaryCache
 from ipyflow.tracing.ipyflow_tracer import DataflowTracer
+from ipyflow.tracing.output_store import CapturedOutputStore
 from ipyflow.tracing.watchpoint import Watchpoint
 from ipyflow.types import IdType, SupportedIndexType
 
@@ -168,6 +177,38 @@ class NotebookFlow(singletons.NotebookFlow):
                 "max_external_call_depth_for_tracing",
                 getattr(config, "max_external_call_depth_for_tracing", 3),
             ),
+            max_update_propagation_fanout=kwargs.pop(
+                "max_update_propagation_fanout",
+                getattr(config, "max_update_propagation_fanout", 10000),
+            ),
+            max_update_propagation_depth=kwargs.pop(
+                "max_update_propagation_depth",
+                getattr(config, "max_update_propagation_depth", 1000),
+            ),
+            background_static_analysis=kwargs.pop(
+                "background_static_analysis",
+                getattr(config, "background_static_analysis", True),
+            ),
+            vectorized_staleness=kwargs.pop(
+                "vectorized_staleness",
+                getattr(config, "vectorized_staleness", True),
+            ),
+            min_lazy_literal_size=kwargs.pop(
+                "min_lazy_literal_size",
+                getattr(config, "min_lazy_literal_size", 128),
+            ),
+            max_value_fingerprint_bytes=kwargs.pop(
+                "max_value_fingerprint_bytes",
+                getattr(config, "max_value_fingerprint_bytes", 1 << 28),
+            ),
+            max_symbol_versions=kwargs.pop(
+                "max_symbol_versions",
+                getattr(config, "max_symbol_versions", 0),
+            ),
+            max_captured_stream_chars=kwargs.pop(
+                "max_captured_stream_chars",
+                getattr(config, "max_captured_stream_chars", 0),
+            ),
             is_dev_mode=kwargs.pop(
                 "is_dev_mode",
                 getattr(
@@ -195,8 +236,24 @@ class NotebookFlow(singletons.NotebookFlow):
         self.virtual_symbols: Scope = Scope()
         self._virtual_symbols_inited: bool = False
         self.updated_symbols: Set[Symbol] = set()
+        # per-cell indices so that post-cell bookkeeping scales with the work
+        # the cell did rather than with the total number of symbols
+        self.symbols_touched_by_cell: Dict[int, Set[Symbol]] = {}
+        self.symbols_defined_by_cell: Dict[int, Set[Symbol]] = {}
+        self.pending_garbage_symbols: Set[Symbol] = set()
+        self.pending_garbage_namespaces: Set[Namespace] = set()
+        # cell id -> counter of the last update whose waiting propagation was cut
+        # short at symbols defined by that cell (see UpdateProtocol)
+        self.coarse_waiting_cell_marks: Dict[IdType, int] = {}
+        self.update_propagation_stats: Dict[int, UpdatePropagationStats] = {}
         self.active_watchpoints: List[Tuple[Tuple[Watchpoint, ...], Symbol]] = []
         self.statement_to_func_sym: Dict[int, Symbol] = {}
+        self.live_refs_cache = LiveRefsCache()
+        self.static_analysis_worker = StaticAnalysisWorker(self.live_refs_cache)
+        self.typecheck_service = TypecheckService()
+        self.closure_index = TransitiveClosureIndex()
+        # summaries of traced function bodies, reused across cells
+        self.function_summaries = FunctionSummaryCache()
         self.active_cell_id: Optional[IdType] = None
         self.waiter_usage_detected = False
         self.out_of_order_usage_detected_counter: Optional[int] = None
@@ -212,18 +269,66 @@ class NotebookFlow(singletons.NotebookFlow):
         self.last_executed_cell_id: Optional[IdType] = None
         self.tracked_timestamps: Dict[str, Timestamp] = {}
         self.comm_manager: CommManager = CommManager(self)
+        self.profiler = Profiler(self.cell_counter)
         self.fs: Namespace = None  # type: ignore[assignment]
         self.display_sym: Symbol = None  # type: ignore[assignment]
         self.fake_edge_sym: Symbol = None  # type: ignore[assignment]
         self._override_child_cell: Optional[Cell] = None
         self._prev_cell_metadata_by_id: Optional[Dict[IdType, Dict[str, Any]]] = None
+        # sequence number of the frontend payload that _prev_cell_metadata_by_id
+        # reflects, against which cell metadata deltas are applied
+        self._prev_cell_metadata_seq = 0
         self._prev_order_idx_by_id: Optional[Dict[IdType, int]] = None
         self._min_new_ready_cell_counter = -1
+        self.memoization_store: Optional[MemoizationStore] = None
+        memoization_store_dir = kwargs.pop(
+            "memoization_store_dir", getattr(config, "memoization_store_dir", None)
+        )
+        if memoization_store_dir is not None:
+            self.set_memoization_store(
+                memoization_store_dir,
+                max_bytes=kwargs.pop(
+                    "memoization_store_max_bytes",
+                    getattr(config, "memoization_store_max_bytes", None),
+                ),
+            )
+        captured_output_max_bytes = kwargs.pop(
+            "captured_output_max_bytes",
+            getattr(config, "captured_output_max_bytes", None),
+        )
+        captured_output_spill_dir = kwargs.pop(
+            "captured_output_spill_dir",
+            getattr(config, "captured_output_spill_dir", None),
+        )
+        if captured_output_max_bytes is None:
+            self.captured_output_store = CapturedOutputStore(
+                spill_dir=captured_output_spill_dir
+            )
+        else:
+            self.captured_output_store = CapturedOutputStore(
+                captured_output_max_bytes, spill_dir=captured_output_spill_dir
+            )
         compile_handlers_for_already_imported_modules({"ipyflow"})
 
+    def set_memoization_store(
+        self, directory: Optional[str], max_bytes: Optional[int] = None
+    ) -> None:
+        if directory is None:
+            self.memoization_store = None
+        elif max_bytes is None:
+            self.memoization_store = DiskMemoizationStore(directory)
+        else:
+            self.memoization_store = DiskMemoizationStore(
+                directory, max_bytes=max_bytes
+            )
+
     def register_comm_target(self, kernel: "Optional[IPythonKernel]" = None) -> None:
         self.comm_manager.register_comm_target(kernel)
 
+    @property
+    def stats(self) -> ProfileStats:
+        return self.profiler.stats
+
     def init_virtual_symbols(self) -> None:
         if self._virtual_symbols_inited:
             return
@@ -259,6 +364,7 @@ class NotebookFlow(singletons.NotebookFlow):
         *,
         interface: Optional[str] = None,
         cell_metadata_by_id: Optional[Dict[str, Any]] = None,
+        content_seq: int = 0,
         cell_parents: Optional[Dict[IdType, List[IdType]]] = None,
         **kwargs,
     ) -> None:
@@ -361,7 +467,10 @@ class NotebookFlow(singletons.NotebookFlow):
         self.init_virtual_symbols()
         if cell_metadata_by_id is not None:
             self.comm_manager.handle_notify_content_changed(
-                {"cell_metadata_by_id": cell_metadata_by_id},
+                {
+                    "cell_metadata_by_id": cell_metadata_by_id,
+                    "content_seq": content_seq,
+                },
                 is_reactively_executing=True,
             )
         self._initialize_cell_parents(cell_parents)
@@ -418,35 +527,45 @@ class NotebookFlow(singletons.NotebookFlow):
         parent: Timestamp,
         sym: Symbol,
     ) -> None:
-        if not sym.is_globally_accessible:
+        self.add_data_deps(child, parent, {sym})
+
+    def add_data_deps(
+        self,
+        child: Timestamp,
+        parent: Timestamp,
+        syms: Set[Symbol],
+    ) -> None:
+        syms = {sym for sym in syms if sym.is_globally_accessible}
+        if len(syms) == 0:
             return
         assert parent.is_initialized
         child_cell = self._override_child_cell or cells().at_timestamp(child)
-        child_cell.used_symbols.add(sym)
+        child_cell.used_symbols |= syms
         parent_cell = cells().at_timestamp(parent)
         # if it has already run, don't add the edge
         if child_cell.is_current and parent_cell.is_current:
-            child_cell.add_parent_edge(parent_cell, sym)
+            child_cell.add_parent_edges(parent_cell, syms)
         if not child.is_initialized:
             return
         if slicing_ctx_var.get() == SlicingContext.DYNAMIC:
-            statements().at_timestamp(child).add_parent_edge(
-                statements().at_timestamp(parent), sym
+            statements().at_timestamp(child).add_parent_edges(
+                statements().at_timestamp(parent), syms
             )
         else:
             self.stmt_deferred_static_parents.setdefault(child, {}).setdefault(
                 parent, set()
-            ).add(sym)
+            ).update(syms)
 
     def reset_cell_counter(self):
         # only called in test context
         for sym in self.all_symbols():
             sym._updated_timestamps.clear()
-            sym._timestamp = (
-                sym._max_inner_timestamp
-            ) = sym.required_timestamp = Timestamp.uninitialized()
+            sym._timestamp = sym.required_timestamp = Timestamp.uninitialized()
             sym.timestamp_by_used_time.clear()
             sym.timestamp_by_liveness_time.clear()
+        for ns in self.namespaces.values():
+            ns.max_descendent_timestamp = Timestamp.uninitialized()
+        self.symbols_touched_by_cell.clear()
         cells().clear()
         statements().clear()
 
@@ -595,6 +714,25 @@ class NotebookFlow(singletons.NotebookFlow):
         for alias_set in self.aliases.values():
             yield from alias_set
 
+    def record_symbol_touched(self, sym: Symbol, cell_num: int) -> None:
+        self.symbols_touched_by_cell.setdefault(cell_num, set()).add(sym)
+        if singletons.tracer_initialized():
+            singletons.tracer().record_update_for_function_summaries(sym)
+
+    def symbols_updated_in_cell(self, cell_num: int) -> List[Symbol]:
+        """
+        Symbols whose timestamp is at the given cell counter; the touched index
+        is reset afterwards, since only the most recent cell is ever queried.
+        """
+        touched = self.symbols_touched_by_cell.get(cell_num, set())
+        self.symbols_touched_by_cell.clear()
+        return [
+            sym
+            for sym in touched
+            if sym in self.aliases.get(sym.obj_id, ())
+            and sym.timestamp.cell_num == cell_num
+        ]
+
     def test_and_clear_waiter_usage_detected(self):
         ret = self.waiter_usage_detected
         self.waiter_usage_detected = False
@@ -605,20 +743,31 @@ class NotebookFlow(singletons.NotebookFlow):
         self.out_of_order_usage_detected_counter = None
         return ret
 
+    @profiled("flow.gc")
     def gc(self):
         # Need to do the garbage marking and the collection separately
         prev_cell = cells().at_counter(self.cell_counter()).prev_cell
         prev_cell_ctr = -1 if prev_cell is None else prev_cell.cell_ctr
         if prev_cell_ctr > 0:
-            for sym in self.all_symbols():
-                if sym.defined_cell_num != prev_cell_ctr:
-                    continue
+            # only the generation defined by the previous run of this cell is
+            # eligible, and each counter is some cell's previous run at most once
+            for sym in self.symbols_defined_by_cell.pop(prev_cell_ctr, ()):
                 if sym.is_anonymous or sym.is_new_garbage():
                     sym.mark_garbage()
-        garbage_syms = [sym for sym in self.all_symbols() if sym.is_garbage]
+        garbage_syms = [
+            sym
+            for sym in self.pending_garbage_symbols
+            if sym.is_garbage and sym in self.aliases.get(sym.obj_id, ())
+        ]
+        self.pending_garbage_symbols.clear()
         for sym in garbage_syms:
             sym.collect_self_garbage()
-        garbage_namespaces = [ns for ns in self.namespaces.values() if ns.is_garbage]
+        garbage_namespaces = [
+            ns
+            for ns in self.pending_garbage_namespaces
+            if ns.is_garbage and self.namespaces.get(ns.obj_id) is ns
+        ]
+        self.pending_garbage_namespaces.clear()
         for ns in garbage_namespaces:
             if ns.size == 0:
                 ns.collect_self_garbage()
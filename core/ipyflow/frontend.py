@@ -20,6 +20,7 @@ from ipyflow.data_model.cell import Cell, CheckerResult, cells
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.singletons import flow
 from ipyflow.slicing.context import SlicingContext, slicing_ctx_var
+from ipyflow.staleness_index import EdgeKey, StalenessIndex
 from ipyflow.types import IdType
 
 logger = logging.getLogger(__name__)
@@ -130,25 +131,25 @@ class FrontendCheckerResult(NamedTuple):
         }
 
     def _compute_waiter_and_ready_maker_links(self) -> None:
-        waiter_link_changes = True
         # transitive closure up until we hit non-waiting ready-making cells
-        while waiter_link_changes:
-            waiter_link_changes = False
-            for waiting_cell_id in self.waiting_cells:
-                new_waiter_links = set(self.waiter_links[waiting_cell_id])
-                original_length = len(new_waiter_links)
-                for ready_making_cell_id in self.waiter_links[waiting_cell_id]:
-                    if ready_making_cell_id not in self.waiting_cells:
-                        continue
-                    new_waiter_links |= self.waiter_links[ready_making_cell_id]
-                new_waiter_links.discard(waiting_cell_id)
-                waiter_link_changes = waiter_link_changes or original_length != len(
-                    new_waiter_links
-                )
-                self.waiter_links[waiting_cell_id] = new_waiter_links
+        closed_links: Dict[IdType, Set[IdType]] = {}
         for waiting_cell_id in self.waiting_cells:
-            self.waiter_links[waiting_cell_id] -= self.waiting_cells
-            for ready_making_cell_id in self.waiter_links[waiting_cell_id]:
+            reachable: Set[IdType] = set()
+            worklist = [waiting_cell_id]
+            visited = {waiting_cell_id}
+            while worklist:
+                for ready_making_cell_id in self.waiter_links[worklist.pop()]:
+                    reachable.add(ready_making_cell_id)
+                    if (
+                        ready_making_cell_id in self.waiting_cells
+                        and ready_making_cell_id not in visited
+                    ):
+                        visited.add(ready_making_cell_id)
+                        worklist.append(ready_making_cell_id)
+            closed_links[waiting_cell_id] = reachable - self.waiting_cells
+        for waiting_cell_id, ready_making_cell_ids in closed_links.items():
+            self.waiter_links[waiting_cell_id] = ready_making_cell_ids
+            for ready_making_cell_id in ready_making_cell_ids:
                 self.ready_maker_links[ready_making_cell_id].add(waiting_cell_id)
 
     def _compute_ready_making_cells(
@@ -189,6 +190,42 @@ class FrontendCheckerResult(NamedTuple):
                 ready_making_cell_ids.discard(last_executed_cell_id)
             self.waiter_links[waiting_cell_id] = ready_making_cell_ids
 
+    def _compute_coarse_waiters(self, cells_to_check: List[Cell]) -> None:
+        """
+        Mark as waiting every cell downstream of a cell that defined symbols which
+        an update did not propagate through (because doing so exceeded the update
+        propagation budget), until that cell is rerun.
+        """
+        flow_ = flow()
+        marks = flow_.coarse_waiting_cell_marks
+        for source_id, marked_ctr in list(marks.items()):
+            try:
+                source_ctr = cells().from_id(source_id).cell_ctr
+            except KeyError:
+                source_ctr = marked_ctr + 1
+            if source_ctr > marked_ctr or marked_ctr <= flow_.min_timestamp:
+                del marks[source_id]
+        if len(marks) == 0:
+            return
+        checked_ids = {cell.cell_id for cell in cells_to_check}
+        worklist = list(marks.keys())
+        visited = set(worklist)
+        while worklist:
+            try:
+                cell = cells().from_id(worklist.pop())
+            except KeyError:
+                continue
+            for _ in flow_.mut_settings.iter_slicing_contexts():
+                for child_id in cell.directional_children.keys():
+                    if child_id in visited:
+                        continue
+                    visited.add(child_id)
+                    worklist.append(child_id)
+                    if child_id in checked_ids:
+                        self.waiting_cells.add(child_id)
+        self.ready_cells.difference_update(self.waiting_cells)
+        self.new_ready_cells.difference_update(self.waiting_cells)
+
     def _compute_dag_based_waiters(self, cells_to_check: List[Cell]) -> None:
         flow_ = flow()
         if flow_.mut_settings.exec_schedule not in (
@@ -196,35 +233,40 @@ class FrontendCheckerResult(NamedTuple):
             ExecutionSchedule.HYBRID_DAG_LIVENESS_BASED,
         ):
             return
-        prev_waiting_cells: Set[IdType] = set()
-        while True:
-            for cell in cells_to_check:
-                if cell.cell_id in self.waiting_cells:
-                    continue
-                for _ in flow_.mut_settings.iter_slicing_contexts():
-                    if cell.directional_parents.keys() & (
-                        self.ready_cells | self.waiting_cells
-                    ):
-                        self.waiting_cells.add(cell.cell_id)
-                        continue
-            if prev_waiting_cells == self.waiting_cells:
-                break
-            prev_waiting_cells = set(self.waiting_cells)
+        children_by_parent: Dict[IdType, Set[IdType]] = defaultdict(set)
+        for cell in cells_to_check:
+            for _ in flow_.mut_settings.iter_slicing_contexts():
+                for pid in cell.directional_parents.keys():
+                    children_by_parent[pid].add(cell.cell_id)
+        # anything downstream of a ready or waiting cell has to wait for it
+        worklist = list(self.ready_cells | self.waiting_cells)
+        visited = set(worklist)
+        while worklist:
+            for child_id in children_by_parent.get(worklist.pop(), ()):
+                self.waiting_cells.add(child_id)
+                if child_id not in visited:
+                    visited.add(child_id)
+                    worklist.append(child_id)
         self.ready_cells.difference_update(self.waiting_cells)
         self.new_ready_cells.difference_update(self.waiting_cells)
         for cell_id in self.waiting_cells:
             cells().from_id(cell_id).set_ready(False)
 
-    def _compute_stale_parents(self, cell: Cell) -> None:
+    @staticmethod
+    def _tracks_stale_parents() -> bool:
         flow_ = flow()
-        if (
+        return (
             flow_.mut_settings.exec_schedule
-            not in (
+            in (
                 ExecutionSchedule.DAG_BASED,
                 ExecutionSchedule.HYBRID_DAG_LIVENESS_BASED,
             )
-            or flow_.mut_settings.flow_order != FlowDirection.IN_ORDER
-        ):
+            and flow_.mut_settings.flow_order == FlowDirection.IN_ORDER
+        )
+
+    def _compute_stale_parents(self, cell: Cell) -> None:
+        flow_ = flow()
+        if not self._tracks_stale_parents():
             return
         for _ in flow_.mut_settings.iter_slicing_contexts():
             for pid, syms in cell.directional_parents.items():
@@ -235,16 +277,16 @@ class FrontendCheckerResult(NamedTuple):
                             self.stale_parents[cell.cell_id].add(parent.cell_id)
                             break
 
-    def _compute_stale_parent_makers(self) -> None:
+    def _compute_stale_parent_makers(
+        self, staleness_index: Optional[StalenessIndex] = None
+    ) -> None:
         flow_ = flow()
-        if (
-            flow_.mut_settings.exec_schedule
-            not in (
-                ExecutionSchedule.DAG_BASED,
-                ExecutionSchedule.HYBRID_DAG_LIVENESS_BASED,
-            )
-            or flow_.mut_settings.flow_order != FlowDirection.IN_ORDER
-        ):
+        if not self._tracks_stale_parents():
+            return
+        if staleness_index is not None:
+            by_child, by_executed = staleness_index.compute_stale_parent_makers()
+            self.stale_parents_by_executed_cell_by_child.update(by_child)
+            self.stale_parents_by_child_by_executed_cell.update(by_executed)
             return
         cells_so_far_that_update_symbol: Dict[Symbol, Set[Cell]] = {}
         for cell in cells().iterate_over_notebook_in_position_order():
@@ -268,7 +310,10 @@ class FrontendCheckerResult(NamedTuple):
                 cells_so_far_that_update_symbol.setdefault(sym, set()).add(cell)
 
     def _compute_readiness(
-        self, cell: Cell, checker_result: CheckerResult
+        self,
+        cell: Cell,
+        checker_result: CheckerResult,
+        readiness_candidates: Optional[Set[EdgeKey]] = None,
     ) -> Tuple[bool, bool]:
         flow_ = flow()
         cell_id = cell.cell_id
@@ -289,6 +334,13 @@ class FrontendCheckerResult(NamedTuple):
                 if is_new_ready:
                     break
                 for pid, raw_syms in cell.directional_parents.items():
+                    if (
+                        readiness_candidates is not None
+                        and (cell_id, pid, slicing_ctx_var.get())
+                        not in readiness_candidates
+                    ):
+                        # cannot make this cell ready
+                        continue
                     par = cells().from_id(pid)
                     syms = raw_syms - cell.static_removed_symbols
                     if flow_.fake_edge_sym in syms and cell.cell_ctr < 0 < par.cell_ctr:
@@ -364,6 +416,28 @@ class FrontendCheckerResult(NamedTuple):
                     is_new_ready = True
         return is_ready, is_new_ready
 
+    @staticmethod
+    def _typecheck_cells(cells_to_check: List[Cell]) -> None:
+        """
+        Typecheck the cells that need it in one batch, and record the results on
+        the cells, so that checking each one afterwards neither typechecks it
+        nor builds its slice again.
+        """
+        slices: Dict[IdType, str] = {}
+        for cell in cells_to_check:
+            try:
+                typecheck_slice = cell.compute_typecheck_slice()
+            except Exception:
+                # e.g. syntax errors; checking the cell will handle these
+                continue
+            if typecheck_slice is not None:
+                slices[cell.cell_id] = typecheck_slice
+        if len(slices) == 0:
+            return
+        results = flow().typecheck_service.typecheck_many(slices)
+        for cell_id, result in results.items():
+            cells().from_id(cell_id).set_typecheck_result(result)
+
     def _check_one_cell(
         self,
         cell: Cell,
@@ -372,6 +446,8 @@ class FrontendCheckerResult(NamedTuple):
         waiting_symbols_by_cell_id: Dict[IdType, Set[Symbol]],
         killing_cell_ids_for_symbol: Dict[Symbol, Set[IdType]],
         phantom_cell_info: Dict[IdType, Dict[IdType, Set[int]]],
+        staleness_index: Optional[StalenessIndex] = None,
+        readiness_candidates: Optional[Set[EdgeKey]] = None,
     ) -> Optional[CheckerResult]:
         flow_ = flow()
         try:
@@ -417,9 +493,12 @@ class FrontendCheckerResult(NamedTuple):
             )
             if len(phantom_cell_info_for_cell) > 0:
                 phantom_cell_info[cell_id] = phantom_cell_info_for_cell
-        self._compute_stale_parents(cell)
-        self._compute_stale_parent_makers()
-        is_ready, is_new_ready = self._compute_readiness(cell, checker_result)
+        if staleness_index is None:
+            # otherwise computed for all checked cells at once
+            self._compute_stale_parents(cell)
+        is_ready, is_new_ready = self._compute_readiness(
+            cell, checker_result, readiness_candidates=readiness_candidates
+        )
         if is_ready:
             self.ready_cells.add(cell_id)
         was_ready = cell.set_ready(is_ready)
@@ -569,16 +648,40 @@ class FrontendCheckerResult(NamedTuple):
         if cells_to_check is None:
             cells_to_check = cells().current_cells_for_each_id()
         cells_to_check = sorted(cells_to_check, key=lambda c: c.position)
+        staleness_index = StalenessIndex.create()
+        readiness_candidates = None
+        if staleness_index is not None and flow_.mut_settings.exec_schedule in (
+            ExecutionSchedule.DAG_BASED,
+            ExecutionSchedule.HYBRID_DAG_LIVENESS_BASED,
+        ):
+            readiness_candidates = staleness_index.compute_readiness_candidates(
+                cells_to_check
+            )
+        if flow_.settings.mark_typecheck_failures_unsafe:
+            self._typecheck_cells(cells_to_check)
+        checked_cells = []
         for cell in cells_to_check:
-            self._check_one_cell(
+            checker_result = self._check_one_cell(
                 cell,
                 update_liveness_time_versions,
                 last_executed_cell_pos,
                 waiting_symbols_by_cell_id,
                 killing_cell_ids_for_symbol,
                 phantom_cell_info,
+                staleness_index=staleness_index,
+                readiness_candidates=readiness_candidates,
             )
-
+            if checker_result is not None:
+                checked_cells.append(cell)
+        if staleness_index is not None and self._tracks_stale_parents():
+            for cell_id, stale_parent_ids in staleness_index.compute_stale_parents(
+                checked_cells
+            ).items():
+                self.stale_parents[cell_id] |= stale_parent_ids
+        if len(checked_cells) > 0:
+            # notebook-wide, so computed once rather than per checked cell
+            self._compute_stale_parent_makers(staleness_index)
+        self._compute_coarse_waiters(cells_to_check)
         self._compute_dag_based_waiters(cells_to_check)
         self._compute_ready_making_cells(
             waiting_symbols_by_cell_id,
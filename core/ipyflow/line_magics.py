@@ -28,7 +28,7 @@ from ipyflow.config import (
 from ipyflow.data_model.cell import cells
 from ipyflow.data_model.symbol import Symbol
 from ipyflow.experimental.dag import create_dag_metadata
-from ipyflow.singletons import flow, shell
+from ipyflow.singletons import flow, shell, tracer, tracer_initialized
 from ipyflow.slicing.mixin import SliceableMixin, format_slice
 from ipyflow.tracing.symbol_resolver import resolve_rval_symbols
 
@@ -65,6 +65,12 @@ show_tags:
     
 register_annotations <directory_or_file>:
     - This will register the annotations in the given directory or file.
+
+memoization_store <directory>|off [--max-bytes <n>]:
+    - This will persist %%memoize results to the given directory across restarts.
+
+profile [on|off|show [<cell_num>]|reset]:
+    - This will toggle timing of ipyflow's own bookkeeping per subsystem and cell.
 """.strip()
 
 
@@ -141,6 +147,10 @@ def make_line_magic(flow_: "NotebookFlow"):
             return None
         elif cmd.startswith("register_annotation"):
             return register_annotations(line)
+        elif cmd in ("memoization_store", "memo_store"):
+            return set_memoization_store(line)
+        elif cmd in ("profile", "profiling"):
+            return profile(line)
         elif cmd == "toggle_reactivity":
             flow_.toggle_reactivity()
             return None
@@ -290,6 +300,36 @@ def trace_messages(line_: str) -> None:
         warn(usage)
 
 
+def profile(line_: str) -> Optional[str]:
+    usage = "Usage: %flow profile [on|off|show [<cell_num>]|reset]"
+    line = line_.split()
+    if len(line) == 0:
+        warn(usage)
+        return None
+    setting = line[0].lower()
+    profiler = flow().profiler
+    if setting == "on" or setting.startswith("enable"):
+        profiler.enable()
+        if tracer_initialized():
+            profiler.instrument_tracer(tracer())
+        return "ipyflow profiling enabled"
+    elif setting == "off" or setting.startswith("disable"):
+        profiler.disable()
+        return "ipyflow profiling disabled"
+    elif setting == "reset":
+        profiler.reset()
+        return None
+    elif setting == "show":
+        if len(line) == 1:
+            return profiler.stats.format()
+        try:
+            return profiler.stats.format(int(line[1]))
+        except ValueError:
+            pass
+    warn(usage)
+    return None
+
+
 def set_highlights(cmd: str, rest: str) -> None:
     usage = "Usage: %flow [hls [strategy]|nohls]"
     rest = rest.lower().strip()
@@ -467,6 +507,29 @@ def set_reactivity(line_: str) -> None:
     settings.reactivity_mode = reactivity
 
 
+@magic_arguments("memoization_store")
+@argument("directory", type=str, help="Directory to persist memoized results to")
+@argument(
+    "--max-bytes",
+    type=int,
+    default=None,
+    help="Evict least recently used results once the store exceeds this size",
+)
+def set_memoization_store(line: str) -> Optional[str]:
+    """Persist %%memoize results to disk so that they survive kernel restarts."""
+    try:
+        args = parse_argstring(set_memoization_store, line)
+    except UsageError as e:
+        warn(str(e))
+        return None
+    flow_ = flow()
+    if args.directory in ("off", "none", "disable", "disabled"):
+        flow_.set_memoization_store(None)
+        return None
+    flow_.set_memoization_store(args.directory, max_bytes=args.max_bytes)
+    return f"persisting memoized results to {args.directory}"
+
+
 def _resolve_tracer_class(
     name: str, shell_: Optional["IPyflowInteractiveShell"] = None
 ) -> Optional[Type[pyc.BaseTracer]]:
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import pickle
+import sys
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+_DIGEST_SIZE = 20
+
+
+def make_digest(*parts: Any) -> str:
+    """Hash each part (anything supporting the buffer protocol) into one digest."""
+    hasher = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    for part in parts:
+        view = memoryview(part)
+        hasher.update(view.nbytes.to_bytes(8, "little"))
+        hasher.update(view)
+    return hasher.hexdigest()
+
+
+class Fingerprint(NamedTuple):
+    """
+    Stand-in for a large buffer-backed object (e.g. an ndarray or a dataframe)
+    when comparing memoized inputs: ``meta`` captures the structure (dtypes,
+    shapes, labels) and ``digests`` hold a blake2b digest per underlying buffer,
+    so that equality is a cheap tuple compare and the object itself is not kept
+    alive by the memoization table.
+    """
+
+    kind: str
+    meta: Tuple[Any, ...]
+    digests: Tuple[str, ...]
+
+
+def _array_bytes(arr: Any) -> Any:
+    import numpy as np
+
+    # reshape first, since 0d arrays cannot be reinterpreted as bytes directly
+    return np.ascontiguousarray(arr).reshape(-1).view(np.uint8)
+
+
+def fingerprint_ndarray(arr: Any) -> Optional[Fingerprint]:
+    if arr.dtype.hasobject:
+        # buffer holds pointers, not values
+        return None
+    try:
+        digest = make_digest(_array_bytes(arr))
+    except Exception:
+        logger.exception("unable to fingerprint array")
+        return None
+    return Fingerprint("ndarray", (arr.dtype.str, arr.shape), (digest,))
+
+
+def _hash_pandas(obj: Any, index: bool) -> str:
+    pandas = sys.modules["pandas"]
+    return make_digest(
+        _array_bytes(pandas.util.hash_pandas_object(obj, index=index).to_numpy())
+    )
+
+
+def fingerprint_pandas(obj: Any) -> Optional[Fingerprint]:
+    try:
+        index_digest = _hash_pandas(obj.index, index=False)
+        if obj.ndim == 1:
+            meta: Tuple[Any, ...] = (obj.name, str(obj.dtype))
+            digests: Tuple[str, ...] = (index_digest, _hash_pandas(obj, index=False))
+        else:
+            meta = (tuple(obj.columns), tuple(str(dtype) for dtype in obj.dtypes))
+            digests = (index_digest,) + tuple(
+                _hash_pandas(obj.iloc[:, idx], index=False)
+                for idx in range(obj.shape[1])
+            )
+    except Exception:
+        # e.g. unhashable cell values like lists
+        return None
+    return Fingerprint(type(obj).__name__, meta, digests)
+
+
+# containers with fewer elements than this are cheap enough to propagate through
+_MIN_FINGERPRINTED_CONTAINER_LEN = 1024
+_PLAIN_DATA_TYPES = (bool, bytes, float, int, str, type(None))
+
+
+class ValueFingerprinter(NamedTuple):
+    """
+    Content digests for a family of objects, used to detect when a symbol is
+    reassigned to a new object whose value is the same as that of the old one:
+    ``matches`` says whether this fingerprinter handles an object, ``nbytes``
+    estimates how many bytes hashing it would read, and ``fingerprint``
+    computes the digest (or returns ``None`` if it cannot).
+    """
+
+    matches: Callable[[Any], bool]
+    nbytes: Callable[[Any], int]
+    fingerprint: Callable[[Any], Optional[Fingerprint]]
+
+
+_VALUE_FINGERPRINTERS: List[ValueFingerprinter] = []
+
+
+def register_value_fingerprinter(fingerprinter: ValueFingerprinter) -> None:
+    """Register a fingerprinter; later registrations take precedence."""
+    _VALUE_FINGERPRINTERS.insert(0, fingerprinter)
+
+
+def fingerprint_value(obj: Any, max_bytes: int) -> Optional[Fingerprint]:
+    """
+    Digest the value of ``obj`` with the first registered fingerprinter that
+    handles it, unless that would read more than ``max_bytes`` bytes.
+    """
+    for fingerprinter in _VALUE_FINGERPRINTERS:
+        try:
+            if not fingerprinter.matches(obj):
+                continue
+            if fingerprinter.nbytes(obj) > max_bytes:
+                return None
+            return fingerprinter.fingerprint(obj)
+        except Exception:
+            logger.exception("unable to fingerprint value of type %s", type(obj))
+            return None
+    return None
+
+
+def _is_instance_of(obj: Any, modname: str, *classnames: str) -> bool:
+    # avoid importing (e.g.) numpy just to check whether something is an array
+    module = sys.modules.get(modname)
+    if module is None:
+        return False
+    for classname in classnames:
+        clazz = getattr(module, classname, None)
+        if clazz is not None and isinstance(obj, clazz):
+            return True
+    return False
+
+
+def _pandas_nbytes(obj: Any) -> int:
+    usage = obj.memory_usage(index=True)
+    return int(usage.sum()) if obj.ndim > 1 else int(usage)
+
+
+def _fingerprint_bytes(obj: Any) -> Fingerprint:
+    return Fingerprint(type(obj).__name__, (len(obj),), (make_digest(obj),))
+
+
+def _is_plain_data(obj: Any, depth: int = 0) -> bool:
+    if isinstance(obj, _PLAIN_DATA_TYPES):
+        return True
+    elif depth > 2:
+        return False
+    elif isinstance(obj, dict):
+        return all(
+            _is_plain_data(k, depth + 1) and _is_plain_data(v, depth + 1)
+            for k, v in obj.items()
+        )
+    elif isinstance(obj, (list, tuple)):
+        return all(_is_plain_data(inner, depth + 1) for inner in obj)
+    else:
+        return False
+
+
+def _fingerprint_container(obj: Any) -> Optional[Fingerprint]:
+    if not _is_plain_data(obj):
+        return None
+    # equal dicts with different insertion orders get different digests, which
+    # only means that we conservatively treat them as changed
+    return Fingerprint(
+        type(obj).__name__,
+        (len(obj),),
+        (make_digest(pickle.dumps(obj, protocol=4)),),
+    )
+
+
+register_value_fingerprinter(
+    ValueFingerprinter(
+        matches=lambda obj: isinstance(obj, (dict, list, tuple))
+        and len(obj) >= _MIN_FINGERPRINTED_CONTAINER_LEN,
+        nbytes=sys.getsizeof,
+        fingerprint=_fingerprint_container,
+    )
+)
+register_value_fingerprinter(
+    ValueFingerprinter(
+        matches=lambda obj: isinstance(obj, (bytes, bytearray)),
+        nbytes=len,
+        fingerprint=_fingerprint_bytes,
+    )
+)
+register_value_fingerprinter(
+    ValueFingerprinter(
+        matches=lambda obj: _is_instance_of(obj, "pandas", "DataFrame", "Series"),
+        nbytes=_pandas_nbytes,
+        fingerprint=fingerprint_pandas,
+    )
+)
+register_value_fingerprinter(
+    ValueFingerprinter(
+        matches=lambda obj: _is_instance_of(obj, "numpy", "ndarray"),
+        nbytes=lambda arr: arr.nbytes,
+        fingerprint=fingerprint_ndarray,
+    )
+)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+import abc
+import json
+import logging
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from ipyflow.memoization.fingerprint import make_digest
+from ipyflow.tracing.output_recorder import IPyflowCapturedIO
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+_INDEX_FILE_NAME = "index.json"
+_ENTRY_FILE_SUFFIX = ".pkl"
+_DEFAULT_MAX_BYTES = 1 << 30
+
+
+def digest_memoize_comparable(comparable: Any) -> Optional[str]:
+    """Return a stable digest for a memoize comparable, or ``None`` if it
+    cannot be serialized (in which case it cannot be persisted either)."""
+    try:
+        return make_digest(pickle.dumps(comparable, protocol=4))
+    except Exception:
+        return None
+
+
+class PersistedOutput(NamedTuple):
+    name: str
+    stmt_num: int
+    value: Any
+
+
+class PersistedCellExecution(NamedTuple):
+    input_digests: Dict[str, str]
+    outputs: List[PersistedOutput]
+    displayed_output: IPyflowCapturedIO
+    out_value: Any
+
+
+class MemoizationStore(abc.ABC):
+    """
+    Persistence layer for ``%%memoize`` cell executions that outlives the kernel
+    process. In-process executions live in ``Cell._memoized_executions`` and are
+    keyed by the symbols they read; entries in a store are instead keyed by
+    symbol *name* plus a digest of each input's memoize comparable, so that they
+    can be matched against a fresh session's symbols after a restart.
+    """
+
+    @abc.abstractmethod
+    def lookup(
+        self, content: str, digest_for_input: Callable[[str], Optional[str]]
+    ) -> Optional[PersistedCellExecution]:
+        """
+        Find an execution of ``content`` whose input digests all match the
+        current ones, as given by ``digest_for_input`` for each input name.
+        """
+
+    @abc.abstractmethod
+    def put(self, content: str, execution: PersistedCellExecution) -> bool:
+        """Persist an execution of ``content``. Returns whether it was stored."""
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """Remove every persisted execution."""
+
+
+class DiskMemoizationStore(MemoizationStore):
+    """
+    Content-addressed on-disk memoization store. Each execution is pickled to its
+    own file named by the digest of the executed content and the input digests;
+    a small json index tracks sizes and access times so that the least recently
+    used entries can be evicted once the store exceeds ``max_bytes``.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = _DEFAULT_MAX_BYTES) -> None:
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries: Dict[str, Dict[str, Any]] = self._read_index()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}[{self.directory}]>"
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, _INDEX_FILE_NAME)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _ENTRY_FILE_SUFFIX)
+
+    @staticmethod
+    def _content_digest(content: str) -> str:
+        return make_digest(content.encode("utf-8"))
+
+    @classmethod
+    def _entry_key(cls, content_digest: str, input_digests: Dict[str, str]) -> str:
+        return make_digest(
+            content_digest.encode("utf-8"),
+            json.dumps(sorted(input_digests.items())).encode("utf-8"),
+        )
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self._index_path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            logger.warning("unable to read memoization index at %s", self._index_path)
+            return {}
+        # drop any index entries whose payloads went missing underneath us
+        return {
+            key: meta
+            for key, meta in entries.items()
+            if os.path.exists(self._entry_path(key))
+        }
+
+    def _write_atomic(self, path: str, payload: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _write_index(self) -> None:
+        self._write_atomic(self._index_path, json.dumps(self._entries).encode("utf-8"))
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(meta["size"] for meta in self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, key: str) -> None:
+        self._entries.pop(key, None)
+        try:
+            os.unlink(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _evict_lru_until_within_budget(self) -> None:
+        total = self.total_bytes
+        for key, meta in sorted(self._entries.items(), key=lambda kv: kv[1]["atime"]):
+            if total <= self.max_bytes:
+                break
+            total -= meta["size"]
+            self._evict(key)
+
+    def lookup(
+        self, content: str, digest_for_input: Callable[[str], Optional[str]]
+    ) -> Optional[PersistedCellExecution]:
+        content_digest = self._content_digest(content)
+        current_digests: Dict[str, Optional[str]] = {}
+        for key, meta in sorted(
+            self._entries.items(), key=lambda kv: kv[1]["atime"], reverse=True
+        ):
+            if meta["content"] != content_digest:
+                continue
+            for name, digest in meta["inputs"].items():
+                if name not in current_digests:
+                    current_digests[name] = digest_for_input(name)
+                if current_digests[name] != digest:
+                    break
+            else:
+                try:
+                    with open(self._entry_path(key), "rb") as f:
+                        execution = pickle.load(f)
+                except Exception:
+                    logger.warning("unable to load memoized execution %s", key)
+                    self._evict(key)
+                    self._write_index()
+                    continue
+                meta["atime"] = time.time()
+                self._write_index()
+                return execution
+        return None
+
+    def put(self, content: str, execution: PersistedCellExecution) -> bool:
+        try:
+            payload = pickle.dumps(execution, protocol=4)
+        except Exception:
+            # unpicklable outputs just don't get persisted
+            return False
+        if len(payload) > self.max_bytes:
+            return False
+        content_digest = self._content_digest(content)
+        key = self._entry_key(content_digest, execution.input_digests)
+        self._write_atomic(self._entry_path(key), payload)
+        self._entries[key] = {
+            "content": content_digest,
+            "inputs": execution.input_digests,
+            "size": len(payload),
+            "atime": time.time(),
+        }
+        self._evict_lru_until_within_budget()
+        self._write_index()
+        return key in self._entries
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._evict(key)
+        self._write_index()
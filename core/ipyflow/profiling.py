@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Lightweight instrumentation of ipyflow's own bookkeeping (tracer handlers,
+update propagation, liveness checks, garbage collection, comm handlers), so that
+the time ipyflow spends on top of user code can be attributed per subsystem and
+per cell execution. Enabled with ``%flow profile on``; when disabled, each
+instrumented entrypoint costs one global lookup.
+"""
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    TypeVar,
+    cast,
+)
+
+if TYPE_CHECKING:
+    import pyccolo as pyc
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+_active_profiler: Optional["Profiler"] = None
+
+
+class SubsystemStats:
+    __slots__ = ("calls", "seconds", "self_seconds")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        # wall time, including time spent in other (nested) subsystems
+        self.seconds = 0.0
+        # wall time, excluding time spent in other (nested) subsystems
+        self.self_seconds = 0.0
+
+    def merge(self, other: "SubsystemStats") -> None:
+        self.calls += other.calls
+        self.seconds += other.seconds
+        self.self_seconds += other.self_seconds
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "self_seconds": self.self_seconds,
+        }
+
+    def __repr__(self) -> str:
+        return "<calls=%d, seconds=%.6f, self_seconds=%.6f>" % (
+            self.calls,
+            self.seconds,
+            self.self_seconds,
+        )
+
+
+class ProfileStats:
+    """
+    Cumulative call counts and wall time per subsystem, per cell counter. Time
+    spent in comm handlers in between cell executions is attributed to the most
+    recently executed cell.
+    """
+
+    def __init__(self) -> None:
+        self.by_cell: Dict[int, Dict[str, SubsystemStats]] = {}
+
+    def for_cell(self, cell_ctr: int) -> Dict[str, SubsystemStats]:
+        return self.by_cell.get(cell_ctr, {})
+
+    def totals(self) -> Dict[str, SubsystemStats]:
+        ret: Dict[str, SubsystemStats] = {}
+        for stats_by_subsystem in self.by_cell.values():
+            for subsystem, stats in stats_by_subsystem.items():
+                total = ret.get(subsystem)
+                if total is None:
+                    total = ret[subsystem] = SubsystemStats()
+                total.merge(stats)
+        return ret
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "cells": {
+                str(cell_ctr): _to_json(stats_by_subsystem)
+                for cell_ctr, stats_by_subsystem in self.by_cell.items()
+            },
+            "totals": _to_json(self.totals()),
+        }
+
+    def format(self, cell_ctr: Optional[int] = None) -> str:
+        stats_by_subsystem = (
+            self.totals() if cell_ctr is None else self.for_cell(cell_ctr)
+        )
+        lines = [f"{'subsystem':<40}{'calls':>10}{'total (s)':>12}{'self (s)':>12}"]
+        for subsystem, stats in sorted(
+            stats_by_subsystem.items(), key=lambda item: -item[1].self_seconds
+        ):
+            lines.append(
+                f"{subsystem:<40}{stats.calls:>10}"
+                f"{stats.seconds:>12.4f}{stats.self_seconds:>12.4f}"
+            )
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.format()
+
+
+def _to_json(stats_by_subsystem: Dict[str, SubsystemStats]) -> Dict[str, Any]:
+    return {
+        subsystem: stats.to_json() for subsystem, stats in stats_by_subsystem.items()
+    }
+
+
+class Profiler:
+    def __init__(self, cell_counter: Callable[[], int]) -> None:
+        self.cell_counter = cell_counter
+        self.stats = ProfileStats()
+        # (subsystem, seconds spent in nested subsystems) for each active section
+        self._stack: List[List[Any]] = []
+        # number of active sections per subsystem, so that recursive sections
+        # (e.g. reentrant tracer events) only count once toward inclusive time
+        self._depth: Dict[str, int] = {}
+        self._instrumented_tracers: List["pyc.BaseTracer"] = []
+
+    @property
+    def enabled(self) -> bool:
+        return _active_profiler is self
+
+    def enable(self) -> None:
+        global _active_profiler
+        if _active_profiler is not None and _active_profiler is not self:
+            _active_profiler.disable()
+        _active_profiler = self
+
+    def disable(self) -> None:
+        global _active_profiler
+        if _active_profiler is self:
+            _active_profiler = None
+        self.uninstrument_tracers()
+        self._stack.clear()
+        self._depth.clear()
+
+    def reset(self) -> None:
+        self.stats = ProfileStats()
+
+    def start(self, subsystem: str) -> float:
+        self._stack.append([subsystem, 0.0])
+        self._depth[subsystem] = self._depth.get(subsystem, 0) + 1
+        return time.perf_counter()
+
+    def stop(self, subsystem: str, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        if not self._stack:
+            # profiling was (re)enabled while this section was active
+            return
+        _, child_seconds = self._stack.pop()
+        depth = self._depth.get(subsystem, 1) - 1
+        self._depth[subsystem] = depth
+        cell_ctr = self.cell_counter()
+        stats_by_subsystem = self.stats.by_cell.get(cell_ctr)
+        if stats_by_subsystem is None:
+            stats_by_subsystem = self.stats.by_cell[cell_ctr] = {}
+        stats = stats_by_subsystem.get(subsystem)
+        if stats is None:
+            stats = stats_by_subsystem[subsystem] = SubsystemStats()
+        stats.calls += 1
+        stats.self_seconds += elapsed - child_seconds
+        if depth == 0:
+            stats.seconds += elapsed
+        if self._stack:
+            self._stack[-1][1] += elapsed
+
+    def _make_timed_emit_event(self, emit_event: Callable[..., Any]):
+        def timed_emit_event(evt, *args, **kwargs):
+            if not self.enabled:
+                return emit_event(evt, *args, **kwargs)
+            subsystem = "tracer.%s" % getattr(evt, "value", evt)
+            start = self.start(subsystem)
+            try:
+                return emit_event(evt, *args, **kwargs)
+            finally:
+                self.stop(subsystem, start)
+
+        timed_emit_event.__ipyflow_profiler__ = self  # type: ignore[attr-defined]
+        return timed_emit_event
+
+    def instrument_tracer(self, tracer: "pyc.BaseTracer") -> None:
+        """
+        Time each event handled by the given tracer instance. This is idempotent
+        and is also called before each traced cell, in case the tracer
+        singleton has been replaced since profiling was enabled.
+        """
+        if not self.enabled:
+            return
+        patched = tracer.__dict__.get("_emit_event")
+        if getattr(patched, "__ipyflow_profiler__", None) is self:
+            return
+        elif patched is not None:
+            logger.warning("tracer %s already has a patched _emit_event", tracer)
+            return
+        tracer._emit_event = self._make_timed_emit_event(tracer._emit_event)  # type: ignore[method-assign]
+        self._instrumented_tracers.append(tracer)
+
+    def uninstrument_tracers(self) -> None:
+        for tracer in self._instrumented_tracers:
+            patched = tracer.__dict__.get("_emit_event")
+            if getattr(patched, "__ipyflow_profiler__", None) is self:
+                del tracer._emit_event  # type: ignore[method-assign]
+        self._instrumented_tracers.clear()
+
+
+def profiled(subsystem: str) -> Callable[[_F], _F]:
+    """Attribute the time spent in the decorated function to the given subsystem."""
+
+    def decorator(func: _F) -> _F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active_profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            start = profiler.start(subsystem)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.stop(subsystem, start)
+
+        return cast(_F, wrapper)
+
+    return decorator
+
+
+@contextmanager
+def profiled_section(subsystem: str) -> Generator[None, None, None]:
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+    start = profiler.start(subsystem)
+    try:
+        yield
+    finally:
+        profiler.stop(subsystem, start)
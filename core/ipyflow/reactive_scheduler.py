@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import heapq
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from ipyflow.analysis.background import ShellThreadScheduler
+from ipyflow.config import ExecutionSchedule
+from ipyflow.data_model.cell import cells
+from ipyflow.types import IdType
+
+if TYPE_CHECKING:
+    from ipyflow.comm_manager import CommManager
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+class ReactiveScheduleStats:
+    """Latency between a schedule request and the schedule being computed."""
+
+    __slots__ = ("flushes", "requests", "total_seconds", "max_seconds", "last_seconds")
+
+    def __init__(self) -> None:
+        self.flushes = 0
+        # number of requests, including the ones coalesced into another
+        self.requests = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+
+    @property
+    def coalesced(self) -> int:
+        return self.requests - self.flushes
+
+    def record(self, num_requests: int, seconds: float) -> None:
+        self.flushes += 1
+        self.requests += num_requests
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "flushes": self.flushes,
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+            "last_seconds": self.last_seconds,
+        }
+
+    def __repr__(self) -> str:
+        return "<flushes=%d, requests=%d, max_seconds=%.6f>" % (
+            self.flushes,
+            self.requests,
+            self.max_seconds,
+        )
+
+
+class _PendingRequest:
+    __slots__ = ("cell_id", "reactive", "enqueued_at", "num_requests")
+
+    def __init__(self, cell_id: IdType, reactive: bool, enqueued_at: float) -> None:
+        self.cell_id = cell_id
+        self.reactive = reactive
+        self.enqueued_at = enqueued_at
+        self.num_requests = 1
+
+
+class ReactiveScheduler:
+    """
+    Queue of execution schedule requests made from the kernel side (e.g. when a
+    widget's value changes), keyed by the cell whose symbols were updated.
+    Instead of waiting out a fixed debounce interval, a single flush is put on
+    the kernel's event loop for the first request; every request that arrives
+    before it runs (i.e., during the same loop iteration) is coalesced into it.
+    The flush computes one schedule on behalf of the topmost pending cell.
+    """
+
+    def __init__(self, comm_manager: "CommManager") -> None:
+        self.comm_manager = comm_manager
+        # schedules callbacks on the shell thread; if None, requests are
+        # flushed as soon as they are made
+        self.schedule_on_shell_thread: Optional[ShellThreadScheduler] = None
+        self.stats = ReactiveScheduleStats()
+        self._lock = threading.Lock()
+        self._pending: Dict[IdType, _PendingRequest] = {}
+        self._flush_scheduled = False
+
+    @property
+    def has_pending(self) -> bool:
+        return len(self._pending) > 0
+
+    def request(self, cell_id: IdType, reactive: bool) -> None:
+        with self._lock:
+            pending = self._pending.get(cell_id)
+            if pending is None:
+                self._pending[cell_id] = _PendingRequest(
+                    cell_id, reactive, time.perf_counter()
+                )
+            else:
+                pending.reactive = pending.reactive or reactive
+                pending.num_requests += 1
+            should_schedule = not self._flush_scheduled
+            self._flush_scheduled = True
+        if not should_schedule:
+            return
+        scheduler = self.schedule_on_shell_thread
+        if scheduler is None:
+            self.flush()
+        else:
+            scheduler(self.flush)
+
+    def _pop_pending(self) -> List[_PendingRequest]:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flush_scheduled = False
+        heap: List[Tuple[int, int, _PendingRequest]] = []
+        for idx, req in enumerate(pending.values()):
+            cell = cells().from_id_nullable(req.cell_id)
+            heapq.heappush(heap, (-1 if cell is None else cell.position, idx, req))
+        return [heapq.heappop(heap)[-1] for _ in range(len(heap))]
+
+    def flush(self) -> None:
+        """Compute the schedule for the requests made so far. Must be called from the shell thread."""
+        pending = self._pop_pending()
+        if len(pending) == 0:
+            return
+        flow_ = self.comm_manager.flow
+        settings = flow_.mut_settings
+        exec_schedule = settings.exec_schedule
+        try:
+            if exec_schedule == ExecutionSchedule.DAG_BASED:
+                settings.exec_schedule = ExecutionSchedule.HYBRID_DAG_LIVENESS_BASED
+            flow_.get_and_set_exception_raised_during_execution(None)
+            reactive = any(req.reactive for req in pending)
+            self.comm_manager.handle(
+                {
+                    "type": "compute_exec_schedule",
+                    "executed_cell_id": pending[0].cell_id,
+                    "is_reactively_executing": reactive,
+                    "allow_new_ready": reactive,
+                }
+            )
+        finally:
+            settings.exec_schedule = exec_schedule
+            self.stats.record(
+                sum(req.num_requests for req in pending),
+                time.perf_counter() - min(req.enqueued_at for req in pending),
+            )
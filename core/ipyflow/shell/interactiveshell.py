@@ -30,6 +30,7 @@ from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.flow import NotebookFlow
 from ipyflow.line_magics import register_tracer
 from ipyflow.memoization import MemoizedOutputLevel
+from ipyflow.slicing.mixin import bump_slice_graph_version
 from ipyflow.tracing.flow_ast_rewriter import DataflowAstRewriter
 from ipyflow.tracing.interrupt_tracer import InterruptTracer
 from ipyflow.tracing.ipyflow_tracer import DataflowTracer, StackFrameManager
@@ -477,6 +478,7 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
             if should_trace:
                 self.after_run_cell(raw_cell)
             elif cell.prev_cell is not None:
+                bump_slice_graph_version()
                 cell.raw_static_parents = cell.prev_cell.raw_static_parents
                 cell.raw_dynamic_parents = cell.prev_cell.raw_dynamic_parents
         except Exception as e:
@@ -485,6 +487,9 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
             self.on_exception(e)
         else:
             self.on_exception(None)
+        flow_ = singletons.flow()
+        if flow_.profiler.enabled:
+            flow_.comm_manager.send_profile_stats(flow_.cell_counter())
         return ret
 
     def after_init_class(self) -> None:
@@ -506,6 +511,8 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
     def before_enter_tracing_context(self) -> None:
         flow_ = singletons.flow()
         flow_.updated_symbols.clear()
+        if flow_.profiler.enabled and singletons.tracer_initialized():
+            flow_.profiler.instrument_tracer(singletons.tracer())
 
     @contextmanager
     def inner_tracing_context(self) -> Generator[None, None, None]:
@@ -520,13 +527,51 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
             ):
                 yield
 
+    def _get_content_for_persisted_memoized_run(self, cell: Cell) -> Optional[str]:
+        execution = cell.persisted_memoized_execution
+        assert execution is not None
+        flow_ = singletons.flow()
+        for idx, stmt_node in enumerate(cell.to_ast().body):
+            Statement.create_and_track(
+                stmt_node, timestamp=Timestamp(self.cell_counter(), idx)
+            )
+        cell.skipped_due_to_memoization_ctr = cell.cell_ctr
+        print_purple(
+            "Detected identical symbol usages to a persisted run; reusing memoized result..."
+        )
+        if execution.out_value is not None:
+            self.user_ns.setdefault("Out", {})[cell.cell_ctr] = execution.out_value
+        deps = {
+            sym
+            for sym in (
+                flow_.global_scope.lookup_symbol_by_name_this_indentation(name)
+                for name in execution.input_digests
+            )
+            if sym is not None
+        }
+        for name, stmt_num, value in execution.outputs:
+            self.user_ns[name] = value
+            sym = flow_.global_scope.lookup_symbol_by_name_this_indentation(name)
+            if sym is None:
+                sym = flow_.global_scope.upsert_symbol_for_name(
+                    name, value, deps=deps, propagate=False
+                )
+            elif sym.obj is not value:
+                sym.update_obj_ref(value)
+            sym.refresh(timestamp=Timestamp(self.cell_counter(), stmt_num))
+        if cell.memoized_output_level == MemoizedOutputLevel.VERBOSE:
+            cell.captured_output = execution.displayed_output
+            execution.displayed_output.show(render_out_expr=False)
+        return cell.get_transformed_memoized_content(ctr=cell.cell_ctr)
+
     def _get_content_for_memoized_run(self, cell: Cell) -> Optional[str]:
-        prev_cell = cell.prev_cell
-        if prev_cell is None:
-            return None
         identical_result_ctr = cell.get_memoized_counter()
         if identical_result_ctr is None:
             return None
+        elif cell.persisted_memoized_execution is not None:
+            return self._get_content_for_persisted_memoized_run(cell)
+        prev_cell = cell.prev_cell
+        assert prev_cell is not None
         (
             _,
             memoized_outputs,
@@ -653,7 +698,17 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
     def _handle_memoization(self) -> None:
         cell = Cell.current_cell()
         prev_cell = cell.prev_cell
-        if cell.skipped_due_to_memoization_ctr > 0:
+        if cell.persisted_memoized_execution is not None:
+            # no previous cell to copy edges from; link to the current input defs
+            flow_ = singletons.flow()
+            for name in cell.persisted_memoized_execution.input_digests:
+                sym = flow_.global_scope.lookup_symbol_by_name_this_indentation(name)
+                if sym is None or not 0 < sym.timestamp.cell_num < cell.cell_ctr:
+                    continue
+                parent_cell = Cell.at_counter(sym.timestamp.cell_num)
+                for _ in flow_.mut_settings.iter_slicing_contexts():
+                    cell.add_parent_edge(parent_cell, sym)
+        elif cell.skipped_due_to_memoization_ctr > 0:
             assert prev_cell is not None
             cell.to_ast(override=prev_cell.to_ast())
             prev_cell = Cell.at_counter(cell.skipped_due_to_memoization_ctr)
@@ -686,19 +741,14 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
             prev_cell.captured_output.show()
         if prev_cell is not None:
             captured = prev_cell.captured_output
-            if captured is not None and (
-                sum(
-                    sum(len(datum) for datum in output.data.values())
-                    for output in captured.outputs
-                )
-                + len(captured.stdout)
-                + len(captured.stderr)
-                > _CAPTURE_OUTPUT_SAVE_LIMIT
-            ):
+            if captured is not None and captured.nbytes > _CAPTURE_OUTPUT_SAVE_LIMIT:
                 # don't save potentially large outputs for previous versions
                 prev_cell.captured_output = None
         if cell.captured_output is None:
             cell.captured_output = self.tee_output_tracer.capture_output
+        if cell.captured_output is not None:
+            # past outputs beyond the store's budget get spilled to disk
+            flow_.captured_output_store.track(cell.captured_output)
 
     def after_run_cell(self, _cell_content: str) -> None:
         self._handle_output()
@@ -707,12 +757,7 @@ class IPyflowInteractiveShell(singletons.IPyflowShell, InteractiveShell):
         flow_ = singletons.flow()
         if not flow_.mut_settings.dataflow_enabled:
             return
-        # TODO: avoid bad performance by keeping track of symbols updated in this cell
-        this_cell_symbols = [
-            sym
-            for sym in flow_.all_symbols()
-            if sym.timestamp.cell_num == Cell.exec_counter()
-        ]
+        this_cell_symbols = flow_.symbols_updated_in_cell(Cell.exec_counter())
         this_cell_dangling_symbols = {
             sym for sym in this_cell_symbols if sym._is_dangling_on_edges
         }
@@ -4,10 +4,12 @@ import builtins
 import logging
 import sys
 import textwrap
+from array import array
 from typing import (
     TYPE_CHECKING,
     Any,
     Dict,
+    Hashable,
     Iterable,
     List,
     Optional,
@@ -51,6 +53,86 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
 
+# bumped whenever slicing edges (or what their ids refer to) may have changed
+_slice_graph_version = 0
+
+
+def bump_slice_graph_version() -> None:
+    global _slice_graph_version
+    _slice_graph_version += 1
+
+
+class _SliceGraph:
+    """
+    The sliceables reached while slicing, numbered densely in the order they are
+    reached, along with their resolved parents as arrays of those numbers and the
+    memoized closures computed over them. A graph is only used for as long as its
+    key (which includes the edge version) stays the same.
+    """
+
+    def __init__(self, key: Hashable) -> None:
+        self.key = key
+        self.nodes: List["SliceableMixin"] = []
+        self._index_by_node_id: Dict[int, int] = {}
+        self._parents: List[Optional["array[int]"]] = []
+        self._closures: Dict[int, "array[int]"] = {}
+
+    def index_of(self, node: "SliceableMixin") -> int:
+        idx = self._index_by_node_id.get(id(node))
+        if idx is None:
+            idx = len(self.nodes)
+            self._index_by_node_id[id(node)] = idx
+            self.nodes.append(node)
+            self._parents.append(None)
+        return idx
+
+    def _parent_indices(self, idx: int) -> "array[int]":
+        parent_indices = self._parents[idx]
+        if parent_indices is not None:
+            return parent_indices
+        node = self.nodes[idx]
+        parent_indices = array("l")
+        for _ in flow().mut_settings.iter_slicing_contexts():
+            for pid in node.raw_parents.keys():
+                parent = node.from_id(pid)
+                while parent.timestamp > node.timestamp:
+                    if getattr(parent, "override", False):
+                        break
+                    parent = parent.prev  # type: ignore[assignment]
+                parent_indices.append(self.index_of(parent))
+        self._parents[idx] = parent_indices
+        return parent_indices
+
+    def closure(self, root: int) -> "array[int]":
+        closure = self._closures.get(root)
+        if closure is not None:
+            return closure
+        closure = array("l")
+        visited = bytearray()
+        worklist = [root]
+        while worklist:
+            idx = worklist.pop()
+            if len(visited) < len(self.nodes):
+                visited.extend(bytes(len(self.nodes) - len(visited)))
+            if visited[idx]:
+                continue
+            visited[idx] = 1
+            closure.append(idx)
+            reached_closure = self._closures.get(idx)
+            if reached_closure is None:
+                worklist.extend(self._parent_indices(idx))
+                continue
+            for reached in reached_closure:
+                if not visited[reached]:
+                    visited[reached] = 1
+                    closure.append(reached)
+        self._closures[root] = closure
+        return closure
+
+
+_slice_graph_by_class: Dict[type, _SliceGraph] = {}
+
+
 class Slice:
     FUNC_PREFIX = f"{pyc.PYCCOLO_BUILTIN_PREFIX}_ipyflow_slice_func_"
     _func_counter = 0
@@ -301,6 +383,7 @@ class SliceableMixin(Protocol):
     def add_parent_edges(self, parent_ref: SliceRefType, syms: Set["Symbol"]) -> None:
         if not syms:
             return
+        bump_slice_graph_version()
         parent = self._from_ref(parent_ref)
         pid = parent.id
         if pid in self.raw_children:
@@ -324,6 +407,7 @@ class SliceableMixin(Protocol):
     ) -> None:
         if not syms:
             return
+        bump_slice_graph_version()
         parent = self._from_ref(parent_ref)
         pid = parent.id
         for edges, eid in ((self.raw_parents, pid), (parent.raw_children, self.id)):
@@ -340,6 +424,7 @@ class SliceableMixin(Protocol):
     def replace_parent_edges(
         self, prev_parent_ref: SliceRefType, new_parent_ref: SliceRefType
     ) -> None:
+        bump_slice_graph_version()
         prev_parent = self._from_ref(prev_parent_ref)
         new_parent = self._from_ref(new_parent_ref)
         syms = self.raw_parents.pop(prev_parent.id)
@@ -350,6 +435,7 @@ class SliceableMixin(Protocol):
     def replace_child_edges(
         self, prev_child_ref: SliceRefType, new_child_ref: SliceRefType
     ) -> None:
+        bump_slice_graph_version()
         prev_child = self._from_ref(prev_child_ref)
         new_child = self._from_ref(new_child_ref)
         syms = self.raw_children.pop(prev_child.id)
@@ -379,6 +465,7 @@ class SliceableMixin(Protocol):
 
     @raw_parents.setter
     def raw_parents(self, new_parents: Dict[IdType, Set["Symbol"]]) -> None:
+        bump_slice_graph_version()
         ctx = slicing_ctx_var.get()
         assert ctx is not None
         if ctx == SlicingContext.DYNAMIC:
@@ -410,6 +497,7 @@ class SliceableMixin(Protocol):
 
     @raw_children.setter
     def raw_children(self, new_children: Dict[IdType, Set["Symbol"]]) -> None:
+        bump_slice_graph_version()
         ctx = slicing_ctx_var.get()
         assert ctx is not None
         if ctx == SlicingContext.DYNAMIC:
@@ -419,19 +507,6 @@ class SliceableMixin(Protocol):
         else:
             assert False
 
-    def _make_slice_helper(self, closure: Set["SliceableMixin"]) -> None:
-        if self in closure:
-            return
-        closure.add(self)
-        for _ in flow().mut_settings.iter_slicing_contexts():
-            for pid in self.raw_parents.keys():
-                parent = self.from_id(pid)
-                while parent.timestamp > self.timestamp:
-                    if getattr(parent, "override", False):
-                        break
-                    parent = parent.prev  # type: ignore[assignment]
-                parent._make_slice_helper(closure)
-
     def make_slice(self) -> List["SliceableMixin"]:
         return self.make_multi_slice([self])
 
@@ -441,16 +516,33 @@ class SliceableMixin(Protocol):
         seeds: Iterable[Union[TimestampOrCounter, "SliceableMixin"]],
         seed_only: bool = False,
     ) -> List["SliceableMixin"]:
-        closure: Set["SliceableMixin"] = set()
+        graph = cls._get_slice_graph()
+        closure: Set[int] = set()
         for seed in seeds:
             slice_seed = (
                 cls.at_timestamp(seed) if isinstance(seed, (Timestamp, int)) else seed
             )
+            seed_idx = graph.index_of(slice_seed)
             if seed_only:
-                closure.add(slice_seed)
+                closure.add(seed_idx)
             else:
-                slice_seed._make_slice_helper(closure)
-        return sorted(closure, key=lambda dep: dep.timestamp)
+                closure.update(graph.closure(seed_idx))
+        return sorted(
+            (graph.nodes[idx] for idx in closure), key=lambda dep: dep.timestamp
+        )
+
+    @classmethod
+    def _get_slice_graph(cls) -> _SliceGraph:
+        flow_ = flow()
+        key = (
+            _slice_graph_version,
+            flow_.cell_counter(),
+            tuple(flow_.mut_settings.slicing_contexts()),
+        )
+        graph = _slice_graph_by_class.get(cls)
+        if graph is None or graph.key != key:
+            graph = _slice_graph_by_class[cls] = _SliceGraph(key)
+        return graph
 
     @staticmethod
     def make_cell_dict_from_closure(
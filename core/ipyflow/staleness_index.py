@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Array-backed snapshot of the parent edges between cells, so that the frontend
+checker can find stale parents, stale parent makers, and the parent edges that
+can make a cell ready with batched comparisons rather than with nested loops
+over cells, parent edges, symbols, and their enclosing namespaces. Per-symbol
+features (timestamps, enclosing namespace symbols) are computed once per
+snapshot instead of once per edge. Requires NumPy, which is optional; without
+it, the frontend checker uses the loops.
+"""
+
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from ipyflow.data_model.cell import Cell, cells
+from ipyflow.singletons import flow
+from ipyflow.slicing.context import SlicingContext, slicing_ctx_var
+from ipyflow.types import IdType
+
+if TYPE_CHECKING:
+    from ipyflow.data_model.symbol import Symbol
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+# stands in for a missing visible timestamp; below any cell counter
+_NO_COUNTER = -(2**62)
+
+
+def _import_numpy() -> Optional[Any]:
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+# (cell id, parent id, slicing context)
+EdgeKey = Tuple[IdType, IdType, Optional[SlicingContext]]
+
+
+class StalenessIndex:
+    def __init__(self, np: Any) -> None:
+        self.np = np
+        self._sym_ids: Dict["Symbol", int] = {}
+        self._ancestor_ids_by_sym: Dict["Symbol", List[int]] = {}
+        self._max_ancestor_ctr: List[int] = []
+        self._shallow_ctr: List[int] = []
+        self._visible_ctr: List[int] = []
+
+    @classmethod
+    def create(cls) -> Optional["StalenessIndex"]:
+        if not flow().mut_settings.vectorized_staleness:
+            return None
+        np = _import_numpy()
+        if np is None:
+            return None
+        return cls(np)
+
+    def _sym_id(self, sym: "Symbol") -> int:
+        sym_id = self._sym_ids.get(sym)
+        if sym_id is not None:
+            return sym_id
+        sym_id = self._sym_ids[sym] = len(self._shallow_ctr)
+        shallow_ctr = sym.shallow_timestamp.cell_num
+        visible_ts = sym.visible_timestamp
+        self._shallow_ctr.append(shallow_ctr)
+        self._visible_ctr.append(
+            _NO_COUNTER if visible_ts is None else visible_ts.cell_num
+        )
+        self._max_ancestor_ctr.append(shallow_ctr)
+        return sym_id
+
+    def _ancestor_ids(self, sym: "Symbol") -> List[int]:
+        """Ids of `sym` and of the symbols of its enclosing namespaces."""
+        ancestor_ids = self._ancestor_ids_by_sym.get(sym)
+        if ancestor_ids is None:
+            ancestor_ids = [self._sym_id(anc) for anc in sym.traverse_up_namespaces()]
+            self._ancestor_ids_by_sym[sym] = ancestor_ids
+            self._max_ancestor_ctr[ancestor_ids[0]] = max(
+                self._shallow_ctr[anc_id] for anc_id in ancestor_ids
+            )
+        return ancestor_ids
+
+    def _group_any(self, row_edges: Any, row_values: Any, num_edges: int) -> Any:
+        return self.np.bincount(row_edges, weights=row_values, minlength=num_edges) > 0
+
+    def compute_stale_parents(
+        self, cells_to_check: List[Cell]
+    ) -> Dict[IdType, Set[IdType]]:
+        """
+        Parents of the given cells that are out of date with respect to a symbol
+        (or an enclosing namespace thereof) that the cell uses from them.
+        """
+        np = self.np
+        edges: List[Tuple[IdType, IdType]] = []
+        parent_ctrs: List[int] = []
+        row_edges: List[int] = []
+        row_syms: List[int] = []
+        for cell in cells_to_check:
+            for _ in flow().mut_settings.iter_slicing_contexts():
+                for pid, syms in cell.directional_parents.items():
+                    edge_idx = len(edges)
+                    edges.append((cell.cell_id, pid))
+                    parent_ctrs.append(cells().from_id(pid).cell_ctr)
+                    for sym in syms:
+                        row_edges.append(edge_idx)
+                        row_syms.append(self._ancestor_ids(sym)[0])
+        if len(row_edges) == 0:
+            return {}
+        row_edges_arr = np.array(row_edges, dtype=np.int64)
+        is_stale = self._group_any(
+            row_edges_arr,
+            np.array(self._max_ancestor_ctr, dtype=np.int64)[row_syms]
+            > np.array(parent_ctrs, dtype=np.int64)[row_edges_arr],
+            len(edges),
+        )
+        stale_parents: Dict[IdType, Set[IdType]] = {}
+        for edge_idx in np.flatnonzero(is_stale).tolist():
+            cell_id, pid = edges[edge_idx]
+            stale_parents.setdefault(cell_id, set()).add(pid)
+        return stale_parents
+
+    def compute_stale_parent_makers(
+        self,
+    ) -> Tuple[
+        Dict[IdType, Dict[IdType, Set[IdType]]],
+        Dict[IdType, Dict[IdType, Set[IdType]]],
+    ]:
+        """
+        For each cell, the cells above it that (may) update a symbol that the
+        cell uses from one of its parents, along with those parents. Returns the
+        result indexed both by child and by updating cell.
+        """
+        np = self.np
+        ordered_cells = list(cells().iterate_over_notebook_in_position_order())
+        use_ranks: List[int] = []
+        use_parents: List[IdType] = []
+        use_syms: List[int] = []
+        write_ranks: List[int] = []
+        write_syms: List[int] = []
+        for rank, cell in enumerate(ordered_cells):
+            for _ in flow().mut_settings.iter_slicing_contexts():
+                for pid, syms in cell.raw_parents.items():
+                    for qual_sym in syms:
+                        for sym_id in self._ancestor_ids(qual_sym):
+                            use_ranks.append(rank)
+                            use_parents.append(pid)
+                            use_syms.append(sym_id)
+            static_writes = set(cell.static_writes)
+            if cell.last_check_result is not None:
+                static_writes &= cell.last_check_result.modified
+            for sym in static_writes | cell.dynamic_writes:
+                write_ranks.append(rank)
+                write_syms.append(self._sym_id(sym))
+        by_child: Dict[IdType, Dict[IdType, Set[IdType]]] = {}
+        by_executed: Dict[IdType, Dict[IdType, Set[IdType]]] = {}
+        if len(use_syms) == 0 or len(write_syms) == 0:
+            return by_child, by_executed
+        # join the uses with the writes of the same symbol in cells above
+        write_syms_arr = np.array(write_syms, dtype=np.int64)
+        write_order = np.argsort(write_syms_arr, kind="stable")
+        sorted_write_syms = write_syms_arr[write_order]
+        use_syms_arr = np.array(use_syms, dtype=np.int64)
+        lo = np.searchsorted(sorted_write_syms, use_syms_arr, side="left")
+        counts = np.searchsorted(sorted_write_syms, use_syms_arr, side="right") - lo
+        use_idx = np.repeat(np.arange(len(use_syms)), counts)
+        offsets = np.arange(len(use_idx)) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        write_idx = write_order[np.repeat(lo, counts) + offsets]
+        use_ranks_arr = np.array(use_ranks, dtype=np.int64)[use_idx]
+        write_ranks_arr = np.array(write_ranks, dtype=np.int64)[write_idx]
+        is_above = write_ranks_arr < use_ranks_arr
+        for use_rank, write_rank, use_i in zip(
+            use_ranks_arr[is_above].tolist(),
+            write_ranks_arr[is_above].tolist(),
+            use_idx[is_above].tolist(),
+        ):
+            cell_id = ordered_cells[use_rank].cell_id
+            executed_cell_id = ordered_cells[write_rank].cell_id
+            pid = use_parents[use_i]
+            by_child.setdefault(cell_id, {}).setdefault(executed_cell_id, set()).add(
+                pid
+            )
+            by_executed.setdefault(executed_cell_id, {}).setdefault(cell_id, set()).add(
+                pid
+            )
+        return by_child, by_executed
+
+    def compute_readiness_candidates(self, cells_to_check: List[Cell]) -> Set[EdgeKey]:
+        """
+        The parent edges of the given cells that can possibly make them ready
+        under the DAG-based schedules; readiness only needs to examine these.
+        """
+        np = self.np
+        flow_ = flow()
+        fake_edge_sym = flow_.fake_edge_sym
+        fake_sym_id = self._sym_id(fake_edge_sym)
+        edges: List[EdgeKey] = []
+        child_ctrs: List[int] = []
+        parent_ctrs: List[int] = []
+        row_edges: List[int] = []
+        row_syms: List[int] = []
+        for cell in cells_to_check:
+            for _ in flow_.mut_settings.iter_slicing_contexts():
+                ctx = slicing_ctx_var.get()
+                for pid, raw_syms in cell.directional_parents.items():
+                    edge_idx = len(edges)
+                    edges.append((cell.cell_id, pid, ctx))
+                    child_ctrs.append(cell.cell_ctr)
+                    parent_ctrs.append(cells().from_id(pid).cell_ctr)
+                    for sym in raw_syms - cell.static_removed_symbols:
+                        row_edges.append(edge_idx)
+                        row_syms.append(self._sym_id(sym))
+        if len(edges) == 0:
+            return set()
+        num_edges = len(edges)
+        child_ctrs_arr = np.array(child_ctrs, dtype=np.int64)
+        parent_ctrs_arr = np.array(parent_ctrs, dtype=np.int64)
+        row_edges_arr = np.array(row_edges, dtype=np.int64)
+        row_syms_arr = np.array(row_syms, dtype=np.int64)
+        row_parent_ctrs = parent_ctrs_arr[row_edges_arr]
+        row_shallow_ctrs = np.array(self._shallow_ctr, dtype=np.int64)[row_syms_arr]
+        row_visible_ctrs = np.array(self._visible_ctr, dtype=np.int64)[row_syms_arr]
+        has_fake_edge = self._group_any(
+            row_edges_arr, row_syms_arr == fake_sym_id, num_edges
+        )
+        any_shallow_from_parent = self._group_any(
+            row_edges_arr, row_shallow_ctrs == row_parent_ctrs, num_edges
+        )
+        any_visible_from_parent = self._group_any(
+            row_edges_arr,
+            (row_visible_ctrs != _NO_COUNTER)
+            & (row_visible_ctrs != row_shallow_ctrs)
+            & (row_visible_ctrs == row_parent_ctrs),
+            num_edges,
+        )
+        is_candidate = (
+            (has_fake_edge & (child_ctrs_arr < 0) & (parent_ctrs_arr > 0))
+            | (
+                (np.maximum(child_ctrs_arr, flow_.min_timestamp) < parent_ctrs_arr)
+                & (flow_.mut_settings.pull_reactive_updates | any_shallow_from_parent)
+            )
+            | any_visible_from_parent
+        )
+        return {edges[edge_idx] for edge_idx in np.flatnonzero(is_candidate).tolist()}
@@ -318,6 +318,7 @@ class NamespaceClear(StandardMutation):
         namespace = mutated_sym.namespace
         if namespace is None:
             return
+        namespace.materialize_lazy_subscript_symbols()
         for name in sorted(
             (
                 sym.name
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+import ast
+import inspect
+import logging
+from collections import OrderedDict
+from types import FrameType
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set, Tuple
+
+from ipyflow.data_model.timestamp import Timestamp
+from ipyflow.singletons import flow
+
+if TYPE_CHECKING:
+    from ipyflow.data_model.scope import Scope
+    from ipyflow.data_model.symbol import Symbol
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+# (function node id, function symbol version, argument types)
+FunctionSummaryKey = Tuple[int, Any, Tuple[type, ...]]
+
+
+_UNSUMMARIZABLE_CODE_FLAGS = (
+    inspect.CO_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ASYNC_GENERATOR
+)
+
+
+# nodes whose presence means the set of symbols read (and the deps of the result)
+# can vary from call to call, even for the same argument types
+_PATH_DEPENDENT_NODES: Tuple[type, ...] = (
+    ast.IfExp,
+    ast.BoolOp,
+    ast.comprehension,
+    ast.Lambda,
+    ast.Await,
+    ast.Yield,
+    ast.YieldFrom,
+) + ((ast.NamedExpr,) if hasattr(ast, "NamedExpr") else ())
+
+
+def has_summarizable_body(func_node: ast.AST) -> bool:
+    """
+    Whether a function's dataflow effects are fully determined by the argument
+    types and the symbols it reads: we only summarize bodies consisting of a
+    single returned expression (e.g. lambdas and one-line helpers), since the
+    dependencies of the return value are otherwise path dependent or come from
+    symbols local to each call, neither of which is visible to a replay.
+    """
+    if isinstance(func_node, ast.Lambda):
+        body_expr: Optional[ast.expr] = func_node.body
+    elif isinstance(func_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        body = func_node.body
+        if (
+            len(body) > 0
+            and isinstance(body[0], ast.Expr)
+            and isinstance(body[0].value, ast.Constant)
+        ):
+            body = body[1:]
+        if len(body) != 1 or not isinstance(body[0], ast.Return):
+            return False
+        body_expr = body[0].value
+    else:
+        return False
+    if body_expr is None:
+        return False
+    return not any(
+        isinstance(node, _PATH_DEPENDENT_NODES) for node in ast.walk(body_expr)
+    )
+
+
+def make_call_signature(frame: FrameType) -> Optional[Tuple[type, ...]]:
+    """
+    Types of the arguments bound in a function frame that has just been entered,
+    or ``None`` if the frame belongs to a generator or coroutine (whose bodies
+    return to the caller more than once and therefore cannot be summarized).
+    """
+    code = frame.f_code
+    if code.co_flags & _UNSUMMARIZABLE_CODE_FLAGS:
+        return None
+    num_args = (
+        code.co_argcount
+        + code.co_kwonlyargcount
+        + bool(code.co_flags & inspect.CO_VARARGS)
+        + bool(code.co_flags & inspect.CO_VARKEYWORDS)
+    )
+    f_locals = frame.f_locals
+    return tuple(type(f_locals.get(name)) for name in code.co_varnames[:num_args])
+
+
+class FunctionSummary:
+    """
+    Dataflow effects of one traced execution of a notebook-defined function body
+    that are visible from outside of its call scope. Usages of outer symbols are
+    recorded so that they can be replayed at later call sites that execute the
+    uninstrumented body instead. The summary is non-replayable if the body is
+    not summarizable, if it updated an outer symbol (a mutation, a global store,
+    an attribute store on an argument, etc.), or if it called into another
+    notebook-defined function, since none of these can be replayed without
+    tracing the body again.
+    """
+
+    def __init__(
+        self,
+        key: FunctionSummaryKey,
+        func_node: ast.AST,
+        frame: FrameType,
+        call_scope: "Scope",
+    ) -> None:
+        self.key = key
+        self.func_node = func_node
+        self.frame: Optional[FrameType] = frame
+        self.call_scope = call_scope
+        self.is_replayable = has_summarizable_body(func_node)
+        self.used_symbols: Dict["Symbol", Tuple[Optional[ast.AST], bool]] = {}
+
+    def _is_local(self, sym: "Symbol") -> bool:
+        scope: Optional["Scope"] = sym.containing_scope
+        while scope is not None:
+            if scope is self.call_scope:
+                return True
+            scope = scope.parent_scope
+        return False
+
+    def record_usage(
+        self, sym: "Symbol", used_node: Optional[ast.AST], exclude_ns: bool
+    ) -> None:
+        if self._is_local(sym):
+            return
+        prev = self.used_symbols.get(sym)
+        if prev is not None:
+            exclude_ns = exclude_ns and prev[1]
+        self.used_symbols[sym] = (used_node, exclude_ns)
+
+    def record_update(self, sym: "Symbol") -> None:
+        if self.is_replayable and not self._is_local(sym):
+            self.is_replayable = False
+
+    def finish(self) -> None:
+        # don't keep the frame (and its locals) alive past the call
+        self.frame = None
+
+    def replay(self) -> None:
+        used_time = Timestamp.current()
+        for sym, (used_node, exclude_ns) in self.used_symbols.items():
+            if sym.is_garbage:
+                continue
+            sym.update_usage_info(
+                used_time=used_time, used_node=used_node, exclude_ns=exclude_ns
+            )
+
+
+class FunctionSummaryCache:
+    """
+    Bounded LRU cache of function summaries. Summaries are only ever looked up
+    for the current version of a function's symbol, so storing a summary for a
+    new version (e.g. after the function is redefined) also drops the ones for
+    the older versions.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[FunctionSummaryKey, FunctionSummary]" = (
+            OrderedDict()
+        )
+        # functions are identified by their symbol, or by their id if they have none
+        self._function_by_key: Dict[FunctionSummaryKey, Any] = {}
+        self._keys_by_function: Dict[Any, Set[FunctionSummaryKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._function_by_key.clear()
+        self._keys_by_function.clear()
+
+    @staticmethod
+    def _function_for_key(key: FunctionSummaryKey) -> Any:
+        function_id = key[0]
+        func_sym = flow().statement_to_func_sym.get(function_id)
+        return function_id if func_sym is None else func_sym
+
+    def get(self, key: FunctionSummaryKey) -> Optional[FunctionSummary]:
+        summary = self._entries.get(key)
+        if summary is not None:
+            self._entries.move_to_end(key)
+        return summary
+
+    def put(self, summary: FunctionSummary) -> None:
+        key = summary.key
+        if key in self._entries:
+            self._remove(key)
+        function = self._function_for_key(key)
+        stale_keys = [
+            k for k in self._keys_by_function.get(function, ()) if k[1] != key[1]
+        ]
+        for stale_key in stale_keys:
+            self._remove(stale_key)
+        self._entries[key] = summary
+        self._function_by_key[key] = function
+        self._keys_by_function.setdefault(function, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: FunctionSummaryKey) -> None:
+        del self._entries[key]
+        function = self._function_by_key.pop(key)
+        keys = self._keys_by_function[function]
+        keys.discard(key)
+        if len(keys) == 0:
+            del self._keys_by_function[function]
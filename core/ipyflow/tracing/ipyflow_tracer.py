@@ -41,6 +41,7 @@ from ipyflow.api.lift import timestamp as api_timestamp
 from ipyflow.api.lift import unset_tag as api_unset_tag
 from ipyflow.api.lift import users as api_users
 from ipyflow.api.lift import watchpoints as api_watchpoints
+from ipyflow.data_model import is_column_of, is_duped_attrsub_obj
 from ipyflow.data_model.cell import cells
 from ipyflow.data_model.namespace import Namespace
 from ipyflow.data_model.scope import Scope
@@ -53,6 +54,11 @@ from ipyflow.singletons import SingletonBaseTracer, flow, shell
 from ipyflow.tracing.external_calls import resolve_external_call
 from ipyflow.tracing.external_calls.base_handlers import ExternalCallHandler
 from ipyflow.tracing.flow_ast_rewriter import DataflowAstRewriter
+from ipyflow.tracing.function_summary import (
+    FunctionSummary,
+    FunctionSummaryKey,
+    make_call_signature,
+)
 from ipyflow.tracing.symbol_resolver import resolve_rval_symbols
 from ipyflow.tracing.uninstrument import uninstrument
 from ipyflow.tracing.utils import match_container_obj_or_namespace_with_literal_nodes
@@ -143,6 +149,20 @@ class StackFrameManager(SingletonBaseTracer):
         return user_call_depth
 
 
+def _is_columnar_access(
+    obj: Any, attr_or_subscript: AttrSubVal, event: pyc.TraceEvent
+) -> bool:
+    """
+    Whether accessing a frame attribute or subscript for which there is no symbol
+    yet only involves that one column (and not the whole frame). Such columns have
+    not been updated since the frame was, and storing to a column does not read
+    the others.
+    """
+    if event in (pyc.before_attribute_store, pyc.before_subscript_store):
+        return is_duped_attrsub_obj(obj)
+    return is_column_of(obj, attr_or_subscript)
+
+
 class DataflowTracer(StackFrameManager):
     ast_rewriter_cls = DataflowAstRewriter
     should_patch_meta_path = True
@@ -161,6 +181,7 @@ class DataflowTracer(StackFrameManager):
         self._module_stmt_counter = 0
         self._seen_loop_ids: Set[NodeId] = set()
         self._seen_functions_ids: Set[NodeId] = set()
+        self.function_summaries_in_progress: List[FunctionSummary] = []
         self.prev_event: Optional[pyc.TraceEvent] = None
         self.prev_trace_stmt: Optional[Statement] = None
         self.traced_statements: Dict[NodeId, Statement] = {}
@@ -309,6 +330,54 @@ class DataflowTracer(StackFrameManager):
         for stmt in self.traced_statements.values():
             stmt.mark_finished()
         self._deactivate_guards()
+        # anything still in progress returned while tracing was disabled
+        self.function_summaries_in_progress.clear()
+
+    def record_usage_for_function_summaries(
+        self,
+        sym: Symbol,
+        used_time: Optional[Timestamp],
+        used_node: Optional[ast.AST],
+        exclude_ns: bool,
+    ) -> None:
+        if len(self.function_summaries_in_progress) == 0:
+            return
+        if used_time is not None and used_time != Timestamp.current():
+            return
+        for summary in self.function_summaries_in_progress:
+            summary.record_usage(sym, used_node, exclude_ns)
+
+    def record_update_for_function_summaries(self, sym: Symbol) -> None:
+        for summary in self.function_summaries_in_progress:
+            summary.record_update(sym)
+
+    def _make_function_summary_key(
+        self, function_id: NodeId, frame: FrameType
+    ) -> Optional[FunctionSummaryKey]:
+        if self.cur_frame_original_scope.is_global:
+            # the call transition for this frame was skipped
+            return None
+        signature = make_call_signature(frame)
+        if signature is None:
+            return None
+        func_sym = flow().statement_to_func_sym.get(function_id)
+        version = None if func_sym is None else func_sym.timestamp
+        return function_id, version, signature
+
+    def _finish_function_summary(self, frame: FrameType, completed: bool) -> None:
+        in_progress = self.function_summaries_in_progress
+        if not any(summary.frame is frame for summary in in_progress):
+            return
+        while len(in_progress) > 0:
+            summary = in_progress.pop()
+            is_for_frame = summary.frame is frame
+            summary.finish()
+            if not is_for_frame:
+                # its frame returned while tracing was disabled; discard it
+                continue
+            if completed:
+                flow().function_summaries.put(summary)
+            return
 
     def _handle_call_transition(self, trace_stmt: Statement, frame: FrameType) -> None:
         if (
@@ -474,6 +543,9 @@ class DataflowTracer(StackFrameManager):
             self._handle_call_transition(trace_stmt, frame)
         if event == pyc.return_:
             self._handle_return_transition(trace_stmt, frame, ret)
+            self._finish_function_summary(
+                frame, completed=self.prev_event != pyc.exception
+            )
         self.prev_trace_stmt = trace_stmt
         self.prev_event = event
 
@@ -932,7 +1004,10 @@ class DataflowTracer(StackFrameManager):
             ):
                 self.pending_usage_updates_by_sym[sym_for_obj] = (
                     self.pending_usage_updates_by_sym.get(sym_for_obj, True)
-                    and (sym is not None)
+                    and (
+                        sym is not None
+                        or _is_columnar_access(obj, attr_or_subscript, event)
+                    )
                     and not call_context
                 )
             if sym is not None and event in (
@@ -1229,10 +1304,35 @@ class DataflowTracer(StackFrameManager):
             self._resolve_external_call()
 
     @pyc.register_raw_handler((pyc.before_function_body, pyc.before_lambda_body))
-    def before_function_body(self, _obj: Any, function_id: NodeId, *_, **__):
+    def before_function_body(
+        self, _obj: Any, function_id: NodeId, frame: FrameType, *_, **__
+    ):
+        for in_progress in self.function_summaries_in_progress:
+            # the effects of nested notebook function calls are not summarized
+            in_progress.is_replayable = False
         ret = self.is_tracing_enabled and function_id not in self._seen_functions_ids
-        if ret:
-            self._seen_functions_ids.add(function_id)
+        if not ret:
+            return ret
+        self._seen_functions_ids.add(function_id)
+        key = self._make_function_summary_key(function_id, frame)
+        if key is None:
+            return ret
+        func_node = self.ast_node_by_id[function_id]
+        summary = flow().function_summaries.get(key)
+        if summary is not None and summary.func_node is func_node:
+            if not summary.is_replayable:
+                return ret
+            # same function version and argument types as a previously traced
+            # call with no outer side effects: skip instrumentation and replay
+            # the outer symbol usages recorded for it instead
+            summary.replay()
+            return False
+        summary = FunctionSummary(key, func_node, frame, self.cur_frame_original_scope)
+        if summary.is_replayable:
+            self.function_summaries_in_progress.append(summary)
+        else:
+            summary.finish()
+            flow().function_summaries.put(summary)
         return ret
 
     @pyc.register_raw_handler(pyc.after_call)
@@ -1296,6 +1396,7 @@ class DataflowTracer(StackFrameManager):
             starred_idx = -1
             starred_namespace = None
             outer_deps = set()
+            is_lazy = len(literal) >= flow().mut_settings.min_lazy_literal_size
             for (i, inner_obj), (
                 inner_key_node,
                 inner_val_node,
@@ -1303,6 +1404,22 @@ class DataflowTracer(StackFrameManager):
                 literal, self.ast_node_by_id[node_id]  # type: ignore
             ):
                 # TODO: memoize symbol resolution; otherwise this will be quadratic for deeply nested literals
+                if (
+                    is_lazy
+                    and isinstance(inner_val_node, ast.Constant)
+                    and (
+                        inner_key_node is None
+                        or isinstance(inner_key_node, ast.Constant)
+                    )
+                    and isinstance(i, SubscriptIndices.types)
+                ):
+                    # no deps, so defer creating the symbol until something needs it
+                    self.active_literal_scope.defer_subscript_symbol_for_name(
+                        i,
+                        inner_obj,
+                        self.prev_trace_stmt_in_cur_frame.stmt_node,  # type: ignore[union-attr]
+                    )
+                    continue
                 if isinstance(inner_val_node, ast.Starred):
                     inner_symbols: Set[Symbol] = set()
                     starred_idx += 1
@@ -1,7 +1,8 @@
 import sys
 import threading
-from io import StringIO, TextIOBase
-from typing import Any, Optional, Union
+from collections import deque
+from io import TextIOBase
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, List, Optional
 
 import pyccolo as pyc
 from IPython.core.displayhook import DisplayHook
@@ -9,47 +10,139 @@ from IPython.core.displaypub import CapturingDisplayPublisher, DisplayPublisher
 from IPython.core.interactiveshell import InteractiveShell
 from IPython.utils.capture import CapturedIO
 
-from ipyflow.singletons import shell
+from ipyflow.singletons import NotebookFlow, flow, shell
 
+if TYPE_CHECKING:
+    from ipyflow.tracing.output_store import CapturedOutputStore
 
-class Tee:
-    def __init__(self, out1, out2):
-        self.out1 = out1
-        self.out2 = out2
-        self._in_write = False
 
-    def __getattr__(self, item):
-        if item in ("out1", "out2", "_in_write"):
-            raise AttributeError()
-        # delegate to the first output stream
-        return getattr(self.out1, item)
-
-    def write(self, data):
-        if self._in_write:
-            # Reentrant call. IPython >= 9 wraps ``sys.stdout.write`` per-cell (see
-            # ``InteractiveShell._tee``) to mirror output into its history. Because
-            # our ``StdstreamProxy`` routes ``.write`` through this ``Tee`` and
-            # redirects the resulting write-attribute assignment onto ``out1`` (the
-            # real stream), the wrapper's captured "original" write can point right
-            # back at ``Tee.write`` -- so writing to ``out1`` re-enters here and
-            # recurses infinitely. Break the cycle by sending the reentrant write
-            # straight to the underlying stream via its *class* ``write``, bypassing
-            # the instance-level monkeypatch.
-            cls_write = getattr(type(self.out1), "write", None)
-            if cls_write is not None:
-                return cls_write(self.out1, data)
-            return None
-        self._in_write = True
-        try:
-            result = self.out1.write(data)
-            self.out2.write(data)
-            return result
-        finally:
-            self._in_write = False
-
-    def flush(self):
-        self.out1.flush()
-        self.out2.flush()
+class CapturedStream:
+    """
+    In-memory capture of the text written to a stream while a cell runs. Writes
+    only append a reference to the written chunk; every so often, the latest
+    chunks are joined into a single block, since many small strings take much
+    more memory than their text. When ``max_chars`` is positive, only the first
+    and last ``max_chars // 2`` characters are kept: the oldest blocks after the
+    head are dropped as new ones come in, and ``dropped_chars`` counts the text
+    dropped in between.
+    """
+
+    __slots__ = (
+        "max_chars",
+        "dropped_chars",
+        "_head",
+        "_head_room",
+        "_tail_budget",
+        "_blocks",
+        "_blocks_size",
+        "_chunks",
+        "_chunks_size",
+        "_compact_size",
+    )
+
+    # number of chunks after which they are joined into a block
+    _COMPACT_THRESHOLD = 1024
+
+    def __init__(self, max_chars: int = 0) -> None:
+        self.max_chars = max_chars
+        self.dropped_chars = 0
+        self._head = ""
+        self._head_room = max(max_chars // 2, 0)
+        self._tail_budget = max_chars - self._head_room
+        self._blocks: Deque[str] = deque()
+        self._blocks_size = 0
+        self._chunks: List[str] = []
+        self._chunks_size = 0
+        self._compact_size = self._tail_budget if max_chars > 0 else sys.maxsize
+
+    def write(self, data: str) -> int:
+        chunks = self._chunks
+        chunks.append(data)
+        self._chunks_size += len(data)
+        if (
+            len(chunks) >= self._COMPACT_THRESHOLD
+            or self._chunks_size > self._compact_size
+        ):
+            self._compact()
+        return len(data)
+
+    def writelines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> None:
+        pass
+
+    def _compact(self) -> None:
+        text = "".join(self._chunks)
+        self._chunks.clear()
+        self._chunks_size = 0
+        if self._head_room > 0:
+            self._head += text[: self._head_room]
+            text = text[self._head_room :]
+            self._head_room = self.max_chars // 2 - len(self._head)
+        if len(text) == 0:
+            return
+        blocks = self._blocks
+        blocks.append(text)
+        self._blocks_size += len(text)
+        if self.max_chars <= 0:
+            return
+        while self._blocks_size - len(blocks[0]) >= self._tail_budget:
+            dropped = len(blocks.popleft())
+            self._blocks_size -= dropped
+            self.dropped_chars += dropped
+
+    def getvalue(self) -> str:
+        self._compact()
+        tail = "".join(self._blocks)
+        if self.max_chars > 0 and len(tail) > self._tail_budget:
+            self.dropped_chars += len(tail) - self._tail_budget
+            tail = tail[len(tail) - self._tail_budget :]
+        self._blocks.clear()
+        self._blocks.append(tail)
+        self._blocks_size = len(tail)
+        if self.dropped_chars == 0:
+            return self._head + tail
+        return "%s\n[... %d characters of output dropped ...]\n%s" % (
+            self._head,
+            self.dropped_chars,
+            tail,
+        )
+
+
+class TeeStream:
+    """
+    Installed in place of ``sys.stdout`` / ``sys.stderr``. Writes go straight to
+    the underlying stream, and are also recorded in ``capture`` when it is set
+    and the write comes from the main thread; everything else is delegated to
+    the underlying stream. Attributes assigned on it (e.g. IPython wrapping
+    ``sys.stdout.write`` to mirror output into its history) stay on it, so a
+    wrapped ``write`` cannot re-enter itself through the underlying stream.
+    """
+
+    def __init__(self, stream: TextIOBase) -> None:
+        self.stream = stream
+        self.capture: Optional[CapturedStream] = None
+        self._main_thread_ident = threading.main_thread().ident
+
+    def __getattr__(self, item: str) -> Any:
+        if item in ("stream", "capture", "_main_thread_ident"):
+            raise AttributeError(item)
+        return getattr(self.stream, item)
+
+    def write(self, data: str) -> Any:
+        capture = self.capture
+        if capture is not None and threading.get_ident() == self._main_thread_ident:
+            capture.write(data)
+        return self.stream.write(data)
+
+    def writelines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.write(line)
+
+    def flush(self) -> None:
+        self.stream.flush()
 
 
 class TeeDisplayHook:
@@ -103,8 +196,61 @@ class IPyflowCapturedIO(CapturedIO):
     def __init__(self, stdout, stderr, outputs=None, exec_ctr=None) -> None:
         super().__init__(stdout, stderr, outputs=outputs)
         self._exec_ctr = exec_ctr
+        # set once a CapturedOutputStore tracks this output; while spilled, the
+        # payload lives on disk and is loaded back the next time it is read
+        self._store: Optional["CapturedOutputStore"] = None
+        self._spilled_nbytes: Optional[int] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        state = dict(self.__dict__)
+        state["_store"] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        state.setdefault("_store", None)
+        state.setdefault("_spilled_nbytes", None)
+        self.__dict__.update(state)
+
+    @property
+    def is_spilled(self) -> bool:
+        return self._spilled_nbytes is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the captured payload, without loading it if spilled."""
+        if self._spilled_nbytes is not None:
+            return self._spilled_nbytes
+        return (
+            sum(
+                sum(len(datum) for datum in output.get("data", {}).values())
+                for output in self._outputs
+            )
+            + len(super().stdout)
+            + len(super().stderr)
+        )
+
+    def _ensure_loaded(self) -> None:
+        if self._spilled_nbytes is not None and self._store is not None:
+            self._store.load(self)
+
+    @property
+    def stdout(self) -> str:
+        self._ensure_loaded()
+        return super().stdout
+
+    @property
+    def stderr(self) -> str:
+        self._ensure_loaded()
+        return super().stderr
+
+    @property
+    def outputs(self):
+        self._ensure_loaded()
+        return super().outputs
 
     def show(self, render_out_expr: bool = True) -> None:
+        self._ensure_loaded()
         super().show()
         if not render_out_expr:
             return
@@ -114,30 +260,6 @@ class IPyflowCapturedIO(CapturedIO):
             shell_.displayhook(expr_result)
 
 
-class StdstreamProxy:
-    def __init__(self, capture_output_tee: "CaptureOutputTee", name: str) -> None:
-        self._capture_output_tee = capture_output_tee
-        self._name = name
-        self._inited = True
-
-    def _stream(self, include_tee: bool = True) -> Union[TextIOBase, Tee]:
-        stream = None
-        if include_tee and threading.current_thread().name == "MainThread":
-            stream = getattr(self._capture_output_tee, f"tee_sys_{self._name}")
-        if stream is None:
-            stream = getattr(self._capture_output_tee, f"sys_{self._name}")
-        return stream
-
-    def __getattr__(self, item: str) -> object:
-        return getattr(self._stream(), item)
-
-    def __setattr__(self, key: str, value: object) -> None:
-        if not self.__dict__.get("_inited", False):
-            super().__setattr__(key, value)
-        else:
-            self._stream(include_tee=False).__setattr__(key, value)
-
-
 class CaptureOutputTee:
     """
     Context manager for capturing and replicating stdout/err and rich display publishers.
@@ -152,10 +274,10 @@ class CaptureOutputTee:
         self.stderr = stderr
         self.display = display
         self.shell: Optional[InteractiveShell] = None
-        self.sys_stdout = sys.stdout
-        self.sys_stderr = sys.stderr
-        self.tee_sys_stdout: Optional[Tee] = None
-        self.tee_sys_stderr: Optional[Tee] = None
+        # how much of each stream to keep per cell (0 keeps everything)
+        self.max_stream_chars = 0
+        self.tee_sys_stdout: Optional[TeeStream] = None
+        self.tee_sys_stderr: Optional[TeeStream] = None
         self.save_display_pub: Optional[DisplayPublisher] = None
         self._in_context = False
 
@@ -168,15 +290,13 @@ class CaptureOutputTee:
 
         stdout = stderr = outputs = None
         if self.stdout:
-            stdout = StringIO()
-            stdout_tee = Tee(self.sys_stdout, stdout)
-            self.tee_sys_stdout = stdout_tee
-            # sys.stdout = stdout_tee  # type: ignore
+            stdout = CapturedStream(self.max_stream_chars)
+            if self.tee_sys_stdout is not None:
+                self.tee_sys_stdout.capture = stdout
         if self.stderr:
-            stderr = StringIO()
-            stderr_tee = Tee(self.sys_stderr, stderr)
-            self.tee_sys_stderr = stderr_tee
-            # sys.stderr = stderr_tee  # type: ignore
+            stderr = CapturedStream(self.max_stream_chars)
+            if self.tee_sys_stderr is not None:
+                self.tee_sys_stderr.capture = stderr
         if self.display and self.shell is not None:
             self.save_display_pub = self.shell.display_pub
             capture_display_pub = TeeCompatibleCapturingDisplayPublisher()
@@ -198,12 +318,10 @@ class CaptureOutputTee:
         if not self._in_context:
             return
         self._in_context = False
-        if self.stdout:
-            # sys.stdout = self.sys_stdout
-            self.tee_sys_stdout = None
-        if self.stderr:
-            # sys.stderr = self.sys_stderr
-            self.tee_sys_stderr = None
+        if self.stdout and self.tee_sys_stdout is not None:
+            self.tee_sys_stdout.capture = None
+        if self.stderr and self.tee_sys_stderr is not None:
+            self.tee_sys_stderr.capture = None
         if self.display and self.shell:
             self.shell.display_pub = self.save_display_pub
 
@@ -219,11 +337,16 @@ class OutputRecorder(pyc.BaseTracer):
 
     @pyc.register_raw_handler(pyc.init_module)
     def init_module(self, *_, **__):
-        if not isinstance(sys.stdout, StdstreamProxy):
-            self.capture_output_tee.sys_stdout = sys.stdout
-            self.capture_output_tee.sys_stderr = sys.stderr
-            sys.stdout = StdstreamProxy(self.capture_output_tee, "stdout")
-            sys.stderr = StdstreamProxy(self.capture_output_tee, "stderr")
+        if not isinstance(sys.stdout, TeeStream):
+            sys.stdout = TeeStream(sys.stdout)  # type: ignore[assignment]
+        if not isinstance(sys.stderr, TeeStream):
+            sys.stderr = TeeStream(sys.stderr)  # type: ignore[assignment]
+        self.capture_output_tee.tee_sys_stdout = sys.stdout
+        self.capture_output_tee.tee_sys_stderr = sys.stderr
+        if NotebookFlow.initialized():
+            self.capture_output_tee.max_stream_chars = (
+                flow().mut_settings.max_captured_stream_chars
+            )
         self.capturing_output = True
         self.capture_output = self.capture_output_tee.__enter__()
 
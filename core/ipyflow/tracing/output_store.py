@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+import zlib
+from collections import OrderedDict
+from io import StringIO
+from typing import Dict, Optional
+
+from ipyflow.tracing.output_recorder import IPyflowCapturedIO
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+_DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class CapturedOutputStore:
+    """
+    Keeps the outputs captured for past cell executions within a memory budget.
+    Outputs are tracked once their cell finishes executing. When the outputs
+    held in memory exceed ``max_bytes``, the least recently tracked or read ones
+    are compressed and spilled to files in a private temporary directory (under
+    ``spill_dir``, if given), and their stdout, stderr, and display data are
+    released. A spilled output is loaded back transparently the next time any
+    of these is read, e.g. by ``Cell.reproduce`` or ``api.cells.stdout``.
+    Spill files are deleted once their output is loaded or garbage collected,
+    and the directory itself when the store is.
+    """
+
+    def __init__(
+        self, max_bytes: int = _DEFAULT_MAX_BYTES, spill_dir: Optional[str] = None
+    ) -> None:
+        # 0 keeps every output in memory
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.resident_bytes = 0
+        self.num_spills = 0
+        self.num_loads = 0
+        self._workdir: Optional[str] = None
+        # id of each tracked, in-memory output -> weak reference to it, in order
+        # of last use
+        self._resident: "OrderedDict[int, weakref.ref]" = OrderedDict()
+        self._resident_nbytes: Dict[int, int] = {}
+        self._spill_paths: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._resident) + len(self._spill_paths)
+
+    @property
+    def spilled_bytes(self) -> int:
+        return sum(
+            os.path.getsize(path)
+            for path in self._spill_paths.values()
+            if os.path.exists(path)
+        )
+
+    def _get_workdir(self) -> str:
+        if self._workdir is None:
+            if self.spill_dir is not None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            self._workdir = tempfile.mkdtemp(
+                prefix="ipyflow-outputs-", dir=self.spill_dir
+            )
+            weakref.finalize(self, shutil.rmtree, self._workdir, True)
+        return self._workdir
+
+    def track(self, captured: IPyflowCapturedIO) -> None:
+        """Start accounting for a finished output, or mark it as recently used."""
+        key = id(captured)
+        if captured._store is self:
+            if key in self._resident:
+                self._resident.move_to_end(key)
+            return
+        if captured._store is not None or captured.is_spilled:
+            # owned by some other store; leave it be
+            return
+        captured._store = self
+        weakref.finalize(captured, self._forget, key)
+        self._add_resident(captured)
+
+    def _add_resident(self, captured: IPyflowCapturedIO) -> None:
+        key = id(captured)
+        nbytes = captured.nbytes
+        self._resident[key] = weakref.ref(captured)
+        self._resident_nbytes[key] = nbytes
+        self.resident_bytes += nbytes
+        self._enforce_budget(captured)
+
+    def _remove_resident(self, key: int) -> None:
+        if self._resident.pop(key, None) is not None:
+            self.resident_bytes -= self._resident_nbytes.pop(key)
+
+    def _forget(self, key: int) -> None:
+        self._remove_resident(key)
+        path = self._spill_paths.pop(key, None)
+        if path is not None:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def _enforce_budget(self, keep: IPyflowCapturedIO) -> None:
+        if self.max_bytes <= 0:
+            return
+        for key in list(self._resident):
+            if self.resident_bytes <= self.max_bytes:
+                break
+            captured = self._resident[key]()
+            if captured is None or captured is keep:
+                continue
+            self._spill(captured)
+
+    def _spill(self, captured: IPyflowCapturedIO) -> None:
+        key = id(captured)
+        try:
+            payload = zlib.compress(
+                pickle.dumps(
+                    (captured.stdout, captured.stderr, list(captured._outputs)),
+                    protocol=4,
+                )
+            )
+        except Exception:
+            # unpicklable display data just stays in memory, unaccounted for
+            logger.warning(
+                "unable to spill captured output for cell %s", captured._exec_ctr
+            )
+            self._remove_resident(key)
+            return
+        path = os.path.join(self._get_workdir(), "%d.pkl.z" % key)
+        try:
+            with open(path, "wb") as f:
+                f.write(payload)
+        except OSError:
+            logger.exception("unable to write captured output to %s", path)
+            self._remove_resident(key)
+            return
+        nbytes = self._resident_nbytes[key]
+        self._remove_resident(key)
+        self._spill_paths[key] = path
+        captured._stdout = captured._stderr = None
+        captured._outputs = []
+        captured._spilled_nbytes = nbytes
+        self.num_spills += 1
+
+    def load(self, captured: IPyflowCapturedIO) -> None:
+        """Bring a spilled output back into memory."""
+        key = id(captured)
+        path = self._spill_paths.pop(key, None)
+        stdout, stderr, outputs = "", "", []
+        if path is None:
+            logger.warning("no spilled payload for captured output %s", key)
+        else:
+            try:
+                with open(path, "rb") as f:
+                    stdout, stderr, outputs = pickle.loads(zlib.decompress(f.read()))
+            except Exception:
+                logger.exception("unable to load captured output from %s", path)
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        captured._stdout = StringIO(stdout)
+        captured._stderr = StringIO(stderr)
+        captured._outputs = outputs
+        captured._spilled_nbytes = None
+        self.num_loads += 1
+        self._add_resident(captured)
@@ -2,13 +2,16 @@
 import logging
 from test.utils import make_flow_fixture
 
+from ipyflow import api, cells, flow
+from ipyflow.tracing.output_store import CapturedOutputStore
+
 logging.basicConfig(level=logging.ERROR)
 
 # Reset dependency graph before each test
 # _flow_fixture, run_cell_ = make_flow_fixture(trace_messages_enabled=True)
 _flow_fixture, run_cell_ = make_flow_fixture(
     setup_stmts=[
-        "from ipyflow.api import code, deps, has_tag, lift, rdeps, rusers, set_tag, timestamp, users, unset_tag",
+        "from ipyflow.api import code, deps, has_tag, lift, rdeps, rdeps_many, rusers, rusers_many, set_tag, timestamp, users, unset_tag",
         "import pyccolo as pyc",
     ]
 )
@@ -154,6 +157,27 @@ def test_rdeps_and_rusers():
     run_cell("assert rusers(z) == []")
 
 
+def test_rdeps_and_rusers_depth_limited_and_batched():
+    run_cell("x = 0")
+    run_cell("y = x + 0")
+    run_cell("z = y + 0")
+    run_cell("assert rdeps(z, max_depth=1) == [lift(y)]")
+    run_cell("assert rusers(x, max_depth=1) == [lift(y)]")
+    run_cell("by_sym = rdeps_many([lift(y), lift(z)])")
+    run_cell("assert by_sym[lift(y)] == [lift(x)]")
+    run_cell("assert set(by_sym[lift(z)]) == {lift(x), lift(y)}")
+    run_cell("by_sym = rusers_many([lift(x), lift(z)])")
+    run_cell("assert set(by_sym[lift(x)]) == {lift(y), lift(z)}")
+    run_cell("assert by_sym[lift(z)] == []")
+    # memoized closures are dropped along changed edges
+    run_cell("y = 42")
+    run_cell("assert rdeps(z) == [lift(y)]")
+    run_cell("assert rusers(x) == []")
+    run_cell("y = x + 1")
+    run_cell("assert set(rdeps(z)) == {lift(x), lift(y)}")
+    run_cell("assert set(rusers(x)) == {lift(y), lift(z)}")
+
+
 def test_tags():
     run_cell("x = y = 0")
     run_cell("assert not has_tag(x, 'foo')")
@@ -167,3 +191,39 @@ def test_tags():
     run_cell("unset_tag(y, 'foo')")
     run_cell("assert not has_tag(x, 'foo')")
     run_cell("assert not has_tag(y, 'foo')")
+
+
+def test_captured_outputs_spill_to_disk(tmp_path):
+    store = CapturedOutputStore(max_bytes=4096, spill_dir=str(tmp_path))
+    flow().captured_output_store = store
+    counters = []
+    for digit in range(5):
+        run_cell("print('%d' * 2000)" % digit)
+        counters.append(cells().exec_counter())
+    assert store.resident_bytes <= store.max_bytes
+    assert store.num_spills == 3
+    first = cells().at_counter(counters[0]).captured_output
+    assert first.is_spilled
+    assert first.nbytes == 2001
+    assert len(list(tmp_path.glob("*/*"))) == 3
+    # spilled outputs are loaded back when read
+    assert api.cells.stdout(counters[0]) == "0" * 2000 + "\n"
+    assert not first.is_spilled
+    assert store.num_loads == 1
+    assert store.resident_bytes <= store.max_bytes
+    assert api.cells.stdout(counters[-1]) == "4" * 2000 + "\n"
+    assert store.num_loads == 1
+
+
+def test_captured_stream_keeps_head_and_tail():
+    flow().mut_settings.max_captured_stream_chars = 100
+    try:
+        run_cell("for i in range(1000): print('%03d' % i)")
+    finally:
+        flow().mut_settings.max_captured_stream_chars = 0
+    head = "".join("%03d\n" % i for i in range(12)) + "01"
+    tail = "7\n" + "".join("%03d\n" % i for i in range(988, 1000))
+    assert api.cells.stdout(cells().exec_counter()) == (
+        head + "\n[... 3900 characters of output dropped ...]\n" + tail
+    )
+    assert cells().current_cell().captured_output._stdout.dropped_chars == 3900
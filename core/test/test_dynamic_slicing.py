@@ -7,6 +7,8 @@ from typing import Dict
 
 from ipyflow.config import FlowDirection
 from ipyflow.data_model.cell import cells
+from ipyflow.data_model.statement import statements
+from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.singletons import flow
 from ipyflow.slicing.mixin import format_slice
 
@@ -754,3 +756,42 @@ def test_namespace_contributions():
     assert deps == {1, 2, 3, 4, 5, 6}, "got %s" % deps
     slice_size = num_stmts_in_slice(6)
     assert slice_size == len(deps), "got %d" % slice_size
+
+
+@dynamic_only_test
+def test_dataframe_column_usage_does_not_use_other_columns():
+    run_cell("import pandas as pd")
+    run_cell('df = pd.DataFrame({"a": [0,1], "b": [2., 3.]})')
+    run_cell("df['x'] = df.a + 1")
+    run_cell("df['y'] = df.b + 2")
+    deps = set(compute_unparsed_slice(4).keys())
+    assert deps == {1, 2, 4}, "got %s" % deps
+    run_cell("df['z'] = df.x + df.y")
+    deps = set(compute_unparsed_slice(5).keys())
+    assert deps == {1, 2, 3, 4, 5}, "got %s" % deps
+    run_cell("df.dropna()")
+    deps = set(compute_unparsed_slice(6).keys())
+    assert deps == {1, 2, 3, 4, 5, 6}, "got %s" % deps
+
+
+def test_slice_of_long_chain():
+    num_stmts = 1200
+    run_cell(
+        "\n".join(["x0 = 0"] + [f"x{i} = x{i - 1} + 1" for i in range(1, num_stmts)])
+    )
+    last_ts = Timestamp(cells().exec_counter(), num_stmts - 1)
+    stmts = statements().make_multi_slice([last_ts])
+    assert len(stmts) == num_stmts
+    assert stmts[0].text == "x0 = 0"
+    # slicing again reuses the closures computed for the first slice
+    assert statements().make_multi_slice([last_ts.plus(0, -1)]) == stmts[:-1]
+
+
+def test_timestamps_interned_until_cells_cleared():
+    run_cell("x = 0")
+    ts = Timestamp(cells().exec_counter(), 0)
+    assert Timestamp(ts.cell_num, 0) is ts
+    cells().clear()
+    assert Timestamp(ts.cell_num, 0) is not ts
+    assert Timestamp(ts.cell_num, 0) == ts
+    assert Timestamp(-1, -1) is Timestamp.uninitialized()
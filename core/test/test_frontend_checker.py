@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
+import ast
 import logging
+import time
 from contextlib import contextmanager
 from dataclasses import asdict
 from test.utils import make_flow_fixture
 from typing import Dict
 
-from ipyflow.config import ExecutionSchedule, FlowDirection
+from ipyflow.config import ExecutionSchedule, FlowDirection, Interface
 from ipyflow.data_model.cell import cells
+from ipyflow.data_model.timestamp import Timestamp
 from ipyflow.flow import DataflowSettings, MutableDataflowSettings
 from ipyflow.singletons import flow
 
@@ -720,3 +723,356 @@ def test_dag_edge_changes():
         response = flow().check_and_link_multiple_cells()
         assert response.ready_cells == {2}
         assert response.waiting_cells == {3}
+
+
+def test_repeated_checks_reuse_unchanged_cells():
+    cells_to_run = {
+        0: "x = 0",
+        1: "y = x + 1",
+        2: "z = y + 1",
+    }
+    run_all_cells(cells_to_run)
+    run_cell("x = 42", 0)
+    first_response = flow().check_and_link_multiple_cells()
+    first_results = {
+        cell.id: cell._cached_check[1] for cell in cells().current_cells_for_each_id()
+    }
+    second_response = flow().check_and_link_multiple_cells()
+    assert second_response.ready_cells == first_response.ready_cells == {1}
+    assert second_response.waiting_cells == first_response.waiting_cells == {2}
+    for cell in cells().current_cells_for_each_id():
+        assert cell._cached_check[1] is first_results[cell.id]
+    run_cell("y = x + 1", 1)
+    response = flow().check_and_link_multiple_cells()
+    assert response.ready_cells == {2}
+    assert response.waiting_cells == set()
+
+
+def test_bounded_update_propagation_falls_back_to_coarse_cell_marks():
+    cells_to_run = {
+        0: "x = 0",
+        1: "y = x + 1",
+        2: "z = y + 1",
+        3: "w = z + 1",
+        4: "logging.info(w)",
+        5: "x = 42",
+    }
+    run_all_cells(cells_to_run)
+    unbounded = flow().check_and_link_multiple_cells()
+    assert not flow().coarse_waiting_cell_marks
+    with override_settings(max_update_propagation_depth=1):
+        run_all_cells(cells_to_run)
+        stats = flow().update_propagation_stats[cells().exec_counter()]
+        assert stats.truncated == 1
+        assert stats.max_symbols_touched == 2
+        assert set(flow().coarse_waiting_cell_marks.keys()) == {2}
+        bounded = flow().check_and_link_multiple_cells()
+    assert bounded.waiting_cells == unbounded.waiting_cells == {2, 3, 4}
+    assert bounded.ready_cells == unbounded.ready_cells == {1}
+    run_cell(cells_to_run[2], 2)
+    flow().check_and_link_multiple_cells()
+    assert not flow().coarse_waiting_cell_marks
+
+
+def test_liveness_analysis_cached_by_cell_source():
+    cache = flow().live_refs_cache
+    run_all_cells({0: "x = 0", 1: "y = x + 1", 2: "d = {0: 1}; k = 0", 3: "d[k] = 2"})
+    flow().check_and_link_multiple_cells()
+    num_entries, num_misses = len(cache), cache.misses
+    run_cell("x = 42", 0)
+    response = flow().check_and_link_multiple_cells()
+    assert response.ready_cells == {1}
+    # only the new content of cell 0 and the scope-dependent `d[k] = 2` are reanalyzed
+    assert len(cache) == num_entries + 1
+    assert cache.misses == num_misses + 2
+    cache.clear()
+    assert flow().check_and_link_multiple_cells().ready_cells == {1}
+
+
+def test_liveness_analysis_cache_keyed_by_analysis_settings():
+    cache = flow().live_refs_cache
+    with override_settings(flow_order=FlowDirection.IN_ORDER):
+        run_all_cells({0: "x = [0]", 1: "y = x", 2: "z = [y, 1]"})
+        flow().check_and_link_multiple_cells()
+        num_misses = cache.misses
+        flow().check_and_link_multiple_cells()
+        assert cache.misses == num_misses
+    # refs cached under other settings are not reused
+    with override_settings(flow_order=FlowDirection.ANY_ORDER):
+        flow().check_and_link_multiple_cells()
+    assert cache.misses == num_misses + 3
+    with override_settings(flow_order=FlowDirection.IN_ORDER, min_lazy_literal_size=1):
+        flow().check_and_link_multiple_cells()
+    assert cache.misses == num_misses + 6
+
+
+def test_cell_metadata_delta_merged_against_acknowledged_seq():
+    run_all_cells({0: "x = 0", 1: "y = x + 1"})
+    comm_manager = flow().comm_manager
+    response = comm_manager.handle_notify_content_changed(
+        {
+            "cell_metadata_by_id": {
+                0: {"index": 0, "content": "x = 0", "type": "code"},
+                1: {"index": 1, "content": "y = x + 1", "type": "code"},
+            },
+            "content_seq": 1,
+        }
+    )
+    assert response["content_seq"] == 1
+    response = comm_manager.handle_notify_content_changed(
+        {
+            "cell_metadata_delta": {
+                "base_seq": 1,
+                "seq": 2,
+                "changed": {
+                    1: {"content": "y = x + 2"},
+                    2: {"index": 2, "content": "# notes", "type": "markdown"},
+                },
+                "removed": [],
+            }
+        }
+    )
+    assert not response.get("resync_required", False)
+    assert response["content_seq"] == 2
+    assert flow()._prev_cell_metadata_by_id == {
+        0: {"index": 0, "content": "x = 0", "type": "code"},
+        1: {"index": 1, "content": "y = x + 2", "type": "code"},
+        2: {"index": 2, "content": "# notes", "type": "markdown"},
+    }
+    assert cells().from_id(1).current_content == "y = x + 2"
+    response = comm_manager.handle_notify_content_changed(
+        {
+            "cell_metadata_delta": {
+                "base_seq": 2,
+                "seq": 3,
+                "changed": {1: {"index": 0}, 0: {"index": 1}},
+                "removed": [2],
+            }
+        }
+    )
+    assert response["content_seq"] == 3
+    assert set(flow()._prev_cell_metadata_by_id.keys()) == {0, 1}
+    assert cells().from_id(1).position < cells().from_id(0).position
+    # a delta against a payload the kernel never saw requires a full resync
+    prev_cell_metadata_by_id = flow()._prev_cell_metadata_by_id
+    response = comm_manager.handle_notify_content_changed(
+        {
+            "cell_metadata_delta": {
+                "base_seq": 5,
+                "seq": 6,
+                "changed": {0: {"content": "x = 1"}},
+                "removed": [],
+            }
+        }
+    )
+    assert response["resync_required"]
+    assert response["content_seq"] == 3
+    assert flow()._prev_cell_metadata_by_id is prev_cell_metadata_by_id
+
+
+def test_static_analysis_of_edited_cells_runs_in_background():
+    run_all_cells({0: "x = 0", 1: "y = x + 1"})
+    comm_manager = flow().comm_manager
+    worker = flow().static_analysis_worker
+    cache = flow().live_refs_cache
+    sent = []
+    callbacks = []
+
+    class FakeComm:
+        def send(self, msg):
+            sent.append(msg)
+
+    def make_request(content):
+        return {
+            "type": "notify_content_changed",
+            "cell_metadata_by_id": {
+                0: {"index": 0, "content": "x = 0", "type": "code"},
+                1: {"index": 1, "content": content, "type": "code"},
+            },
+        }
+
+    def wait_for_callbacks(num_callbacks):
+        for _ in range(500):
+            if len(callbacks) >= num_callbacks:
+                return
+            time.sleep(0.01)
+        assert False, "timed out waiting for the static analysis worker"
+
+    orig_comm = comm_manager._comm
+    orig_parse = ast.parse
+    comm_manager._comm = FakeComm()
+    worker.schedule_on_shell_thread = callbacks.append
+    try:
+        comm_manager.handle(make_request("y = x + 2"))
+        # newer content arrives before the first change was finished up
+        comm_manager.handle(make_request("y = x + 3"))
+        assert sent == []
+        wait_for_callbacks(2)
+        num_misses = cache.misses
+        parsed_sources = []
+
+        def parse(source, *args, **kwargs):
+            parsed_sources.append(source)
+            return orig_parse(source, *args, **kwargs)
+
+        ast.parse = parse
+        for callback in callbacks:
+            callback()
+        # only the latest change is finished up, with refs from the worker
+        assert len(sent) == 1
+        assert sent[0]["type"] == "compute_exec_schedule"
+        assert cache.misses == num_misses
+        assert cells().from_id(1).current_content == "y = x + 3"
+        # and with the tree that the worker parsed
+        assert not any("y = x + 3" in source for source in parsed_sources)
+    finally:
+        ast.parse = orig_parse
+        comm_manager._comm = orig_comm
+        worker.schedule_on_shell_thread = None
+        worker.shutdown()
+
+
+def test_reactive_schedule_requests_are_coalesced():
+    run_all_cells({0: "x = 0", 1: "y = x + 1", 2: "z = x + 2"})
+    comm_manager = flow().comm_manager
+    scheduler = comm_manager.reactive_scheduler
+    handled = []
+    callbacks = []
+    orig_handle = comm_manager.handle
+    comm_manager.handle = handled.append
+    scheduler.schedule_on_shell_thread = callbacks.append
+    try:
+        scheduler.request(2, reactive=False)
+        scheduler.request(2, reactive=True)
+        scheduler.request(1, reactive=False)
+        assert len(callbacks) == 1
+        assert handled == []
+        callbacks.pop()()
+        assert len(handled) == 1
+        assert handled[0]["type"] == "compute_exec_schedule"
+        # the topmost cell is used, and reactivity is sticky
+        assert handled[0]["executed_cell_id"] == 1
+        assert handled[0]["is_reactively_executing"]
+        assert not scheduler.has_pending
+        assert scheduler.stats.flushes == 1
+        assert scheduler.stats.coalesced == 2
+        # a new request after the flush gets a flush of its own
+        scheduler.request(2, reactive=True)
+        assert len(callbacks) == 1
+        callbacks.pop()()
+        assert len(handled) == 2
+        assert handled[1]["executed_cell_id"] == 2
+    finally:
+        comm_manager.handle = orig_handle
+        scheduler.schedule_on_shell_thread = None
+
+
+def test_vectorized_staleness_matches_loops():
+    cells_to_run = {
+        0: "x = 0",
+        1: "lst = [x, 1]",
+        2: "y = lst[0] + 1",
+        3: "z = y + x",
+        4: "logging.info(z)",
+    }
+    with override_settings(
+        exec_schedule=ExecutionSchedule.DAG_BASED,
+        flow_order=FlowDirection.IN_ORDER,
+        static_slicing_enabled=True,
+    ):
+        run_all_cells(cells_to_run)
+        run_cell("lst[0] = 7", 5)
+        run_cell("x = 42", 0)
+        results = []
+        for vectorized_staleness in (True, False):
+            with override_settings(
+                interface=Interface.JUPYTER, vectorized_staleness=vectorized_staleness
+            ):
+                # once to register the cells, and again to index their positions
+                for _ in range(2):
+                    cells().set_cell_positions({i: i for i in range(6)})
+                results.append(flow().check_and_link_multiple_cells())
+                cells().set_cell_positions({})
+        vectorized, looped = results
+        assert vectorized.ready_cells == looped.ready_cells == {1}
+        assert vectorized.waiting_cells == looped.waiting_cells == {2, 3, 4, 5}
+        for result in results:
+            assert {
+                cell_id: parents
+                for cell_id, parents in result.stale_parents.items()
+                if len(parents) > 0
+            } == {2: {1}}
+        assert (
+            vectorized.stale_parents_by_executed_cell_by_child
+            == looped.stale_parents_by_executed_cell_by_child
+            == {1: {0: {0}}, 2: {1: {1}}, 3: {2: {2}, 0: {0}}, 4: {3: {3}}}
+        )
+        assert (
+            vectorized.stale_parents_by_child_by_executed_cell
+            == looped.stale_parents_by_child_by_executed_cell
+        )
+
+
+def test_reassigning_equal_array_does_not_make_dependents_ready():
+    cells_to_run = {
+        0: "import numpy as np",
+        1: "x = np.arange(1000)",
+        2: "y = x + 1",
+        3: "logging.info(y)",
+    }
+    run_all_cells(cells_to_run)
+    run_cell(cells_to_run[1], 1)
+    response = flow().check_and_link_multiple_cells()
+    assert response.waiting_cells == set(), "got %s" % response.waiting_cells
+    assert response.ready_cells == set(), "got %s" % response.ready_cells
+    with override_settings(max_value_fingerprint_bytes=0):
+        run_cell(cells_to_run[1], 1)
+    response = flow().check_and_link_multiple_cells()
+    assert response.ready_cells == {2}, "got %s" % response.ready_cells
+    run_cell(cells_to_run[2], 2)
+    run_cell("x = np.arange(1001)", 1)
+    response = flow().check_and_link_multiple_cells()
+    assert response.waiting_cells == {3}, "got %s" % response.waiting_cells
+    assert response.ready_cells == {2}, "got %s" % response.ready_cells
+
+
+def test_symbol_version_log_is_sorted_and_compacted():
+    with override_settings(max_symbol_versions=2):
+        run_cell("x = 0", 0)
+        run_cell("y = x + 1", 1)
+        for i in range(10):
+            run_cell("x = %d" % (i + 1), 0)
+        x_sym = flow().global_scope["x"]
+        versions = list(x_sym._updated_timestamps)
+        assert versions == sorted(versions)
+        assert len(versions) < 4, "got %s" % versions
+        # the version used by y is kept around
+        used_time = max(x_sym.timestamp_by_used_time)
+        assert x_sym._updated_timestamps.latest_before(used_time) == Timestamp(1, 0)
+        response = flow().check_and_link_multiple_cells()
+        assert response.ready_cells == {1}, "got %s" % response.ready_cells
+
+
+def test_symbol_version_log_compaction_does_not_change_readiness():
+    # cells 0-3 and 4-7 run the same code on different symbols, but only the
+    # latter compact their version logs, so both halves should be equally ready
+    cells_to_run = {0: "x = 0", 1: "y = x + 1", 2: "x = 5", 3: "z = x + y"}
+    for cell_id, code in cells_to_run.items():
+        run_cell(code, cell_id)
+        with override_settings(max_symbol_versions=1):
+            run_cell(code.replace("x", "u").replace("y", "v"), cell_id + 4)
+    for i in range(6):
+        for cell_id in (2, 0, 1, 3, 0, 2):
+            code = cells_to_run[cell_id]
+            if cell_id in (0, 2):
+                code = "x = %d" % (cell_id + i)
+            run_cell(code, cell_id)
+            with override_settings(max_symbol_versions=1):
+                run_cell(code.replace("x", "u").replace("y", "v"), cell_id + 4)
+            response = flow().check_and_link_multiple_cells()
+            for computed in (response.ready_cells, response.waiting_cells):
+                unbounded = {c + 4 for c in computed if c < 4}
+                compacted = {c for c in computed if c >= 4}
+                assert unbounded == compacted, "got %s" % computed
+    num_versions = len(flow().global_scope["u"]._updated_timestamps)
+    assert num_versions < len(flow().global_scope["x"]._updated_timestamps)
@@ -243,3 +243,31 @@ def test_annotation_registration():
         run_cell(f"%flow register_annotations {os.path.dirname(__file__)}")
         assert len(REGISTERED_CLASS_SPECS) > 0
         assert len(REGISTERED_FUNCTION_SPECS) > 0
+
+
+def test_profile_bookkeeping():
+    assert not flow().profiler.enabled
+    run_cell("%flow profile on")
+    assert flow().profiler.enabled
+    run_cell("x = 0")
+    run_cell("y = x + 1")
+    run_cell("x = 42")
+    stats = flow().stats.for_cell(cells().from_id(4).cell_ctr)
+    for subsystem in (
+        "tracer.after_assign_rhs",
+        "update_protocol",
+        "cell.check_and_resolve_symbols",
+        "flow.gc",
+    ):
+        assert stats[subsystem].calls > 0, subsystem
+        assert stats[subsystem].seconds >= stats[subsystem].self_seconds >= 0
+    response = flow().comm_manager.handle_get_profile_stats({})
+    assert response["enabled"]
+    assert response["stats"]["totals"]["flow.gc"]["calls"] >= 3
+    run_cell("%flow profile off")
+    assert not flow().profiler.enabled
+    num_cells_profiled = len(flow().stats.by_cell)
+    run_cell("y = x + 2")
+    assert len(flow().stats.by_cell) == num_cells_profiled
+    run_cell("%flow profile reset")
+    assert len(flow().stats.by_cell) == 0
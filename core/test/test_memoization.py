@@ -127,6 +127,44 @@ def test_functions():
     assert second.skipped_due_to_memoization_ctr > 0
 
 
+def test_arrays():
+    run_cell("import numpy as np")
+    first = cells(run_cell("x = np.arange(10)", cell_id="first"))
+    second = cells(run_cell("%%memoize\ny = x.sum()", cell_id="second"))
+    assert shell().user_ns["y"] == 45
+    assert second.skipped_due_to_memoization_ctr == -1
+    comparable = (
+        cells()
+        ._memoized_executions["y = x.sum()"][second.cell_ctr]
+        .inputs[0]
+        .comparable
+    )
+    assert comparable is not shell().user_ns["x"]
+    run_cell("x = np.arange(10)", cell_id=first.id)
+    second = cells(run_cell("%%memoize\ny = x.sum()", cell_id=second.id))
+    assert second.skipped_due_to_memoization_ctr > 0
+    assert shell().user_ns["y"] == 45
+    run_cell("x = np.arange(10)\nx[0] = 10", cell_id=first.id)
+    second = cells(run_cell("%%memoize\ny = x.sum()", cell_id=second.id))
+    assert second.skipped_due_to_memoization_ctr == -1
+    assert shell().user_ns["y"] == 55
+
+
+def test_dataframes():
+    run_cell("import pandas as pd")
+    first = cells(run_cell("df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})"))
+    second = cells(run_cell("%%memoize\nn = df.a.sum()", cell_id="second"))
+    assert shell().user_ns["n"] == 3
+    assert second.skipped_due_to_memoization_ctr == -1
+    run_cell("df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})", cell_id=first.id)
+    second = cells(run_cell("%%memoize\nn = df.a.sum()", cell_id=second.id))
+    assert second.skipped_due_to_memoization_ctr > 0
+    assert shell().user_ns["n"] == 3
+    run_cell("df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'z']})", cell_id=first.id)
+    second = cells(run_cell("%%memoize\nn = df.a.sum()", cell_id=second.id))
+    assert second.skipped_due_to_memoization_ctr == -1
+
+
 def test_verbosity():
     first = cells(run_cell("x = 0", cell_id="first"))
     second = cells(run_cell("%%memoize\ny = x + 1\nprint('hi')", cell_id="second"))
@@ -158,3 +196,24 @@ def test_verbosity():
     assert shell().user_ns["y"] == 1
     assert flow().global_scope["y"].obj == 1
     assert second.captured_output.stdout == ""
+
+
+def test_persisted_store(tmp_path):
+    flow().set_memoization_store(str(tmp_path))
+    run_cell("x = 41", cell_id="first")
+    second = cells(run_cell("%%memoize\ny = x + 1\ny", cell_id="second"))
+    assert second.skipped_due_to_memoization_ctr == -1
+    assert len(flow().memoization_store) == 1
+    # simulate a restart by dropping in-memory memoization state
+    cells()._memoized_executions.clear()
+    shell().user_ns["y"] = None
+    flow().set_memoization_store(str(tmp_path))
+    third = cells(run_cell("%%memoize\ny = x + 1\ny", cell_id="third"))
+    assert third.skipped_due_to_memoization_ctr == third.cell_ctr
+    assert shell().user_ns["y"] == 42
+    assert flow().global_scope["y"].obj == 42
+    assert shell().user_ns["Out"][third.cell_ctr] == 42
+    run_cell("x = 0", cell_id="first")
+    fourth = cells(run_cell("%%memoize\ny = x + 1\ny", cell_id="fourth"))
+    assert fourth.skipped_due_to_memoization_ctr == -1
+    assert shell().user_ns["y"] == 1
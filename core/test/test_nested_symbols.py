@@ -247,3 +247,25 @@ def test_list_delete():
         )
         is sym_4
     )
+
+
+def test_large_literal_creates_subscript_symbols_on_demand():
+    run_cell("lst = [%s]" % ", ".join(str(i) for i in range(1000, 1200)))
+    lst_sym = flow().global_scope.lookup_symbol_by_name_this_indentation("lst")
+    ns = lst_sym.namespace
+    assert ns.has_lazy_subscript_symbols
+    assert len(list(ns.all_symbols_this_indentation(is_subscript=True))) == 0
+    run_cell("x = lst[150] + 1")
+    [lst_150] = ns.all_symbols_this_indentation(is_subscript=True)
+    assert lst_150.readable_name == "lst[150]", "got %s" % lst_150.readable_name
+    assert lst_150.obj == 1150
+    assert lst_150.timestamp == lst_sym.timestamp
+    run_cell("lst[150] = 42")
+    run_cell("logging.info(x)")
+    assert_detected("`x` depends on stale `lst[150]`")
+    run_cell("del lst[0]")
+    assert not ns.has_lazy_subscript_symbols
+    assert ns.lookup_symbol_by_name_this_indentation(149, is_subscript=True) is lst_150
+    assert lst_150.readable_name == "lst[149]", "got %s" % lst_150.readable_name
+    lst_198 = ns.lookup_symbol_by_name_this_indentation(198, is_subscript=True)
+    assert lst_198.obj == 1199
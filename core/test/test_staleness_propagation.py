@@ -5,6 +5,7 @@ import sys
 from pyccolo.extra_builtins import EMIT_EVENT
 
 from ipyflow.singletons import flow
+from ipyflow.tracing.function_summary import FunctionSummary
 
 from .utils import assert_bool, make_flow_fixture, skipif_known_failing
 
@@ -2780,3 +2781,44 @@ if sys.version_info >= (3, 8):
         run_cell("a = 42")
         run_cell("logging.info(c)")
         assert_detected()
+
+
+def test_function_summaries_keyed_by_arg_types(monkeypatch):
+    replayed = []
+    orig_replay = FunctionSummary.replay
+
+    def replay(summary):
+        replayed.append(summary)
+        orig_replay(summary)
+
+    monkeypatch.setattr(FunctionSummary, "replay", replay)
+    run_cell("k = 10")
+    run_cell("def f(a):\n    return a + k")
+    run_cell("def g(lst):\n    lst.append(k)\n    return len(lst)")
+    run_cell("y = f(1)")
+    run_cell("z = f(2)")
+    assert len(replayed) == 1
+    # new argument types get traced again
+    run_cell("w = f(2.0)")
+    assert len(replayed) == 1
+    run_cell("lst = []")
+    run_cell("n = g(lst)")
+    run_cell("n = g(lst)")
+    assert len(replayed) == 1, "functions with outer side effects are never replayed"
+    run_cell("k = 11")
+    run_cell("logging.info(z)")
+    assert_detected("`z` has dep on stale `k`")
+
+
+def test_function_summaries_for_old_versions_are_dropped():
+    summaries = flow().function_summaries
+    run_cell("k = 10")
+    for i in range(5):
+        run_cell("def f(a):\n    return a + k + %d" % i)
+        run_cell("y = f(1)")
+        run_cell("z = f(1.0)")
+    # only the summaries for the last definition of f are kept
+    assert len(summaries) == 2
+    summaries.max_entries = 1
+    run_cell("w = f(True)")
+    assert len(summaries) == 1
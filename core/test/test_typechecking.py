@@ -1,8 +1,12 @@
 # -*- coding: utf-8 -*-
 import logging
+import sys
 from test.utils import make_flow_fixture
 from typing import Set
 
+import pytest
+
+from ipyflow.analysis.typecheck import TypecheckService
 from ipyflow.data_model.cell import cells
 from ipyflow.singletons import flow
 from ipyflow.types import IdType
@@ -43,3 +47,56 @@ def test_int_change_to_str_triggers_typecheck():
     flow().check_and_link_multiple_cells()
     assert not get_cell_ids_needing_typecheck()
     assert cells().from_id(3)._cached_typecheck_result is False
+
+
+def test_cells_needing_typecheck_are_checked_in_one_batch():
+    pytest.importorskip("mypy")
+    run_cell("a = 1", 1)
+    run_cell("b = 2", 2)
+    run_cell("logging.info(a + b)", 3)
+    run_cell("logging.info(b + a)", 4)
+    run_cell('b = "b"', 5)
+    assert get_cell_ids_needing_typecheck() == {3, 4}
+    service = flow().typecheck_service
+    num_mypy_runs = service.num_mypy_runs
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    try:
+        flow().check_and_link_multiple_cells()
+        # running mypy in-process leaves the kernel's recursion limit alone
+        assert sys.getrecursionlimit() == 1000
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    assert service.num_mypy_runs == num_mypy_runs + 1
+    for cell_id in (3, 4):
+        cell = cells().from_id(cell_id)
+        assert cell._cached_typecheck_result is False
+        assert any("Unsupported operand" in d for d in cell.typecheck_diagnostics)
+
+
+def test_syntax_error_does_not_mask_type_errors_in_batch():
+    pytest.importorskip("mypy")
+    service = TypecheckService()
+    type_error = "x: int = 'a'\n"
+    results = service.typecheck_many({1: type_error, 2: "def f(:\n"})
+    assert results[1].typechecks is False
+    assert results[2].typechecks is False
+    num_mypy_runs = service.num_mypy_runs
+    assert service.typecheck(type_error).typechecks is False
+    assert service.num_mypy_runs == num_mypy_runs
+
+
+class _FailingMypyApi:
+    @staticmethod
+    def run(args):
+        raise RuntimeError("mypy crashed")
+
+
+def test_failed_mypy_run_is_not_cached():
+    pytest.importorskip("mypy")
+    service = TypecheckService()
+    mypy_api = service._mypy_api
+    service._mypy_api = _FailingMypyApi()
+    assert service.typecheck("x: int = 'a'\n").typechecks is True
+    service._mypy_api = mypy_api
+    assert service.typecheck("x: int = 'a'\n").typechecks is False
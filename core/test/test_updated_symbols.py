@@ -61,3 +61,50 @@ def test_dict_hierarchy():
     )
     run_cell('d["foo"]["bar"] = 0')
     assert updated_symbol_names() == sorted(["d[foo][bar]", "d[foo]", "d"])
+
+
+def test_touched_index_matches_full_scan():
+    flow_ = flow()
+    orig_symbols_updated_in_cell = flow_.symbols_updated_in_cell
+    mismatches = []
+
+    def checked_symbols_updated_in_cell(cell_num):
+        expected = {
+            sym for sym in flow_.all_symbols() if sym.timestamp.cell_num == cell_num
+        }
+        actual = orig_symbols_updated_in_cell(cell_num)
+        if set(actual) != expected:
+            mismatches.append((cell_num, set(actual) ^ expected))
+        return actual
+
+    flow_.symbols_updated_in_cell = checked_symbols_updated_in_cell
+    try:
+        run_cell("d = {'a': {'b': [1, 2]}}")
+        run_cell("d['a']['b'].append(3)")
+        run_cell("lst = [0, 1, 2]\nlst.insert(0, -1)")
+        run_cell("class Foo:\n    def __init__(self): self.x = 0")
+        run_cell("foo = Foo()\nfoo.x += 1")
+        run_cell("del d['a']")
+    finally:
+        del flow_.symbols_updated_in_cell
+    assert mismatches == []
+
+
+def test_symbol_containers_allocated_lazily():
+    run_cell("x = 0")
+    run_cell("y = x + 1")
+    x_sym = flow().global_scope["x"]
+    y_sym = flow().global_scope["y"]
+    assert not hasattr(x_sym, "__dict__")
+    assert y_sym in x_sym.children
+    assert x_sym in y_sym.parents
+    sym = Symbol("z", x_sym.symbol_type, object(), flow().global_scope)
+    slot = Symbol.__dict__["fresher_ancestors"]
+    try:
+        slot.__get__(sym, Symbol)
+    except AttributeError:
+        pass
+    else:
+        assert False, "expected fresher_ancestors to be unallocated"
+    assert sym.fresher_ancestors == set()
+    assert slot.__get__(sym, Symbol) is sym.fresher_ancestors
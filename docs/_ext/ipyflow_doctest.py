@@ -83,14 +83,12 @@ def _make_run_cell():
         kwargs = {}
         if "cell_id" in shell().run_cell.__code__.co_varnames:
             kwargs["cell_id"] = cell_id
-        # ipyflow installs a persistent ``StdstreamProxy`` over ``sys.stdout`` /
+        # ipyflow installs a persistent ``TeeStream`` over ``sys.stdout`` /
         # ``sys.stderr`` (it is never uninstalled -- that is correct for a live
         # Jupyter session). Sphinx's doctest builder, however, swaps ``sys.stdout``
         # (but not ``sys.stderr``) around each snippet, which desynchronizes the two
-        # proxies and, under IPython >= 9's per-cell ``_tee`` write patch, sends
-        # ``StdstreamProxy.__setattr__`` into infinite recursion. Save and restore
-        # both streams around the cell so no proxy leaks past ``run_cell`` to be
-        # re-captured as its own underlying stream.
+        # tees. Save and restore both streams around the cell so no tee leaks past
+        # ``run_cell`` to be re-captured as its own underlying stream.
         saved_stdout, saved_stderr = sys.stdout, sys.stderr
         try:
             shell().run_cell(squish_text(code), **kwargs)
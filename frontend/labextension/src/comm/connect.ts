@@ -129,7 +129,7 @@ export function connectToComm(
       store.comm.onMsg = oldComm.onMsg;
       store.comm.open({
         interface: 'jupyterlab',
-        cell_metadata_by_id: store.gatherCellMetadataAndContent(),
+        ...store.makeFullCellMetadataPayload(),
         cell_parents: ctx.ipyflowMetadata?.cell_parents ?? {},
         cell_children: ctx.ipyflowMetadata?.cell_children ?? {},
       });
@@ -156,7 +156,7 @@ export function connectToComm(
 
   store.comm.open({
     interface: 'jupyterlab',
-    cell_metadata_by_id: store.gatherCellMetadataAndContent(),
+    ...store.makeFullCellMetadataPayload(),
     cell_parents: ctx.ipyflowMetadata?.cell_parents ?? {},
     cell_children: ctx.ipyflowMetadata?.cell_children ?? {},
   });
@@ -9,7 +9,8 @@ import { handleComputeExecSchedule } from './schedule';
  * Build the `comm.onMsg` dispatcher. On `establish` it wires up the
  * active-cell/content/execution listeners and flushes any buffered payload; on
  * `set_exec_mode` it records the mode; `compute_exec_schedule` is delegated to
- * the schedule handler.
+ * the schedule handler; `notify_content_changed` may ask for the full cell
+ * metadata if the kernel could not apply a delta.
  */
 export function createMessageHandler(
   ctx: IConnectionContext,
@@ -42,6 +43,12 @@ export function createMessageHandler(
       store.settings.exec_mode = payload.exec_mode as string;
     } else if (payload.type === 'compute_exec_schedule') {
       handleComputeExecSchedule(ctx, handlers.debouncedSave, payload);
+    } else if (
+      payload.type === 'notify_content_changed' &&
+      payload.resync_required
+    ) {
+      store.lastCellMetadataMap = null;
+      store.requestComputeExecSchedule();
     }
   };
 }
@@ -60,11 +60,10 @@ export function createNotebookEventHandlers(
       // fixes https://github.com/ipyflow/ipyflow/issues/145
       return;
     }
-    store.lastCellMetadataMap = cell_metadata_by_id;
     notebook.widgets.forEach(syncDirtiness);
     ctx.safeSend({
       type: 'notify_content_changed',
-      cell_metadata_by_id,
+      ...store.makeCellMetadataPayload(cell_metadata_by_id),
     });
   }, 500);
 
@@ -13,12 +13,14 @@ import {
   IClosureContext,
 } from '../graph/closure';
 import {
+  CellMetadataDelta,
   CellMetadataMap,
   EdgeMap,
   Highlights,
   ISettings,
   NestedEdgeMap,
 } from '../types';
+import { diffCellMetadata } from '../utils';
 
 /**
  * Per-session frontend state for ipyflow. Mutations are applied directly to the
@@ -58,6 +60,7 @@ export class IpyflowSessionStore implements IClosureContext {
   cellChildren: EdgeMap = {};
   settings: ISettings = {};
   lastCellMetadataMap: CellMetadataMap | null = null;
+  contentSeq = 0;
   inProgressExecs = 0;
 
   private _changed = new Signal<this, void>(this);
@@ -84,10 +87,50 @@ export class IpyflowSessionStore implements IClosureContext {
     return cell_metadata_by_id;
   }
 
+  /**
+   * Request fields with the full `cell_metadata_by_id`, which subsequent
+   * payloads from {@link makeCellMetadataPayload} are deltas against.
+   */
+  makeFullCellMetadataPayload(
+    cellMetadataById: CellMetadataMap = this.gatherCellMetadataAndContent(),
+  ): { cell_metadata_by_id: CellMetadataMap; content_seq: number } {
+    this.lastCellMetadataMap = cellMetadataById;
+    this.contentSeq++;
+    return {
+      cell_metadata_by_id: cellMetadataById,
+      content_seq: this.contentSeq,
+    };
+  }
+
+  /**
+   * Request fields describing the notebook's cells: a `cell_metadata_delta`
+   * against the previously sent metadata, or the full `cell_metadata_by_id`
+   * if nothing has been sent yet (or the kernel asked for a resync). Each
+   * payload gets the next sequence number; the kernel only applies a delta
+   * whose `base_seq` matches the last payload it received.
+   */
+  makeCellMetadataPayload(
+    cellMetadataById: CellMetadataMap = this.gatherCellMetadataAndContent(),
+  ): { [key: string]: JSONValue } {
+    const prev = this.lastCellMetadataMap;
+    if (prev === null) {
+      return this.makeFullCellMetadataPayload(cellMetadataById);
+    }
+    const baseSeq = this.contentSeq;
+    this.lastCellMetadataMap = cellMetadataById;
+    this.contentSeq++;
+    const delta: CellMetadataDelta = {
+      base_seq: baseSeq,
+      seq: this.contentSeq,
+      ...diffCellMetadata(prev, cellMetadataById),
+    };
+    return { cell_metadata_delta: delta };
+  }
+
   requestComputeExecSchedule(): void {
     (this.safeSend ?? this.comm.send)({
       type: 'compute_exec_schedule',
-      cell_metadata_by_id: this.gatherCellMetadataAndContent(),
+      ...this.makeCellMetadataPayload(),
       is_reactively_executing: this.isReactivelyExecuting,
     });
   }
@@ -18,6 +18,18 @@ export type CellMetadata = {
 
 export type CellMetadataMap = { [id: CellId]: CellMetadata };
 
+/**
+ * Changes to a {@link CellMetadataMap} since the one sent with sequence number
+ * `base_seq`: full metadata for added cells, only the changed keys for moved or
+ * edited cells, and the ids of removed cells.
+ */
+export type CellMetadataDelta = {
+  base_seq: number;
+  seq: number;
+  changed: { [id: CellId]: Partial<CellMetadata> };
+  removed: CellId[];
+};
+
 /**
  * Settings pushed from the kernel. Known keys are spelled out for readability;
  * the index signature keeps it tolerant of additional keys the kernel may send.
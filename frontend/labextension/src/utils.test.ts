@@ -1,6 +1,6 @@
 import { describe, expect, it, vi } from 'vitest';
 
-import { debounce, mergeMaps } from './utils';
+import { debounce, diffCellMetadata, mergeMaps } from './utils';
 
 describe('mergeMaps', () => {
   it('unions keys, with priority overriding backup', () => {
@@ -19,6 +19,37 @@ describe('mergeMaps', () => {
   });
 });
 
+describe('diffCellMetadata', () => {
+  it('sends only the changed keys of moved and edited cells', () => {
+    const prev = {
+      a: { index: 0, content: 'x = 0', type: 'code' },
+      b: { index: 1, content: 'y = x', type: 'code' },
+      c: { index: 2, content: 'z = y', type: 'code' },
+    };
+    const next = {
+      b: { index: 0, content: 'y = x', type: 'code' },
+      c: { index: 1, content: 'z = y + 1', type: 'code' },
+      d: { index: 2, content: '# notes', type: 'markdown' },
+    };
+    expect(diffCellMetadata(prev, next)).toEqual({
+      changed: {
+        b: { index: 0 },
+        c: { index: 1, content: 'z = y + 1' },
+        d: { index: 2, content: '# notes', type: 'markdown' },
+      },
+      removed: ['a'],
+    });
+  });
+
+  it('is empty when nothing changed', () => {
+    const metadata = { a: { index: 0, content: 'x = 0', type: 'code' } };
+    expect(diffCellMetadata(metadata, { ...metadata })).toEqual({
+      changed: {},
+      removed: [],
+    });
+  });
+});
+
 describe('debounce', () => {
   it('invokes only once on the trailing edge after rapid calls', () => {
     vi.useFakeTimers();
@@ -1,3 +1,5 @@
+import { CellMetadata, CellMetadataMap } from './types';
+
 export function mergeMaps<V>(
   priority: { [id: string]: V },
   backup: { [id: string]: V },
@@ -32,3 +34,38 @@ export function debounce<A extends unknown[]>(
     }, wait);
   };
 }
+
+/**
+ * Diff two cell metadata maps: returns the changed keys of each added, moved or
+ * edited cell in `next`, and the ids of the cells in `prev` missing from `next`.
+ */
+export function diffCellMetadata(
+  prev: CellMetadataMap,
+  next: CellMetadataMap,
+): {
+  changed: { [id: string]: Partial<CellMetadata> };
+  removed: string[];
+} {
+  const changed: { [id: string]: Partial<CellMetadata> } = {};
+  for (const id in next) {
+    const prevMetadata = prev[id];
+    if (prevMetadata === undefined) {
+      changed[id] = next[id];
+      continue;
+    }
+    const diff: Partial<CellMetadata> = {};
+    let isChanged = false;
+    for (const key in next[id]) {
+      const k = key as keyof CellMetadata;
+      if (next[id][k] !== prevMetadata[k]) {
+        (diff as any)[k] = next[id][k];
+        isChanged = true;
+      }
+    }
+    if (isChanged) {
+      changed[id] = diff;
+    }
+  }
+  const removed = Object.keys(prev).filter((id) => next[id] === undefined);
+  return { changed, removed };
+}